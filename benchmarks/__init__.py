@@ -0,0 +1,8 @@
+"""Benchmarks of Tornado-RESTful.
+
+Run every benchmark and print the results as JSON:
+  python -m benchmarks
+
+See python -m benchmarks --help for selecting benchmarks, saving the results
+and comparing them with a previous run.
+"""
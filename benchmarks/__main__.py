@@ -0,0 +1,97 @@
+"""Run the benchmarks.
+
+Usage:
+  python -m benchmarks [--quick] [--only dispatch,codecs,startup,http]
+                       [--output results.json] [--compare baseline.json]
+"""
+# standard library imports
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+
+# third-party imports
+import tornado
+
+# application-specific imports
+from . import bench_codecs
+from . import bench_dispatch
+from . import bench_http
+from . import bench_startup
+
+BENCHMARKS = {
+    'dispatch': bench_dispatch,
+    'startup': bench_startup,
+    'codecs': bench_codecs,
+    'http': bench_http,
+}
+
+# Primary metric of each kind of result, and whether higher is better.
+_METRICS = (('ns_per_op', False), ('ms', False),
+            ('requests_per_second', True))
+
+
+def _compare(baseline, results):
+    """Print the change of each result relative to a baseline run."""
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in _METRICS:
+            if metric in result and metric in previous and previous[metric]:
+                ratio = float(result[metric]) / previous[metric]
+                change = (ratio - 1) * 100
+                better = change > 0 if higher_is_better else change < 0
+                print('%-45s %14s -> %14s %+7.1f%% %s' % (
+                    name, previous[metric], result[metric], change,
+                    'better' if better else 'worse'), file=sys.stderr)
+                break
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks', description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer sizes and iterations')
+    parser.add_argument('--only', default=','.join(sorted(BENCHMARKS)),
+                        help='comma separated benchmarks to run')
+    parser.add_argument('--output', help='write the results to this file')
+    parser.add_argument('--compare',
+                        help='results file of a previous run to compare with')
+    args = parser.parse_args(argv)
+
+    # Keep the access log out of the timings.
+    logging.getLogger('tornado.access').setLevel(logging.ERROR)
+
+    results = {}
+    for name in args.only.split(','):
+        print('Running %s benchmarks...' % name, file=sys.stderr)
+        results.update(BENCHMARKS[name].run(quick=args.quick))
+
+    document = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'tornado': tornado.version,
+            'platform': platform.platform(),
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+    output = json.dumps(document, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            _compare(json.load(f)['results'], results)
+
+
+if __name__ == '__main__':
+    main()
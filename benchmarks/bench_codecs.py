@@ -0,0 +1,41 @@
+"""JSON encoding and decoding cost of the available codecs."""
+# standard library imports
+
+# third-party imports
+
+# application-specific imports
+from tornado_restful.api_codecs import _JSON_CODECS
+from tornado_restful.api_codecs import get_json_codec
+
+from .common import measure
+
+SMALL_PAYLOAD = {'id': 42, 'name': 'item', 'price': 9.99, 'tags': ['a', 'b'],
+                 'available': True}
+LARGE_PAYLOAD = {'items': [
+    {'id': i, 'name': 'item %d' % i, 'price': i * 0.5,
+     'tags': ['tag%d' % j for j in range(5)], 'description': 'x' * 100}
+    for i in range(2000)]}
+
+
+def run(quick=False):
+    """Run the codec benchmarks, for every installed codec.
+
+    Returns:
+        Dict of results by benchmark name.
+    """
+    results = {}
+    for name in sorted(_JSON_CODECS):
+        codec = get_json_codec(name)
+        if codec.name != name:
+            # Library not installed, the codec fell back to the json module.
+            continue
+        for size, payload, number in (
+                ('small', SMALL_PAYLOAD, 2000 if quick else 20000),
+                ('large', LARGE_PAYLOAD, 5 if quick else 50)):
+            encoded = codec.encode(payload)
+            results['encode_%s_%s' % (name, size)] = measure(
+                lambda: codec.encode(payload), number)
+            results['encode_%s_%s' % (name, size)]['bytes'] = len(encoded)
+            results['decode_%s_%s' % (name, size)] = measure(
+                lambda: codec.decode(encoded), number)
+    return results
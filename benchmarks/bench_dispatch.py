@@ -0,0 +1,110 @@
+"""Routing and per-request handling overhead, without any socket."""
+# standard library imports
+import asyncio
+import json
+
+# third-party imports
+from tornado.concurrent import Future
+from tornado.httputil import HTTPHeaders
+from tornado.httputil import HTTPServerRequest
+
+# application-specific imports
+from tornado_restful import RestService
+
+from .common import measure
+from .common import measure_async
+from .resources import make_resource
+
+
+class _NullConnection(object):
+    """HTTP connection discarding the response."""
+    context = None
+
+    def set_close_callback(self, callback):
+        pass
+
+    def _done(self):
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def write_headers(self, start_line, headers, chunk=None):
+        return self._done()
+
+    def write(self, chunk):
+        return self._done()
+
+    def finish(self):
+        pass
+
+
+def _make_request(http_method, path, body):
+    headers = HTTPHeaders()
+    if body:
+        headers['Content-Type'] = 'application/json'
+        headers['Content-Length'] = str(len(body))
+    request = HTTPServerRequest(
+        method=http_method, uri=path, headers=headers, body=body,
+        connection=_NullConnection())
+    return request
+
+
+async def _bench_handle(sizes, number):
+    results = {}
+    body = json.dumps({'name': 'item', 'tags': ['a', 'b']}).encode()
+    for size in sizes:
+        resource_class, paths = make_resource(size)
+        application = RestService([resource_class])
+        # First, middle and last declared routes of each verb.
+        for label, (http_method, path) in (
+                ('first', paths[0]), ('middle', paths[size // 2]),
+                ('last', paths[-1])):
+            request_body = body if http_method == 'POST' else b''
+
+            async def handle():
+                request = _make_request(http_method, path, request_body)
+                handler = resource_class(application, request)
+                await handler._execute([])
+
+            results['handle_%s_%d_routes_%s' % (
+                http_method.lower(), size, label)] = await measure_async(
+                    handle, number)
+    return results
+
+
+def run(quick=False):
+    """Run the dispatch benchmarks.
+
+    Returns:
+        Dict of results by benchmark name.
+    """
+    sizes = (10, 100) if quick else (10, 100, 1000)
+    number = 1000 if quick else 10000
+    results = {}
+    for size in sizes:
+        resource_class, paths = make_resource(size)
+        route_table = resource_class.get_route_table()
+        for label, (http_method, path) in (
+                ('first', paths[0]), ('last', paths[-1])):
+            results['match_%d_routes_%s' % (size, label)] = measure(
+                lambda: route_table.match(http_method, path), number)
+
+        def not_found():
+            try:
+                route_table.match('GET', '/bench/v1/missing/path')
+            except Exception:
+                pass
+        results['match_%d_routes_404' % size] = measure(not_found, number)
+
+        # Whole tornado routing of the application, down to the handler.
+        router = RestService([resource_class]).default_router
+        for label, (http_method, path) in (
+                ('last', paths[-1]),
+                ('404', ('GET', '/bench/v1/missing/path'))):
+            request = _make_request(http_method, path, b'')
+            results['find_handler_%d_routes_%s' % (size, label)] = measure(
+                lambda: router.find_handler(request), number)
+
+    results.update(asyncio.run(
+        _bench_handle(sizes, number // 10 if not quick else number // 5)))
+    return results
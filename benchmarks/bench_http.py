@@ -0,0 +1,93 @@
+"""End-to-end throughput and latency of a RestService over loopback."""
+# standard library imports
+import asyncio
+import json
+import time
+
+# third-party imports
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+# application-specific imports
+from tornado_restful import RestService
+
+from .common import percentile
+from .resources import make_resource
+
+
+async def _client(port, requests, latencies, counter):
+    """Send requests one after the other on a keep-alive connection."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            request = requests[counter[0] % len(requests)]
+            start = time.perf_counter()
+            writer.write(request)
+            headers = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in headers.split(b'\r\n'):
+                if line[:15].lower() == b'content-length:':
+                    length = int(line[15:])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not headers.startswith(b'HTTP/1.1 200'):
+                raise RuntimeError(headers.split(b'\r\n')[0])
+    finally:
+        writer.close()
+
+
+async def _bench(routes, concurrency, total):
+    resource_class, paths = make_resource(routes)
+    application = RestService([resource_class])
+    sock, port = bind_unused_port()
+    server = HTTPServer(application)
+    server.add_sockets([sock])
+
+    body = json.dumps({'name': 'item'}).encode()
+    requests = []
+    for http_method, path in paths:
+        request = '%s %s HTTP/1.1\r\nHost: 127.0.0.1\r\n' % (http_method, path)
+        if http_method == 'POST':
+            request += ('Content-Type: application/json\r\n'
+                        'Content-Length: %d\r\n' % len(body))
+            requests.append(request.encode() + b'\r\n' + body)
+        else:
+            requests.append(request.encode() + b'\r\n')
+
+    latencies = []
+    counter = [total]
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _client(port, requests, latencies, counter)
+        for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    server.stop()
+    await server.close_all_connections()
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'requests_per_second': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1e3, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1e3, 3),
+    }
+
+
+def run(quick=False):
+    """Run the end-to-end benchmarks.
+
+    The server and the clients share the process and the IOLoop, so the
+    figures are meant for comparing runs, not for capacity planning.
+
+    Returns:
+        Dict of results by benchmark name.
+    """
+    total = 2000 if quick else 20000
+    results = {}
+    for routes in ((10,) if quick else (10, 1000)):
+        for concurrency in (1, 16, 64):
+            results['http_%d_routes_%d_clients' % (routes, concurrency)] = (
+                asyncio.run(_bench(routes, concurrency, total)))
+    return results
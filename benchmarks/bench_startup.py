@@ -0,0 +1,38 @@
+"""Route registration and RestService startup time."""
+# standard library imports
+import time
+
+# third-party imports
+
+# application-specific imports
+from tornado_restful import RestService
+
+from .resources import make_resource
+
+
+def run(quick=False):
+    """Run the startup benchmarks.
+
+    Each run creates a new resource class, since route tables are compiled
+    once per class.
+
+    Returns:
+        Dict of results by benchmark name.
+    """
+    sizes = (10, 100) if quick else (10, 100, 1000, 5000)
+    repeat = 3 if quick else 5
+    results = {}
+    for size in sizes:
+        timings = []
+        for _ in range(repeat):
+            resource_class, _ = make_resource(size)
+            start = time.perf_counter()
+            RestService([resource_class])
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results['startup_%d_routes' % size] = {
+            'ms': round(timings[0] * 1e3, 3),
+            'median_ms': round(timings[len(timings) // 2] * 1e3, 3),
+            'repeat': repeat,
+        }
+    return results
@@ -0,0 +1,64 @@
+# standard library imports
+import gc
+import time
+
+# third-party imports
+
+# application-specific imports
+
+
+def percentile(sorted_values, fraction):
+    """Get a percentile of a sorted list of values (nearest rank)."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def measure(func, number, repeat=5):
+    """Time a function.
+
+    Args:
+        func: function, Function called without arguments.
+        number: integer, Number of calls per run.
+        repeat: integer, Number of runs. (Default: 5)
+
+    Returns:
+        Dict with the best and median duration of a call in nanoseconds.
+    """
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - start) / number * 1e9)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    timings.sort()
+    return {
+        'ns_per_op': round(timings[0], 1),
+        'median_ns_per_op': round(timings[len(timings) // 2], 1),
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+async def measure_async(func, number, repeat=5):
+    """Time a coroutine function, see measure()."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        timings.append((time.perf_counter() - start) / number * 1e9)
+    timings.sort()
+    return {
+        'ns_per_op': round(timings[0], 1),
+        'median_ns_per_op': round(timings[len(timings) // 2], 1),
+        'number': number,
+        'repeat': repeat,
+    }
@@ -0,0 +1,61 @@
+"""Synthetic @api/@method resources."""
+# standard library imports
+
+# third-party imports
+
+# application-specific imports
+from tornado_restful import RestResource
+from tornado_restful import api
+from tornado_restful import method
+
+
+def _get_handler():
+    def get_item(self, id):
+        return {'id': id, 'name': 'item', 'tags': ['a', 'b']}
+    return get_item
+
+
+def _list_handler():
+    def list_items(self):
+        return [{'id': i} for i in range(10)]
+    return list_items
+
+
+def _post_handler():
+    def create_item(self):
+        return {'created': self.request.body}
+    return create_item
+
+
+def make_resource(routes, api_name='bench'):
+    """Create a RestResource class with a given number of routes.
+
+    Every fourth route is a literal GET returning a list, every fourth a POST
+    decoding a JSON body, the others GET routes with an int path param.
+
+    Args:
+        routes: integer, Number of @method functions.
+        api_name: string, Name of the API. (Default: 'bench')
+
+    Returns:
+        A (resource class, paths) tuple, paths being a list of
+        (http method, request path) tuples, one per route.
+    """
+    attributes = {}
+    paths = []
+    for i in range(routes):
+        if i % 4 == 1:
+            func = method(name='list%d' % i, path='r%d' % i,
+                          http_method='GET')(_list_handler())
+            paths.append(('GET', '/%s/v1/r%d' % (api_name, i)))
+        elif i % 4 == 2:
+            func = method(name='create%d' % i, path='r%d' % i,
+                          http_method='POST')(_post_handler())
+            paths.append(('POST', '/%s/v1/r%d' % (api_name, i)))
+        else:
+            func = method(name='get%d' % i, path='r%d/{id:int}' % i,
+                          http_method='GET')(_get_handler())
+            paths.append(('GET', '/%s/v1/r%d/42' % (api_name, i)))
+        attributes['m%d' % i] = func
+    resource_class = type('Bench%d' % routes, (RestResource,), attributes)
+    return api(name=api_name, version='v1')(resource_class), paths
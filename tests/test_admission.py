@@ -0,0 +1,115 @@
+# standard library imports
+import asyncio
+import json
+
+# third-party imports
+from tornado.tcpclient import TCPClient
+from tornado.testing import AsyncHTTPTestCase
+from tornado.testing import gen_test
+
+# application-specific imports
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+
+
+@api(name='files', version='v1')
+class Uploads(RestResource):
+    @method(path='uploads', http_method='POST', stream_body=True,
+            content_type='application/octet-stream', max_concurrency=1)
+    async def upload(self):
+        size = 0
+        async for chunk in self.body_stream:
+            size += len(chunk)
+        return {'size': size}
+
+    @method(path='slow', http_method='GET', max_concurrency=1)
+    async def slow(self):
+        await asyncio.sleep(0.2)
+        return {'slow': True}
+
+    @method(path='fast', http_method='GET', max_concurrency=1)
+    async def fast(self):
+        return {'fast': True}
+
+
+def _limiter(method_name):
+    for route in Uploads.get_route_table().routes:
+        if route.func.__name__ == method_name:
+            return route.limiters[0]
+
+
+async def _wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError('Condition not met in %ss' % timeout)
+        await asyncio.sleep(0.01)
+
+
+class ConcurrencyLimitTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Uploads])
+
+    async def _abort_upload(self):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(
+            b'POST /files/v1/uploads HTTP/1.1\r\n'
+            b'Host: localhost\r\n'
+            b'Content-Type: application/octet-stream\r\n'
+            b'Content-Length: 100000\r\n\r\n' + b'x' * 1000)
+        limiter = _limiter('upload')
+        await _wait_for(lambda: limiter.in_flight == 1)
+        stream.close()
+
+    @gen_test
+    async def test_aborted_upload_releases_its_slot(self):
+        await self._abort_upload()
+        limiter = _limiter('upload')
+        await _wait_for(lambda: limiter.in_flight == 0)
+        response = await self.http_client.fetch(
+            self.get_url('/files/v1/uploads'), method='POST', body=b'abc',
+            headers={'Content-Type': 'application/octet-stream'})
+        self.assertEqual(json.loads(response.body), {'size': 3})
+        self.assertEqual(limiter.in_flight, 0)
+
+    @gen_test
+    async def test_aborted_upload_ends_the_in_flight_gauge(self):
+        await self._abort_upload()
+        metrics = self._app.metrics
+        await _wait_for(lambda: _limiter('upload').in_flight == 0)
+        method_metrics = metrics.snapshot()['files.upload']
+        self.assertEqual(method_metrics['in_flight'], 0)
+        self.assertIn(499, method_metrics['statuses'])
+
+    @gen_test
+    async def test_disconnected_request_releases_its_slot_once(self):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(b'GET /files/v1/slow HTTP/1.1\r\n'
+                           b'Host: localhost\r\n\r\n')
+        limiter = _limiter('slow')
+        await _wait_for(lambda: limiter.in_flight == 1)
+        stream.close()
+        await _wait_for(lambda: limiter.in_flight == 0)
+        await asyncio.sleep(0.3)
+        self.assertEqual(limiter.in_flight, 0)
+        response = await self.http_client.fetch(self.get_url(
+            '/files/v1/slow'))
+        self.assertEqual(response.code, 200)
+
+    @gen_test
+    async def test_limit_sheds_excess_requests(self):
+        async def fetch(delay):
+            await asyncio.sleep(delay)
+            response = await self.http_client.fetch(
+                self.get_url('/files/v1/slow'), raise_error=False)
+            return response.code, response.headers.get('Retry-After')
+
+        results = await asyncio.gather(*[fetch(0.05 * i) for i in range(3)])
+        self.assertEqual(results, [(200, None), (503, '1'), (503, '1')])
+        self.assertEqual(_limiter('slow').in_flight, 0)
+        response = await self.http_client.fetch(self.get_url(
+            '/files/v1/fast'))
+        self.assertEqual(response.code, 200)
+        self.assertEqual(_limiter('fast').in_flight, 0)
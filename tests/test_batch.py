@@ -0,0 +1,142 @@
+# standard library imports
+import asyncio
+import json
+import unittest
+
+# third-party imports
+from tornado.tcpclient import TCPClient
+from tornado.testing import AsyncHTTPTestCase
+from tornado.testing import gen_test
+
+# application-specific imports
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import api_codecs
+from tornado_restful import method
+
+
+@api(name='shop', version='v1')
+class Items(RestResource):
+    cancelled = False
+
+    @method(path='items/{id:int}', http_method='GET')
+    async def get_item(self, id):
+        return {'id': id, 'tag': self.request.headers.get('X-Tag')}
+
+    @method(path='items', http_method='POST')
+    async def create_item(self):
+        return {'created': self.request.body}
+
+    @method(path='framing', http_method='GET')
+    async def get_framing(self):
+        headers = self.request.headers
+        return {'length': headers.get('Content-Length'),
+                'encoding': headers.get('Transfer-Encoding')}
+
+    @method(path='slow', http_method='GET')
+    async def slow(self):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            Items.cancelled = True
+            raise
+        return {}
+
+    @method(path='events', http_method='GET', stream='sse')
+    async def events(self):
+        while True:
+            yield {'tick': 1}
+            await asyncio.sleep(0.01)
+
+
+class BatchTest(AsyncHTTPTestCase):
+    def setUp(self):
+        super(BatchTest, self).setUp()
+        Items.cancelled = False
+
+    def get_app(self):
+        return RestService([Items], batch_path='/batch', batch_max_size=5,
+                           batch_timeout=0.2)
+
+    def post_batch(self, items):
+        response = self.fetch('/batch', method='POST',
+                              body=json.dumps(items))
+        return response.code, json.loads(response.body)
+
+    def test_sub_requests_are_answered_in_order(self):
+        code, body = self.post_batch([
+            {'path': '/shop/v1/items/1', 'headers': {'X-Tag': 'a'}},
+            {'method': 'post', 'path': '/shop/v1/items', 'body': {'b': 2}},
+            {'method': 'DELETE', 'path': '/shop/v1/items/1'},
+            {'path': '/shop/v1/unknown'}])
+        self.assertEqual(code, 200)
+        self.assertEqual(
+            [(item['status'], item['body']) for item in body['items'][:2]],
+            [(200, {'id': 1, 'tag': 'a'}), (200, {'created': {'b': 2}})])
+        self.assertEqual([item['status'] for item in body['items'][2:]],
+                         [405, 404])
+
+    def test_framing_headers_of_items_are_ignored(self):
+        framing = {'content-length': 'abc', 'Transfer-Encoding': 'chunked'}
+        code, body = self.post_batch([
+            {'path': '/shop/v1/framing', 'headers': framing},
+            {'method': 'POST', 'path': '/shop/v1/items', 'body': {'b': 2},
+             'headers': framing}])
+        self.assertEqual(code, 200)
+        self.assertEqual(body['items'], [
+            {'status': 200, 'body': {'length': None, 'encoding': None}},
+            {'status': 200, 'body': {'created': {'b': 2}}}])
+
+    def test_invalid_batches(self):
+        for items in ({'path': '/shop/v1/items/1'}, [{'path': 'relative'}],
+                      [{'path': '/shop/v1/items/1'}] * 6):
+            code, _ = self.post_batch(items)
+            self.assertIn(code, (400, 413), items)
+
+    def test_invalid_sub_request_fields(self):
+        for item in ({'path': '/shop/v1/items/1', 'headers': ['a']},
+                     {'path': '/shop/v1/items/1', 'headers': {'X-Tag': 1}},
+                     {'path': '/shop/v1/items/1', 'headers': 'X-Tag: a'},
+                     {'path': '/shop/v1/items/1', 'method': 1},
+                     {'path': '/shop/v1/items/1', 'method': ['GET']},
+                     {'method': 'POST', 'path': '/shop/v1/items',
+                      'body': {'b': 2},
+                      'headers': {'Content-Type': 'text/plain'}}):
+            code, body = self.post_batch([item])
+            self.assertEqual(code, 400, item)
+            self.assertEqual(body['code'], 400)
+
+    @unittest.skipIf(api_codecs.msgpack is None, 'msgpack not installed')
+    def test_structured_bodies_use_the_codec_of_their_content_type(self):
+        code, body = self.post_batch([
+            {'method': 'POST', 'path': '/shop/v1/items', 'body': {'b': 2},
+             'headers': {'Content-Type': 'application/msgpack'}}])
+        self.assertEqual(code, 200)
+        self.assertEqual(body['items'][0],
+                         {'status': 200, 'body': {'created': {'b': 2}}})
+
+    def test_slow_sub_requests_time_out(self):
+        code, body = self.post_batch([{'path': '/shop/v1/slow'},
+                                      {'path': '/shop/v1/items/2'}])
+        self.assertEqual(code, 200)
+        self.assertEqual([item['status'] for item in body['items']],
+                         [504, 200])
+        self.assertTrue(Items.cancelled)
+
+    def test_event_streams_are_rejected(self):
+        code, body = self.post_batch([{'path': '/shop/v1/events'}])
+        self.assertEqual(code, 200)
+        self.assertEqual(body['items'][0]['status'], 400)
+
+    @gen_test
+    async def test_disconnection_cancels_the_sub_requests(self):
+        body = json.dumps([{'path': '/shop/v1/slow'}]).encode('utf-8')
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(
+            b'POST /batch HTTP/1.1\r\nHost: localhost\r\n'
+            b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+        await asyncio.sleep(0.05)
+        stream.close()
+        await asyncio.sleep(0.1)
+        self.assertTrue(Items.cancelled)
@@ -0,0 +1,114 @@
+# standard library imports
+import asyncio
+import json
+
+# third-party imports
+from tornado.httpclient import HTTPClientError
+from tornado.testing import AsyncHTTPTestCase
+from tornado.testing import gen_test
+
+# application-specific imports
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+
+
+@api(name='reports', version='v1')
+class Reports(RestResource):
+    calls = 0
+
+    @method(path='reports/{name}', http_method='GET', coalesce=True)
+    async def get_report(self, name):
+        Reports.calls += 1
+        await asyncio.sleep(0.2)
+        return {'name': name}
+
+    @method(path='archived/{name}', http_method='GET', coalesce=True)
+    async def get_archived(self, name):
+        Reports.calls += 1
+        await asyncio.sleep(0.1)
+        self.set_status(410)
+        self.set_header('X-Archived', name)
+        return {'name': name}
+
+    @method(path='failing', http_method='GET', coalesce=True)
+    async def failing(self):
+        Reports.calls += 1
+        await asyncio.sleep(0.1)
+        raise ValueError('Broken')
+
+    @method(path='unencodable', http_method='GET', coalesce=True)
+    async def unencodable(self):
+        Reports.calls += 1
+        await asyncio.sleep(0.1)
+        return {'value': object()}
+
+
+class CoalesceTest(AsyncHTTPTestCase):
+    def setUp(self):
+        super(CoalesceTest, self).setUp()
+        Reports.calls = 0
+
+    def get_app(self):
+        return RestService([Reports], deadline_header='X-Request-Timeout')
+
+    async def _fetch(self, path, delay=0.0, **kwargs):
+        await asyncio.sleep(delay)
+        try:
+            response = await self.http_client.fetch(self.get_url(path),
+                                                    **kwargs)
+        except HTTPClientError as e:
+            return e.code, None
+        return response.code, json.loads(response.body)
+
+    @gen_test
+    async def test_identical_requests_share_one_call(self):
+        results = await asyncio.gather(*[
+            self._fetch('/reports/v1/reports/daily', delay=0.01 * i)
+            for i in range(3)])
+        self.assertEqual(results, [(200, {'name': 'daily'})] * 3)
+        self.assertEqual(Reports.calls, 1)
+
+    @gen_test
+    async def test_waiters_get_the_status_and_headers_of_the_leader(self):
+        responses = await asyncio.gather(*[
+            self.http_client.fetch(
+                self.get_url('/reports/v1/archived/2019'), raise_error=False)
+            for _ in range(2)])
+        self.assertEqual([response.code for response in responses],
+                         [410, 410])
+        self.assertEqual(
+            [response.headers.get('X-Archived') for response in responses],
+            ['2019', '2019'])
+        self.assertEqual(Reports.calls, 1)
+
+    @gen_test
+    async def test_errors_of_the_leader_are_shared(self):
+        results = await asyncio.gather(
+            self._fetch('/reports/v1/failing'),
+            self._fetch('/reports/v1/failing', delay=0.02))
+        self.assertEqual(results, [(500, None)] * 2)
+        self.assertEqual(Reports.calls, 1)
+
+    @gen_test
+    async def test_encoding_errors_of_the_leader_end_the_flight(self):
+        results = await asyncio.gather(
+            self._fetch('/reports/v1/unencodable'),
+            self._fetch('/reports/v1/unencodable', delay=0.02))
+        self.assertEqual(results, [(500, None)] * 2)
+        # The flight is over: the next request is not left waiting.
+        result = await asyncio.wait_for(
+            self._fetch('/reports/v1/unencodable'), 2)
+        self.assertEqual(result, (500, None))
+        self.assertEqual(Reports.calls, 2)
+
+    @gen_test
+    async def test_leader_deadline_does_not_fail_waiters(self):
+        leader, waiter = await asyncio.gather(
+            self._fetch('/reports/v1/reports/daily',
+                        headers={'X-Request-Timeout': '0.05'}),
+            self._fetch('/reports/v1/reports/daily', delay=0.01))
+        self.assertEqual(leader, (504, None))
+        self.assertEqual(waiter, (200, {'name': 'daily'}))
+        self.assertEqual(Reports.calls, 2)
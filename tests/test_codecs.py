@@ -0,0 +1,189 @@
+# standard library imports
+import gzip
+import json
+import unittest
+
+# third-party imports
+from tornado.testing import AsyncHTTPTestCase
+
+# application-specific imports
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+from tornado_restful import ApiConfigurationError
+from tornado_restful import api_codecs
+from tornado_restful import api_compression
+from tornado_restful.api_codecs import get_json_codec
+
+
+@api(name='codecs', version='v1')
+class Documents(RestResource):
+    @method(path='int-keys', http_method='GET')
+    async def int_keys(self):
+        return {1: 'a', 2: {3: 'b'}}
+
+    @method(path='big-int', http_method='GET')
+    async def big_int(self):
+        return {'value': 2 ** 70}
+
+    @method(path='list', http_method='GET')
+    async def as_list(self):
+        return [{'n': n} for n in range(3)]
+
+    @method(path='generator', http_method='GET')
+    def as_generator(self):
+        for n in range(3):
+            yield {'n': n}
+
+    @method(path='async-generator', http_method='GET')
+    async def as_async_generator(self):
+        for n in range(3):
+            yield {'n': n}
+
+
+@api(name='compressed', version='v1')
+class Reports(RestResource):
+    @method(path='report', http_method='GET', compress='auto')
+    async def report(self):
+        size = int(self.get_query_argument('size', 100))
+        return {'rows': [{'n': n, 'label': 'row %d' % n}
+                         for n in range(size)]}
+
+    @method(path='cached', http_method='GET', compress='auto', cache_ttl=60)
+    async def cached(self):
+        return {'rows': ['x' * 100] * 100}
+
+
+class JsonCodecTest(unittest.TestCase):
+    def test_codecs_encode_like_the_json_module(self):
+        documents = [{1: 'a', False: 'b', None: 'c'}, {'big': 2 ** 70},
+                     {'text': u'été'}, [1.5, None, False]]
+        for name in ('json', 'orjson'):
+            codec = get_json_codec(name)
+            for document in documents:
+                self.assertEqual(
+                    json.loads(codec.encode(document)),
+                    json.loads(json.dumps(document)), (name, document))
+
+    def test_codecs_decode_64_bits_integers_exactly(self):
+        for name in ('json', 'orjson'):
+            codec = get_json_codec(name)
+            for value in (2 ** 64 - 1, -2 ** 63):
+                data = json.dumps({'n': value, 'm': [value]})
+                self.assertEqual(codec.decode(data.encode('utf-8')),
+                                 {'n': value, 'm': [value]}, name)
+                self.assertEqual(codec.decode(data),
+                                 {'n': value, 'm': [value]}, name)
+        # Larger integers need the json module.
+        self.assertEqual(get_json_codec('json').decode(b'{"n": %d}' % 2 ** 70),
+                         {'n': 2 ** 70})
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_json_codec('yaml')
+
+
+class JsonResponsesTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Documents])
+
+    def test_non_string_keys(self):
+        response = self.fetch('/codecs/v1/int-keys')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body),
+                         {'1': 'a', '2': {'3': 'b'}})
+
+    def test_integers_over_64_bits(self):
+        response = self.fetch('/codecs/v1/big-int')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body), {'value': 2 ** 70})
+
+
+@unittest.skipIf(api_codecs.msgpack is None or api_codecs.cbor2 is None,
+                 'msgpack and cbor2 are not installed')
+class NegotiatedResponsesTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Documents])
+
+    def fetch_document(self, path, accept):
+        response = self.fetch(path, headers={'Accept': accept})
+        self.assertEqual(response.code, 200)
+        self.assertIn('Accept', response.headers['Vary'])
+        codec = self._app.codecs.for_content_type(
+            response.headers['Content-Type'])
+        return codec.name, codec.decode(response.body)
+
+    def test_streamed_items_use_the_negotiated_format(self):
+        expected = {'items': [{'n': 0}, {'n': 1}, {'n': 2}]}
+        for accept, name in (('application/json', self._app.json_codec.name),
+                             ('application/msgpack', 'msgpack'),
+                             ('application/cbor', 'cbor')):
+            for path in ('list', 'generator', 'async-generator'):
+                self.assertEqual(
+                    self.fetch_document('/codecs/v1/' + path, accept),
+                    (name, expected), (accept, path))
+
+
+class CompressionTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Reports])
+
+    def fetch_raw(self, path, accept_encoding=None):
+        headers = {}
+        if accept_encoding is not None:
+            headers['Accept-Encoding'] = accept_encoding
+        response = self.fetch(path, headers=headers,
+                              decompress_response=False)
+        self.assertEqual(response.code, 200)
+        return response
+
+    def test_gzip_round_trip(self):
+        response = self.fetch_raw('/compressed/v1/report', 'gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        document = json.loads(gzip.decompress(response.body))
+        self.assertEqual(len(document['rows']), 100)
+        self.assertEqual(document['rows'][99], {'n': 99, 'label': 'row 99'})
+
+    @unittest.skipIf(api_compression.brotli is None, 'brotli not installed')
+    def test_brotli_round_trip(self):
+        response = self.fetch_raw('/compressed/v1/report', 'gzip, br')
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        document = json.loads(api_compression.brotli.decompress(
+            response.body))
+        self.assertEqual(len(document['rows']), 100)
+
+    def test_uncompressed_responses(self):
+        for path, accept_encoding in (
+                ('/compressed/v1/report', None),
+                ('/compressed/v1/report', 'identity'),
+                ('/compressed/v1/report', 'gzip;q=0'),
+                ('/compressed/v1/report?size=1', 'gzip')):
+            response = self.fetch_raw(path, accept_encoding)
+            self.assertNotIn('Content-Encoding', response.headers, path)
+            self.assertIn('rows', json.loads(response.body))
+
+    def test_cached_responses_are_compressed_once_per_encoding(self):
+        plain = self.fetch_raw('/compressed/v1/cached')
+        first = self.fetch_raw('/compressed/v1/cached', 'gzip')
+        second = self.fetch_raw('/compressed/v1/cached', 'gzip')
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(gzip.decompress(first.body), plain.body)
+        self.assertEqual(first.headers['Etag'], second.headers['Etag'])
+        self.assertNotEqual(first.headers['Etag'], plain.headers['Etag'])
+        response = self.fetch(
+            '/compressed/v1/cached', decompress_response=False,
+            headers={'Accept-Encoding': 'gzip',
+                     'If-None-Match': first.headers['Etag']})
+        self.assertEqual(response.code, 304)
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ApiConfigurationError):
+            @api(name='bad', version='v1')
+            class Bad(RestResource):
+                @method(path='x', http_method='GET', compress='zip')
+                async def x(self):
+                    return {}
+
+            RestService([Bad])
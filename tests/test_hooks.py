@@ -0,0 +1,186 @@
+# standard library imports
+import asyncio
+import json
+
+# third-party imports
+import tornado.web
+from tornado.testing import AsyncHTTPTestCase
+
+# application-specific imports
+from tornado_restful import AUTH_LEVEL
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+
+
+def _authenticate(handler):
+    token = handler.request.headers.get('Authorization')
+    if token is None:
+        return None
+    if token != 'Bearer secret':
+        raise tornado.web.HTTPError(401, 'Invalid token')
+    return 'alice'
+
+
+def _allow_everyone(handler):
+    return 'anybody'
+
+
+class _Tag(object):
+    """Hook tagging the responses."""
+    def __init__(self, tag):
+        self.tag = tag
+
+    def after(self, handler, response):
+        return dict(response, tags=response.get('tags', []) + [self.tag])
+
+
+def _short_circuit(handler):
+    if handler.get_query_argument('answer', None) == 'hook':
+        return {'answered_by': 'hook'}
+
+
+async def _authenticate_async(handler):
+    await asyncio.sleep(0)
+    return handler.request.headers.get('X-User')
+
+
+class _Served(object):
+    """Async hook recording the user in a response header."""
+    async def before(self, handler):
+        await asyncio.sleep(0)
+        handler.set_header('X-Served-To', handler.current_user or '-')
+
+
+@api(name='private', version='v1')
+class Accounts(RestResource):
+    @method(path='me', http_method='GET', auth_level=AUTH_LEVEL.REQUIRED)
+    async def me(self):
+        return {'user': self.current_user}
+
+    @method(path='maybe', http_method='GET',
+            auth_level=AUTH_LEVEL.OPTIONAL_CONTINUE)
+    async def maybe(self):
+        return {'user': self.current_user}
+
+    @method(path='tagged', http_method='GET',
+            hooks=[_short_circuit, _Tag('method')])
+    async def tagged(self):
+        return {'answered_by': 'method'}
+
+
+reporting = api(name='reporting', version='v1',
+                auth_level=AUTH_LEVEL.OPTIONAL, hooks=[_Tag('api')])
+
+
+@reporting.api_class(resource_name='reports', hooks=[_Tag('class')])
+class Reports(RestResource):
+    @method(path='reports', http_method='GET', hooks=[_Tag('method')])
+    async def list_reports(self):
+        return {'user': self.current_user}
+
+    @method(path='reports/admin', http_method='GET',
+            auth_level=AUTH_LEVEL.REQUIRED)
+    async def admin(self):
+        return {'user': self.current_user}
+
+
+class HooksTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Accounts], authenticate=_authenticate,
+                           hooks=[_Tag('service')])
+
+    def fetch_json(self, path, **kwargs):
+        response = self.fetch(path, **kwargs)
+        return response.code, json.loads(response.body)
+
+    def test_required_auth_level(self):
+        self.assertEqual(self.fetch('/private/v1/me').code, 401)
+        self.assertEqual(self.fetch('/private/v1/me', headers={
+            'Authorization': 'Bearer wrong'}).code, 401)
+        self.assertEqual(
+            self.fetch_json('/private/v1/me', headers={
+                'Authorization': 'Bearer secret'}),
+            (200, {'user': 'alice', 'tags': ['service']}))
+
+    def test_optional_continue_auth_level(self):
+        self.assertEqual(
+            self.fetch_json('/private/v1/maybe', headers={
+                'Authorization': 'Bearer wrong'}),
+            (200, {'user': None, 'tags': ['service']}))
+
+    def test_after_hooks_run_innermost_first(self):
+        self.assertEqual(
+            self.fetch_json('/private/v1/tagged'),
+            (200, {'answered_by': 'method', 'tags': ['method', 'service']}))
+
+    def test_before_hook_answers_the_request(self):
+        self.assertEqual(
+            self.fetch_json('/private/v1/tagged?answer=hook'),
+            (200, {'answered_by': 'hook'}))
+
+    def test_other_services_do_not_change_the_hooks(self):
+        # Services sharing the resource class keep their own hooks.
+        RestService([Accounts])
+        RestService([Accounts], authenticate=_allow_everyone)
+        self.assertEqual(self.fetch('/private/v1/me').code, 401)
+        self.assertEqual(
+            self.fetch_json('/private/v1/me', headers={
+                'Authorization': 'Bearer secret'}),
+            (200, {'user': 'alice', 'tags': ['service']}))
+
+
+class HookLevelsTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Reports], authenticate=_authenticate,
+                           hooks=[_Tag('service'), _Served()])
+
+    def fetch_json(self, path, **kwargs):
+        response = self.fetch(path, **kwargs)
+        return response.code, json.loads(response.body)
+
+    def test_after_hooks_of_every_level_run_innermost_first(self):
+        self.assertEqual(
+            self.fetch_json('/reporting/v1/reports'),
+            (200, {'user': None,
+                   'tags': ['method', 'class', 'api', 'service']}))
+
+    def test_api_auth_level_is_optional(self):
+        response = self.fetch('/reporting/v1/reports', headers={
+            'Authorization': 'Bearer secret'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)['user'], 'alice')
+        self.assertEqual(response.headers['X-Served-To'], 'alice')
+        # Invalid credentials fail the request, the hooks are not called.
+        response = self.fetch('/reporting/v1/reports', headers={
+            'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.code, 401)
+        self.assertNotIn('X-Served-To', response.headers)
+
+    def test_method_auth_level_overrides_the_api_one(self):
+        response = self.fetch('/reporting/v1/reports/admin')
+        self.assertEqual(response.code, 401)
+        self.assertNotIn('X-Served-To', response.headers)
+        self.assertEqual(
+            self.fetch_json('/reporting/v1/reports/admin', headers={
+                'Authorization': 'Bearer secret'}),
+            (200, {'user': 'alice', 'tags': ['class', 'api', 'service']}))
+
+
+class AsyncAuthenticateTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Reports], authenticate=_authenticate_async,
+                           hooks=[_Served()])
+
+    def test_async_authenticate(self):
+        response = self.fetch('/reporting/v1/reports/admin', headers={
+            'X-User': 'bob'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body),
+                         {'user': 'bob', 'tags': ['class', 'api']})
+        self.assertEqual(response.headers['X-Served-To'], 'bob')
+        self.assertEqual(self.fetch('/reporting/v1/reports/admin').code, 401)
+        response = self.fetch('/reporting/v1/reports')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['X-Served-To'], '-')
@@ -0,0 +1,83 @@
+# standard library imports
+import json
+
+# third-party imports
+from tornado.testing import AsyncHTTPTestCase
+
+# application-specific imports
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+
+NUMBERS = list(range(5))
+
+
+@api(name='numbers', version='v1')
+class Numbers(RestResource):
+    @method(path='numbers', http_method='GET', paginate=True, page_size=2)
+    def list_numbers(self):
+        return NUMBERS[self.page.cursor:]
+
+    @method(path='cached', http_method='GET', paginate=True, page_size=2,
+            cache_ttl=60)
+    def list_cached(self):
+        return NUMBERS[self.page.cursor:]
+
+    @method(path='coalesced', http_method='GET', paginate=True,
+            page_size=2, coalesce=True, cache_ttl=60,
+            cache_key=lambda handler: 'all')
+    def list_coalesced(self):
+        return NUMBERS[self.page.cursor:]
+
+    @method(path='multiples', http_method='GET', cache_ttl=60)
+    def multiples(self, factor: int = 1):
+        return [number * factor for number in NUMBERS]
+
+
+class PaginationTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Numbers], cursor_secret='secret')
+
+    def fetch_json(self, path):
+        response = self.fetch(path)
+        self.assertEqual(response.code, 200, response.body)
+        return json.loads(response.body)
+
+    def read_pages(self, path):
+        pages = []
+        while path is not None and len(pages) < 10:
+            page = self.fetch_json(path)
+            pages.append(page['items'])
+            path = page['next']
+        return pages
+
+    def test_pages_follow_the_next_links(self):
+        self.assertEqual(self.read_pages('/numbers/v1/numbers'),
+                         [[0, 1], [2, 3], [4]])
+
+    def test_limit(self):
+        self.assertEqual(self.read_pages('/numbers/v1/numbers?limit=3'),
+                         [[0, 1, 2], [3, 4]])
+        self.assertEqual(self.fetch('/numbers/v1/numbers?limit=0').code, 400)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(
+            self.fetch('/numbers/v1/numbers?cursor=forged').code, 400)
+
+    def test_cached_pages_are_keyed_on_the_cursor(self):
+        for _ in range(2):
+            self.assertEqual(self.read_pages('/numbers/v1/cached'),
+                             [[0, 1], [2, 3], [4]])
+        self.assertEqual(self.read_pages('/numbers/v1/cached?limit=3'),
+                         [[0, 1, 2], [3, 4]])
+
+    def test_declared_key_functions_are_completed(self):
+        self.assertEqual(self.read_pages('/numbers/v1/coalesced'),
+                         [[0, 1], [2, 3], [4]])
+
+    def test_bound_arguments_complete_the_default_cache_key(self):
+        self.assertEqual(self.fetch_json('/numbers/v1/multiples?factor=2'),
+                         {'items': [0, 2, 4, 6, 8]})
+        self.assertEqual(self.fetch_json('/numbers/v1/multiples?factor=3'),
+                         {'items': [0, 3, 6, 9, 12]})
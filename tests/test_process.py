@@ -0,0 +1,110 @@
+# standard library imports
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import unittest
+import urllib.request
+
+# third-party imports
+
+# application-specific imports
+
+_SERVER = '''
+import asyncio
+import os
+import sys
+
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+
+
+@api(name='proc', version='v1')
+class Proc(RestResource):
+    @method(path='pid', http_method='GET')
+    async def pid(self):
+        return {'pid': os.getpid()}
+
+
+async def slow_start():
+    # Workers only accept connections once their resources started.
+    await asyncio.sleep(float(sys.argv[3]))
+    return object()
+
+
+RestService([Proc], resources={'slow': slow_start}).serve(
+    int(sys.argv[1]), address='127.0.0.1', processes=int(sys.argv[2]),
+    drain_timeout=1)
+'''
+
+
+def _unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid):
+    with open('/proc/%d/task/%d/children' % (pid, pid)) as children:
+        return set(int(child) for child in children.read().split())
+
+
+@unittest.skipUnless(os.path.exists('/proc/self/task'), 'Needs Linux /proc')
+class ServeTest(unittest.TestCase):
+    def start(self, processes, start_delay=0.0):
+        self.port = _unused_port()
+        self.process = subprocess.Popen(
+            [sys.executable, '-c', _SERVER, str(self.port), str(processes),
+             str(start_delay)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stderr=subprocess.DEVNULL)
+        self.addCleanup(self.stop)
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                return self.get_pid()
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(10)
+
+    def get_pid(self):
+        url = 'http://127.0.0.1:%d/proc/v1/pid' % self.port
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return json.loads(response.read())['pid']
+
+    def test_rolling_restart_serves_throughout(self):
+        self.start(2, start_delay=0.5)
+        supervisor = self.process.pid
+        old_workers = _children(supervisor)
+        self.assertEqual(len(old_workers), 2)
+        self.process.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 20
+        while True:
+            # Every request is served while the workers are replaced, none
+            # of them waits for a worker to start.
+            started = time.monotonic()
+            self.get_pid()
+            self.assertLess(time.monotonic() - started, 0.3)
+            workers = _children(supervisor)
+            if len(workers) == 2 and not workers & old_workers:
+                break
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+        self.assertIn(self.get_pid(), workers)
+
+    def test_single_process_ignores_sighup(self):
+        pid = self.start(1)
+        self.process.send_signal(signal.SIGHUP)
+        time.sleep(0.3)
+        self.assertIsNone(self.process.poll())
+        self.assertEqual(self.get_pid(), pid)
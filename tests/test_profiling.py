@@ -0,0 +1,128 @@
+# standard library imports
+import asyncio
+import glob
+import json
+import os
+import signal
+import tempfile
+import unittest
+
+# third-party imports
+from tornado.httpserver import HTTPServer
+from tornado.testing import AsyncHTTPTestCase
+from tornado.testing import gen_test
+
+# application-specific imports
+from tornado_restful import ApiConfigurationError
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+
+
+def _burn(count):
+    total = 0
+    for number in range(count):
+        total += number * number
+    return total
+
+
+@api(name='compute', version='v1')
+class Compute(RestResource):
+    @method(path='sum', http_method='GET')
+    def compute_sum(self):
+        return {'sum': _burn(200000)}
+
+
+class ProfilerConfigurationTest(unittest.TestCase):
+    def test_profiler_routes_need_a_token(self):
+        with self.assertRaises(ApiConfigurationError):
+            RestService([Compute], profiler_path='/_profiler')
+
+    def test_serving_signals_can_not_profile(self):
+        previous = signal.getsignal(signal.SIGHUP)
+        try:
+            service = RestService([Compute], profiler_signal=signal.SIGHUP)
+            with self.assertRaises(ApiConfigurationError):
+                service.serve(0, address='127.0.0.1', processes=2)
+        finally:
+            signal.signal(signal.SIGHUP, previous)
+
+
+class ProfilerSignalTest(AsyncHTTPTestCase):
+    def setUp(self):
+        self.previous_handler = signal.getsignal(signal.SIGUSR2)
+        super(ProfilerSignalTest, self).setUp()
+
+    def tearDown(self):
+        super(ProfilerSignalTest, self).tearDown()
+        signal.signal(signal.SIGUSR2, self.previous_handler)
+        pattern = os.path.join(tempfile.gettempdir(),
+                               'profile-%d-*' % os.getpid())
+        for path in glob.glob(pattern):
+            os.remove(path)
+
+    def get_app(self):
+        return RestService([Compute], profiler_signal=signal.SIGUSR2)
+
+    @gen_test
+    async def test_signal_toggles_the_profiling_on_the_loop(self):
+        profiler = self._app.profiler
+        os.kill(os.getpid(), signal.SIGUSR2)
+        # The handler only schedules the work on the loop.
+        self.assertEqual(profiler.sessions, {})
+        await asyncio.sleep(0.05)
+        self.assertEqual(list(profiler.sessions), ['compute.compute_sum'])
+        response = await self.http_client.fetch(
+            self.get_url('/compute/v1/sum'))
+        self.assertEqual(response.code, 200)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        await asyncio.sleep(0.05)
+        self.assertEqual(profiler.sessions, {})
+        self.assertTrue(glob.glob(os.path.join(
+            tempfile.gettempdir(), 'profile-%d-*.pstats' % os.getpid())))
+
+
+class ProfilerTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Compute], profiler_path='/_profiler',
+                           profiler_token='secret')
+
+    def get_http_server(self):
+        return HTTPServer(self._app, xheaders=True,
+                          **self.get_httpserver_options())
+
+    def fetch_admin(self, path, token='secret', **kwargs):
+        headers = kwargs.setdefault('headers', {})
+        if token is not None:
+            headers['Authorization'] = 'Bearer %s' % token
+        if kwargs.get('method') == 'POST':
+            kwargs.setdefault('body', b'')
+        return self.fetch('/_profiler' + path, **kwargs)
+
+    def test_requests_without_the_token_are_forbidden(self):
+        self.assertEqual(self.fetch_admin('', token=None).code, 403)
+        self.assertEqual(self.fetch_admin('', token='wrong').code, 403)
+        # Loopback clients, real or claimed, are no exception.
+        for header in ('X-Real-Ip', 'X-Forwarded-For'):
+            response = self.fetch_admin(
+                '/*?mode=cprofile', token=None, method='POST',
+                headers={header: '127.0.0.1'})
+            self.assertEqual(response.code, 403)
+        self.assertEqual(self._app.profiler.sessions, {})
+
+    def test_profile_a_method(self):
+        response = self.fetch_admin('/compute.compute_sum', method='POST')
+        self.assertEqual(response.code, 200, response.body)
+        for _ in range(10):
+            self.assertEqual(self.fetch('/compute/v1/sum').code, 200)
+        response = self.fetch_admin('/compute.compute_sum')
+        self.assertEqual(response.code, 200)
+        self.assertIn(b'_burn', response.body)
+        response = self.fetch_admin('/compute.compute_sum', method='DELETE')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(self.fetch_admin('').body)['sessions'],
+                         [])
+
+    def test_unknown_method(self):
+        self.assertEqual(self.fetch_admin('/nope', method='POST').code, 404)
@@ -0,0 +1,201 @@
+# standard library imports
+import json
+import unittest
+import uuid
+
+# third-party imports
+from tornado import gen
+from tornado.testing import AsyncHTTPTestCase
+
+# application-specific imports
+from tornado_restful import ApiConfigurationError
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+
+
+@api(name='shop', version='v1')
+class Items(RestResource):
+    @method(path='items', http_method='GET')
+    @gen.coroutine
+    def list_items(self):
+        return [1, 2, 3]
+
+    @method(path='items', http_method='POST')
+    async def create_item(self):
+        return {'created': self.request.body}
+
+    @method(path='items/new', http_method='GET')
+    def new_item(self):
+        return {'new': True}
+
+    @method(path='items/{id:int}', http_method='GET')
+    async def get_item(self, id):
+        return {'id': id, 'type': type(id).__name__}
+
+    @method(path='items/{id:int}', http_method='DELETE')
+    async def delete_item(self, id):
+        return {'deleted': id}
+
+
+@api(name='shop', version='v1')
+class Tags(RestResource):
+    @method(path='tags/{name}', http_method='GET')
+    async def get_tag(self, name):
+        return {'name': name}
+
+    @method(path='tags/{name}/{key:uuid}', http_method='GET')
+    async def get_tag_key(self, name, key):
+        return {'name': name, 'key': str(key),
+                'is_uuid': isinstance(key, uuid.UUID)}
+
+    @method(path='prices/{value:float}', http_method='GET')
+    async def get_price(self, value):
+        return {'value': value}
+
+
+class RoutingTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Items, Tags])
+
+    def fetch_json(self, path, **kwargs):
+        response = self.fetch(path, **kwargs)
+        return response.code, json.loads(response.body)
+
+    def test_list_response_is_wrapped(self):
+        self.assertEqual(self.fetch_json('/shop/v1/items'),
+                         (200, {'items': [1, 2, 3]}))
+
+    def test_post_body_is_decoded(self):
+        self.assertEqual(
+            self.fetch_json('/shop/v1/items', method='POST', body='{"a":1}'),
+            (200, {'created': {'a': 1}}))
+
+    def test_invalid_json_body(self):
+        response = self.fetch('/shop/v1/items', method='POST', body='{')
+        self.assertEqual(response.code, 400)
+
+    def test_literal_segment_wins_over_param(self):
+        self.assertEqual(self.fetch_json('/shop/v1/items/new'),
+                         (200, {'new': True}))
+
+    def test_int_param_is_converted(self):
+        self.assertEqual(self.fetch_json('/shop/v1/items/-12'),
+                         (200, {'id': -12, 'type': 'int'}))
+
+    def test_ill_typed_param_is_not_found(self):
+        for path in ('/shop/v1/items/abc', '/shop/v1/prices/1.x',
+                     '/shop/v1/tags/a/not-a-uuid',
+                     # Over the digits limit of int().
+                     '/shop/v1/items/' + '9' * 5000):
+            response = self.fetch(path)
+            self.assertEqual(response.code, 404, path)
+            self.assertEqual(response.headers['Content-Type'],
+                             'application/json')
+            self.assertEqual(json.loads(response.body),
+                             {'code': 404, 'reason': 'Not Found'})
+
+    def test_float_and_uuid_params(self):
+        self.assertEqual(self.fetch_json('/shop/v1/prices/2.5'),
+                         (200, {'value': 2.5}))
+        key = '12345678-1234-1234-1234-123456789abc'
+        self.assertEqual(
+            self.fetch_json('/shop/v1/tags/a/%s' % key),
+            (200, {'name': 'a', 'key': key, 'is_uuid': True}))
+
+    def test_str_param_is_unquoted(self):
+        self.assertEqual(self.fetch_json('/shop/v1/tags/a%20b'),
+                         (200, {'name': 'a b'}))
+
+    def test_unknown_path_is_not_found(self):
+        self.assertEqual(self.fetch_json('/shop/v1/unknown'),
+                         (404, {'code': 404, 'reason': 'Not Found'}))
+        self.assertEqual(self.fetch_json('/shop/v1/items/1/2'),
+                         (404, {'code': 404, 'reason': 'Not Found'}))
+
+    def test_unknown_verb_of_a_path_is_not_allowed(self):
+        response = self.fetch('/shop/v1/items/1', method='PUT', body='{}')
+        self.assertEqual(response.code, 405)
+        self.assertEqual(json.loads(response.body),
+                         {'code': 405, 'reason': 'Method Not Allowed'})
+        # Decisions are cached, the second answer must be the same.
+        response = self.fetch('/shop/v1/items/1', method='PUT', body='{}')
+        self.assertEqual(response.code, 405)
+        self.assertEqual(self.fetch('/shop/v1/items/new',
+                                    method='DELETE').code, 405)
+
+    def test_options_lists_allowed_methods(self):
+        response = self.fetch('/shop/v1/items/1', method='OPTIONS')
+        self.assertEqual(response.code, 204)
+        self.assertEqual(response.headers['Allow'], 'DELETE, GET, HEAD')
+
+    def test_head_is_served_by_get(self):
+        response = self.fetch('/shop/v1/items/1', method='HEAD')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.body, b'')
+
+
+@api(name='files', version='v1')
+class Files(RestResource):
+    @method(path='files/latest', http_method='GET')
+    def get_latest(self):
+        return {'latest': True}
+
+    @method(path='files/{name}', http_method='PUT')
+    def put_file(self, name):
+        return {'put': name}
+
+
+class RouteTableTest(unittest.TestCase):
+    def setUp(self):
+        self.route_table = RestService([Items, Files]).route_table
+
+    def test_routes_of_every_resource_are_looked_up(self):
+        route, params_values, status_code = self.route_table.lookup(
+            'GET', '/shop/v1/items/7')
+        self.assertEqual((route.method_id, params_values, status_code),
+                         ('shop.get_item', [7], None))
+        route, params_values, _ = self.route_table.lookup(
+            'GET', '/files/v1/files/latest')
+        self.assertEqual(route.method_id, 'files.get_latest')
+
+    def test_params_serve_the_verbs_of_literal_segments(self):
+        route, params_values, _ = self.route_table.lookup(
+            'PUT', '/files/v1/files/latest')
+        self.assertEqual((route.method_id, params_values),
+                         ('files.put_file', ['latest']))
+
+    def test_misses_are_cached(self):
+        for _ in range(2):
+            route, _, status_code = self.route_table.lookup(
+                'POST', '/files/v1/files/latest')
+            self.assertEqual(status_code, 405)
+            self.assertIsNotNone(route)
+            self.assertEqual(
+                self.route_table.lookup('GET', '/files/v1/unknown'),
+                (None, (), 404))
+        self.assertEqual(self.route_table.lookup('GET', 'relative'),
+                         (None, (), 404))
+
+    def test_allowed_methods(self):
+        self.assertEqual(
+            self.route_table.allowed_methods('/files/v1/files/latest'),
+            ['GET', 'HEAD', 'PUT'])
+        self.assertEqual(self.route_table.allowed_methods('/unknown'), [])
+
+
+class RouteConfigurationTest(unittest.TestCase):
+    def test_unknown_param_type(self):
+        @api(name='bad', version='v1')
+        class Bad(RestResource):
+            @method(path='items/{id:complex}', http_method='GET')
+            def get_item(self, id):
+                return {}
+
+        with self.assertRaises(ApiConfigurationError):
+            RestService([Bad])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,836 @@
+# standard library imports
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+import typing
+import unittest
+import uuid
+
+# third-party imports
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.tcpclient import TCPClient
+from tornado.testing import AsyncHTTPTestCase
+from tornado.testing import ExpectLog
+from tornado.testing import gen_test
+
+# application-specific imports
+from tornado_restful import ApiConfigurationError
+from tornado_restful import Broadcast
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import ServerSentEvent
+from tornado_restful import api
+from tornado_restful import method
+
+
+@api(name='store', version='v1')
+class Store(RestResource):
+    @method(path='items', http_method='POST')
+    async def create_item(self):
+        return {'created': True}
+
+    @method(path='files', http_method='POST', stream_body=True,
+            content_type='application/octet-stream')
+    async def upload(self):
+        size = 0
+        async for chunk in self.body_stream:
+            size += len(chunk)
+        return {'size': size}
+
+    @method(path='events', http_method='GET', stream='sse')
+    async def events(self):
+        while True:
+            yield {'tick': True}
+            await asyncio.sleep(0.05)
+
+
+@api(name='catalog', version='v1')
+class Catalog(RestResource):
+    calls = 0
+
+    @method(path='products/{id:int}', http_method='GET', cache_ttl=60)
+    async def get_product(self, id):
+        Catalog.calls += 1
+        return {'id': id, 'call': Catalog.calls}
+
+    @method(path='quotes', http_method='GET', cache_ttl=0.1)
+    async def get_quotes(self):
+        Catalog.calls += 1
+        return {'call': Catalog.calls}
+
+    @method(path='retired/{id:int}', http_method='GET', cache_ttl=60)
+    async def get_retired(self, id):
+        Catalog.calls += 1
+        self.set_status(404)
+        self.set_header('X-Retired-Since', '2020')
+        return {'id': id, 'call': Catalog.calls}
+
+
+@api(name='styles', version='v1')
+class Styles(RestResource):
+    @method(path='plain', http_method='GET')
+    def plain(self):
+        return {'style': 'plain'}
+
+    @method(path='native', http_method='GET')
+    async def native(self):
+        await asyncio.sleep(float(self.get_query_argument('sleep', 0)))
+        return {'style': 'native'}
+
+    @method(path='decorated', http_method='GET')
+    @gen.coroutine
+    def decorated(self):
+        yield gen.sleep(0)
+        return {'style': 'decorated'}
+
+    @method(path='future', http_method='GET')
+    def future(self):
+        future = Future()
+        asyncio.get_running_loop().call_later(
+            0.01, future.set_result, {'style': 'future'})
+        return future
+
+
+def _greet(self, name):
+    return {'greeting': 'hello %s' % name, 'verb': self.request.method}
+
+
+@api(name='greetings', version='v1')
+class Greetings(RestResource):
+    # One function exposed by two methods.
+    get_greeting = method(path='greetings/{name}', http_method='GET',
+                          name='get_greeting')(_greet)
+    post_greeting = method(path='greetings/{name}', http_method='POST',
+                           name='post_greeting')(_greet)
+
+
+@api(name='jobs', version='v1')
+class Jobs(RestResource):
+    @method(path='thread', http_method='GET', executor='thread')
+    def in_thread(self):
+        time.sleep(float(self.get_query_argument('sleep', 0)))
+        return {'thread': threading.current_thread().name}
+
+    @method(path='serial', http_method='GET', executor='serial')
+    def serial(self):
+        time.sleep(0.1)
+        return {}
+
+    @method(path='process', http_method='GET', executor='process')
+    def in_process(self):
+        return {'pid': os.getpid(), 'path': self.request.path}
+
+    @method(path='loop', http_method='GET')
+    def on_loop(self):
+        return {'thread': threading.current_thread().name}
+
+
+@api(name='search', version='v1')
+class Search(RestResource):
+    @method(path='items/{category}', http_method='GET')
+    async def search(self, category, limit: int, exact=False,
+                     tags: typing.List[str] = None,
+                     after: typing.Optional[uuid.UUID] = None):
+        return {'category': category, 'limit': limit, 'exact': exact,
+                'tags': tags, 'after': after and str(after)}
+
+    @method(path='orders', http_method='POST')
+    async def create_order(self, quantity: int, notes: typing.List[str]):
+        return {'quantity': quantity, 'notes': notes}
+
+
+@dataclasses.dataclass
+class Address:
+    city: str
+    zip_code: typing.Optional[str] = None
+
+
+_ORDER_SCHEMA = {
+    'type': 'object',
+    'required': ['quantity'],
+    'properties': {
+        'quantity': {'type': 'integer', 'minimum': 1},
+        'items': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'additionalProperties': False,
+}
+
+
+@api(name='checked', version='v1')
+class Checked(RestResource):
+    @method(path='orders', http_method='POST', request_schema=_ORDER_SCHEMA)
+    async def create_order(self):
+        return {'quantity': self.request.body['quantity']}
+
+    @method(path='addresses', http_method='POST', request_schema=Address)
+    async def create_address(self):
+        return self.request.body
+
+    @method(path='broken', http_method='GET',
+            response_schema={'type': 'object',
+                             'properties': {'id': {'type': 'integer'}}})
+    async def broken(self):
+        return {'id': 'not an integer'}
+
+
+@api(name='timed', version='v1')
+class Timed(RestResource):
+    @method(path='reports/{name}', http_method='GET')
+    async def get_report(self, name):
+        await asyncio.sleep(0.1)
+        return {'name': name}
+
+    @method(path='ping', http_method='GET')
+    async def ping(self):
+        return {}
+
+    @method(path='export', http_method='GET', slow_threshold=10)
+    async def export(self):
+        await asyncio.sleep(0.1)
+        return {}
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super(_Records, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class _Pool(object):
+    def __init__(self, events):
+        self.events = events
+        self.healthy = True
+        events.append('created')
+
+    def warmup(self):
+        self.events.append('warmed up')
+
+    def check(self):
+        return self.healthy
+
+    async def close(self):
+        self.events.append('closed pool')
+
+
+@api(name='pooled', version='v1')
+class Pooled(RestResource):
+    @method(path='pool', http_method='GET', inject=['pool', 'settings'])
+    async def read(self, pool, settings):
+        return {'pool': id(pool), 'settings': settings}
+
+
+news = Broadcast(history=10)
+
+
+@api(name='live', version='v1')
+class Live(RestResource):
+    @method(path='countdown', http_method='GET', stream='sse')
+    def countdown(self):
+        yield ServerSentEvent('two\nlines', event='tick', id='1', retry=500)
+        yield {'left': 0}
+
+    @method(path='idle', http_method='GET', stream='sse', keepalive=0.05)
+    async def idle(self):
+        await asyncio.sleep(10)
+        yield {}
+
+    @method(path='news', http_method='GET', stream='sse')
+    def news(self):
+        return news.subscribe(self.last_event_id)
+
+
+@api(name='bounded', version='v1')
+class Bounded(RestResource):
+    @method(path='bounded', http_method='GET', timeout=0.2)
+    async def bounded(self):
+        await asyncio.sleep(float(self.get_query_argument('sleep')))
+        return {'left': self.remaining_time() > 0}
+
+    @method(path='unbounded', http_method='GET')
+    async def unbounded(self):
+        await asyncio.sleep(float(self.get_query_argument('sleep')))
+        return {}
+
+
+async def _wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError('Condition not met in %ss' % timeout)
+        await asyncio.sleep(0.01)
+
+
+class RequestsInFlightTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Store])
+
+    async def _open(self, request):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(request)
+        await _wait_for(lambda: self._app.requests_in_flight >= 1)
+        return stream
+
+    @gen_test
+    async def test_finished_requests_are_not_in_flight(self):
+        response = await self.http_client.fetch(
+            self.get_url('/store/v1/items'), method='POST', body='{}')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(self._app.requests_in_flight, 0)
+
+    @gen_test
+    async def test_aborted_uploads_are_not_in_flight(self):
+        for _ in range(3):
+            stream = await self._open(
+                b'POST /store/v1/items HTTP/1.1\r\nHost: localhost\r\n'
+                b'Content-Length: 100000\r\n\r\n{"a":')
+            stream.close()
+            await _wait_for(lambda: self._app.requests_in_flight == 0)
+
+    @gen_test
+    async def test_aborted_streamed_uploads_are_not_in_flight(self):
+        stream = await self._open(
+            b'POST /store/v1/files HTTP/1.1\r\nHost: localhost\r\n'
+            b'Content-Type: application/octet-stream\r\n'
+            b'Content-Length: 100000\r\n\r\n' + b'x' * 1000)
+        stream.close()
+        await _wait_for(lambda: self._app.requests_in_flight == 0)
+
+    @gen_test
+    async def test_closed_event_streams_are_not_in_flight(self):
+        stream = await self._open(
+            b'GET /store/v1/events HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        await stream.read_until(b'\n\n')
+        stream.close()
+        await _wait_for(lambda: self._app.requests_in_flight == 0)
+
+
+class ResponseCacheTest(AsyncHTTPTestCase):
+    def setUp(self):
+        super(ResponseCacheTest, self).setUp()
+        Catalog.calls = 0
+        # The caches belong to the routes of the class, not to the service.
+        self._app.invalidate_cache('catalog.get_product')
+        self._app.invalidate_cache('catalog.get_quotes')
+        self._app.invalidate_cache('catalog.get_retired')
+
+    def get_app(self):
+        return RestService([Catalog])
+
+    def test_hits_skip_the_method(self):
+        first = self.fetch('/catalog/v1/products/1')
+        second = self.fetch('/catalog/v1/products/1')
+        self.assertEqual(json.loads(second.body), {'id': 1, 'call': 1})
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(first.headers['Etag'], second.headers['Etag'])
+        other = self.fetch('/catalog/v1/products/2')
+        self.assertEqual(json.loads(other.body), {'id': 2, 'call': 2})
+        self.assertNotEqual(other.headers['Etag'], first.headers['Etag'])
+
+    def test_if_none_match_is_answered_with_304(self):
+        etag = self.fetch('/catalog/v1/products/1').headers['Etag']
+        response = self.fetch('/catalog/v1/products/1',
+                              headers={'If-None-Match': etag})
+        self.assertEqual(response.code, 304)
+        self.assertEqual(response.body, b'')
+        response = self.fetch('/catalog/v1/products/1',
+                              headers={'If-None-Match': '"stale"'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(Catalog.calls, 1)
+
+    def test_hits_keep_the_status_and_headers_of_the_method(self):
+        for _ in range(2):
+            response = self.fetch('/catalog/v1/retired/1')
+            self.assertEqual(response.code, 404)
+            self.assertEqual(response.headers['X-Retired-Since'], '2020')
+            self.assertEqual(json.loads(response.body), {'id': 1, 'call': 1})
+        # Only 200s are revalidated.
+        response = self.fetch('/catalog/v1/retired/1', headers={
+            'If-None-Match': response.headers['Etag']})
+        self.assertEqual(response.code, 404)
+        self.assertEqual(Catalog.calls, 1)
+
+    def test_invalidation_and_expiry(self):
+        self.fetch('/catalog/v1/products/1')
+        self.fetch('/catalog/v1/products/2')
+        self._app.invalidate_cache('catalog.get_product', [1])
+        self.fetch('/catalog/v1/products/1')
+        self.fetch('/catalog/v1/products/2')
+        self.assertEqual(Catalog.calls, 3)
+        self.fetch('/catalog/v1/quotes')
+        self.fetch('/catalog/v1/quotes')
+        self.assertEqual(Catalog.calls, 4)
+        time.sleep(0.15)
+        response = self.fetch('/catalog/v1/quotes')
+        self.assertEqual(json.loads(response.body), {'call': 5})
+
+
+class MethodStylesTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Styles])
+
+    def test_every_method_style_is_served(self):
+        for style in ('plain', 'native', 'decorated', 'future'):
+            response = self.fetch('/styles/v1/' + style)
+            self.assertEqual(response.code, 200, style)
+            self.assertEqual(json.loads(response.body), {'style': style})
+
+    @gen_test
+    async def test_async_methods_run_concurrently(self):
+        started = time.monotonic()
+        responses = await asyncio.gather(*[
+            self.http_client.fetch(self.get_url(
+                '/styles/v1/native?sleep=0.2')) for _ in range(5)])
+        self.assertEqual([response.code for response in responses],
+                         [200] * 5)
+        self.assertLess(time.monotonic() - started, 0.6)
+
+
+class ReusedFunctionTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Greetings])
+
+    def test_each_decoration_keeps_its_configuration(self):
+        for verb, body in (('GET', None), ('POST', '{}')):
+            response = self.fetch('/greetings/v1/greetings/bob', method=verb,
+                                  body=body)
+            self.assertEqual(json.loads(response.body),
+                             {'greeting': 'hello bob', 'verb': verb})
+        self.assertEqual(Greetings.get_greeting.method_info.http_method,
+                         'GET')
+        self.assertFalse(hasattr(_greet, 'method_info'))
+
+    def test_stacked_decorations_are_refused(self):
+        with self.assertRaises(ApiConfigurationError):
+            @method(path='a', http_method='GET')
+            @method(path='b', http_method='GET')
+            def greet(self):
+                return {}
+
+
+class ExecutorTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Jobs], executors={'serial': ('thread', 1)})
+
+    def tearDown(self):
+        self._app.shutdown_executors()
+        super(ExecutorTest, self).tearDown()
+
+    @gen_test
+    async def test_blocking_methods_do_not_block_the_loop(self):
+        slow = asyncio.ensure_future(self.http_client.fetch(
+            self.get_url('/jobs/v1/thread?sleep=0.3')))
+        await asyncio.sleep(0.05)
+        response = await self.http_client.fetch(self.get_url('/jobs/v1/loop'))
+        self.assertFalse(slow.done())
+        self.assertEqual(json.loads(response.body),
+                         {'thread': threading.current_thread().name})
+        response = await slow
+        self.assertTrue(json.loads(response.body)['thread'].startswith(
+            'tornado-restful-thread'))
+
+    @gen_test
+    async def test_named_pools_bound_the_concurrency(self):
+        started = time.monotonic()
+        await asyncio.gather(*[
+            self.http_client.fetch(self.get_url('/jobs/v1/serial'))
+            for _ in range(3)])
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        stats = self._app.executor_stats()['serial']
+        self.assertEqual((stats['max_workers'], stats['submitted'],
+                          stats['completed'], stats['in_flight']),
+                         (1, 3, 3, 0))
+        self.assertEqual(stats['peak_in_flight'], 3)
+
+    def test_process_pool_methods_get_a_request_snapshot(self):
+        response = self.fetch('/jobs/v1/process')
+        self.assertEqual(response.code, 200)
+        document = json.loads(response.body)
+        self.assertNotEqual(document['pid'], os.getpid())
+        self.assertEqual(document['path'], '/jobs/v1/process')
+
+
+class ExecutorConfigurationTest(unittest.TestCase):
+    def test_async_methods_can_not_run_in_an_executor(self):
+        with self.assertRaises(ApiConfigurationError):
+            @api(name='bad', version='v1')
+            class Bad(RestResource):
+                @method(path='x', http_method='GET', executor='thread')
+                async def x(self):
+                    return {}
+
+            RestService([Bad])
+
+    def test_unknown_pool(self):
+        with self.assertRaises(ApiConfigurationError):
+            RestService([Jobs], executors={'serial': 'fiber'})
+
+
+class MetricsTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Store], metrics_path='/metrics')
+
+    def scrape(self):
+        response = self.fetch('/metrics')
+        self.assertEqual(response.code, 200)
+        self.assertTrue(response.headers['Content-Type'].startswith(
+            'text/plain'))
+        samples = {}
+        for line in response.body.decode('utf-8').splitlines():
+            if line and not line.startswith('#'):
+                name, _, value = line.rpartition(' ')
+                samples[name] = float(value)
+        return samples
+
+    def test_chunked_bodies_are_measured(self):
+        async def produce(write):
+            for _ in range(3):
+                await write(b'x' * 100)
+
+        response = self.fetch('/store/v1/files', method='POST',
+                              body_producer=produce, headers={
+                                  'Content-Type': 'application/octet-stream'})
+        self.assertEqual(json.loads(response.body), {'size': 300})
+        self.assertEqual(self.scrape()[
+            'restful_request_bytes_total{method_id="store.upload",'
+            'code="200"}'], 300)
+
+    def test_exposition_of_the_method_metrics(self):
+        for body in ('{}', '{}', '{'):
+            self.fetch('/store/v1/items', method='POST', body=body)
+        self.assertEqual(self.fetch('/store/v1/unknown').code, 404)
+        samples = self.scrape()
+        labels = 'method_id="store.create_item",code="%d"'
+        self.assertEqual(
+            samples['restful_requests_total{%s}' % (labels % 200)], 2)
+        self.assertEqual(
+            samples['restful_requests_total{%s}' % (labels % 400)], 1)
+        self.assertEqual(samples[
+            'restful_request_duration_seconds_count{%s}' % (labels % 200)], 2)
+        self.assertEqual(samples[
+            'restful_request_duration_seconds_bucket{%s,le="+Inf"}' % (
+                labels % 200)], 2)
+        self.assertEqual(samples[
+            'restful_request_bytes_total{%s}' % (labels % 200)], 4)
+        self.assertGreater(samples[
+            'restful_response_bytes_total{%s}' % (labels % 200)], 0)
+        self.assertEqual(samples[
+            'restful_requests_in_flight{method_id="store.create_item"}'], 0)
+        self.assertIn('restful_executor_completed_total{pool="thread"}',
+                      samples)
+        # Unrouted requests have no method.
+        self.assertFalse([name for name in samples if 'unknown' in name])
+
+
+class BindingTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Search])
+
+    def fetch_json(self, path, **kwargs):
+        response = self.fetch(path, **kwargs)
+        return response.code, json.loads(response.body)
+
+    def test_query_arguments_are_coerced(self):
+        key = uuid.uuid4()
+        self.assertEqual(
+            self.fetch_json('/search/v1/items/books?limit=5&exact=yes'
+                            '&tags=a&tags=b&after=%s' % key),
+            (200, {'category': 'books', 'limit': 5, 'exact': True,
+                   'tags': ['a', 'b'], 'after': str(key)}))
+        self.assertEqual(
+            self.fetch_json('/search/v1/items/books?limit=1'),
+            (200, {'category': 'books', 'limit': 1, 'exact': False,
+                   'tags': None, 'after': None}))
+
+    def test_body_fields_are_bound(self):
+        self.assertEqual(
+            self.fetch_json('/search/v1/orders', method='POST',
+                            body='{"quantity": 2, "notes": ["gift"]}'),
+            (200, {'quantity': 2, 'notes': ['gift']}))
+        # Query arguments win over the body fields.
+        self.assertEqual(
+            self.fetch_json('/search/v1/orders?quantity=3', method='POST',
+                            body='{"quantity": 2, "notes": []}'),
+            (200, {'quantity': 3, 'notes': []}))
+
+    def test_invalid_and_missing_parameters(self):
+        code, error = self.fetch_json(
+            '/search/v1/items/books?limit=many&exact=maybe')
+        self.assertEqual(code, 400)
+        self.assertEqual(error['message'], 'Invalid parameters')
+        self.assertEqual(error['errors'], [
+            {'name': 'limit', 'in': 'query',
+             'message': 'expected an integer'},
+            {'name': 'exact', 'in': 'query',
+             'message': 'expected a boolean'}])
+        code, error = self.fetch_json(
+            '/search/v1/orders', method='POST',
+            body='{"quantity": true, "notes": "gift"}')
+        self.assertEqual(code, 400)
+        self.assertEqual(error['errors'], [
+            {'name': 'quantity', 'in': 'body',
+             'message': 'expected an integer'},
+            {'name': 'notes', 'in': 'body', 'message': 'expected an array'}])
+        code, error = self.fetch_json('/search/v1/items/books')
+        self.assertEqual(error['errors'], [
+            {'name': 'limit', 'in': 'query', 'message': 'missing'}])
+
+
+class SchemaValidationTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Checked], response_validation=1.0)
+
+    def post(self, path, document):
+        response = self.fetch(path, method='POST', body=json.dumps(document))
+        return response.code, json.loads(response.body)
+
+    def test_valid_bodies_reach_the_method(self):
+        self.assertEqual(
+            self.post('/checked/v1/orders', {'quantity': 2, 'items': ['a']}),
+            (200, {'quantity': 2}))
+        self.assertEqual(
+            self.post('/checked/v1/addresses', {'city': 'Lyon'}),
+            (200, {'city': 'Lyon'}))
+
+    def test_invalid_bodies_are_answered_with_400(self):
+        for document, path, message in (
+                ({}, '$.quantity', 'missing'),
+                ({'quantity': 0}, '$.quantity', 'less than 1'),
+                ({'quantity': True}, '$.quantity', 'expected integer'),
+                ({'quantity': 1, 'items': ['a', 2]}, '$.items[1]',
+                 'expected string'),
+                ({'quantity': 1, 'extra': 1}, '$.extra',
+                 'unexpected property')):
+            code, error = self.post('/checked/v1/orders', document)
+            self.assertEqual(code, 400, document)
+            self.assertEqual(error['message'], 'Invalid body')
+            self.assertEqual(error['errors'],
+                             [{'path': path, 'message': message}], document)
+        code, error = self.post('/checked/v1/addresses', {'zip_code': '1'})
+        self.assertEqual((code, error['errors']), (
+            400, [{'path': '$.city', 'message': 'missing'}]))
+
+    def test_invalid_responses_are_logged_and_counted(self):
+        with ExpectLog('tornado_restful.apiserving',
+                       r'Invalid response of checked.broken at \$.id'):
+            response = self.fetch('/checked/v1/broken')
+        # Outside debug mode the response is still sent.
+        self.assertEqual(response.code, 200)
+        self.assertIn('restful_invalid_responses_total'
+                      '{method_id="checked.broken"} 1',
+                      self._app.metrics.render())
+
+
+class RequestTimingTest(AsyncHTTPTestCase):
+    def setUp(self):
+        super(RequestTimingTest, self).setUp()
+        self.slow_requests = _Records()
+        logger = logging.getLogger('tornado_restful.slow_requests')
+        logger.addHandler(self.slow_requests)
+        self.addCleanup(logger.removeHandler, self.slow_requests)
+
+    def get_app(self):
+        return RestService([Timed], server_timing=True,
+                           slow_request_threshold=0.05)
+
+    def server_timing(self, response):
+        phases = {}
+        for item in response.headers['Server-Timing'].split(', '):
+            name, _, duration = item.partition(';dur=')
+            phases[name] = float(duration)
+        return phases
+
+    def test_server_timing_header(self):
+        response = self.fetch('/timed/v1/reports/daily')
+        self.assertEqual(response.code, 200)
+        phases = self.server_timing(response)
+        self.assertEqual(list(phases),
+                         ['route', 'queue', 'method', 'write', 'total'])
+        self.assertGreaterEqual(phases['method'], 100)
+        self.assertGreaterEqual(phases['total'], phases['method'])
+
+    def test_slow_requests_are_logged_with_their_phases(self):
+        self.fetch('/timed/v1/reports/daily')
+        self.fetch('/timed/v1/ping')
+        # Methods with their own threshold use it.
+        self.fetch('/timed/v1/export')
+        self.assertEqual(len(self.slow_requests.records), 1)
+        record = self.slow_requests.records[0].slow_request
+        self.assertEqual(record['method_id'], 'timed.get_report')
+        self.assertEqual(record['path_params'], {'name': 'daily'})
+        self.assertEqual(record['status'], 200)
+        self.assertGreaterEqual(record['duration'], 0.1)
+        self.assertGreaterEqual(record['phases']['method'], 0.1)
+
+
+class UntimedRequestTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Timed])
+
+    def test_no_server_timing_by_default(self):
+        response = self.fetch('/timed/v1/ping')
+        self.assertEqual(response.code, 200)
+        self.assertNotIn('Server-Timing', response.headers)
+
+
+class SharedResourcesTest(AsyncHTTPTestCase):
+    def get_app(self):
+        self.events = []
+
+        async def load_settings():
+            self.events.append('loaded settings')
+            return {'region': 'eu'}
+
+        return RestService(
+            [Pooled], health_path='/health', resources={
+                'pool': lambda: _Pool(self.events),
+                'settings': {
+                    'factory': load_settings,
+                    'close': lambda settings: self.events.append(
+                        'closed settings')}})
+
+    def test_resources_are_created_once_and_injected(self):
+        first = json.loads(self.fetch('/pooled/v1/pool').body)
+        second = json.loads(self.fetch('/pooled/v1/pool').body)
+        self.assertEqual(first, second)
+        self.assertEqual(first['settings'], {'region': 'eu'})
+        self.assertEqual(self.events,
+                         ['created', 'warmed up', 'loaded settings'])
+        self.io_loop.run_sync(self._app.close_resources)
+        self.assertEqual(self.events[3:], ['closed settings', 'closed pool'])
+
+    def test_health_checks(self):
+        response = self.fetch('/health')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Cache-Control'], 'no-store')
+        self.assertEqual(json.loads(response.body), {
+            'status': 'ok', 'resources': {'pool': 'ok', 'settings': 'ok'}})
+        self._app.resources['pool'].healthy = False
+        response = self.fetch('/health')
+        self.assertEqual(response.code, 503)
+        self.assertEqual(json.loads(response.body), {
+            'status': 'unhealthy',
+            'resources': {'pool': 'check failed', 'settings': 'ok'}})
+
+    def test_unknown_resources_can_not_be_injected(self):
+        with self.assertRaises(ApiConfigurationError):
+            RestService([Pooled], resources={'pool': dict})
+
+
+class EventStreamTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Live])
+
+    async def _open(self, path, headers=b''):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(b'GET /live/v1/%s HTTP/1.1\r\nHost: localhost\r\n'
+                           b'%s\r\n' % (path.encode('ascii'), headers))
+        response_headers = await stream.read_until(b'\r\n\r\n')
+        self.assertIn(b'Content-Type: text/event-stream', response_headers)
+        self.assertIn(b'Cache-Control: no-cache', response_headers)
+        return stream
+
+    async def _read_event(self, stream):
+        # Chunked transfer: a size line, the event, then a blank line.
+        await stream.read_until(b'\r\n')
+        event = await stream.read_until(b'\n\n')
+        await stream.read_until(b'\r\n')
+        return event
+
+    def test_events_of_a_generator(self):
+        response = self.fetch('/live/v1/countdown')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(
+            response.body,
+            b'id: 1\nevent: tick\nretry: 500\ndata: two\ndata: lines\n\n'
+            b'data: ' + self._app.json_codec.encode({'left': 0}) + b'\n\n')
+
+    def test_line_breaks_in_event_fields(self):
+        with self.assertRaises(ValueError):
+            ServerSentEvent('data', event='a\nb').encode(
+                self._app.json_codec)
+
+    def test_only_line_feeds_and_carriage_returns_split_data(self):
+        event = ServerSentEvent(u'a\u2028b\x0cc\r\nd\re\n')
+        self.assertEqual(
+            event.encode(self._app.json_codec),
+            u'data: a\u2028b\x0cc\ndata: d\ndata: e\ndata: \n\n'.encode(
+                'utf-8'))
+
+    @gen_test
+    async def test_idle_streams_send_keepalives(self):
+        stream = await self._open('idle')
+        self.assertEqual(await self._read_event(stream), b': keepalive\n\n')
+        stream.close()
+
+    @gen_test
+    async def test_broadcast_events_and_resumption(self):
+        first = await self._open('news')
+        await _wait_for(lambda: len(news) == 1)
+        news.publish({'title': 'one'}, id='a')
+        news.publish('two', event='update', id='b')
+        self.assertEqual(await self._read_event(first), b'id: a\ndata: ' +
+                         self._app.json_codec.encode({'title': 'one'}) +
+                         b'\n\n')
+        self.assertEqual(await self._read_event(first),
+                         b'id: b\nevent: update\ndata: two\n\n')
+        # A resuming client gets the events published after its last one.
+        resumed = await self._open('news', b'Last-Event-ID: a\r\n')
+        self.assertEqual(await self._read_event(resumed),
+                         b'id: b\nevent: update\ndata: two\n\n')
+        first.close()
+        resumed.close()
+        await _wait_for(lambda: len(news) == 0)
+
+
+class DeadlineTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Bounded], deadline_header='X-Request-Timeout',
+                           metrics_path='/metrics')
+
+    def fetch_code(self, path, timeout):
+        return self.fetch(path, headers={'X-Request-Timeout': timeout}).code
+
+    def test_client_deadline_shortens_the_method_timeout(self):
+        self.assertEqual(
+            self.fetch_code('/bounded/v1/bounded?sleep=0.1', '0.05'), 504)
+        self.assertEqual(
+            self.fetch_code('/bounded/v1/bounded?sleep=0.1', '1'), 200)
+        self.assertEqual(
+            self.fetch_code('/bounded/v1/unbounded?sleep=0.1', '0.05'), 504)
+
+    def test_client_deadline_does_not_extend_the_method_timeout(self):
+        self.assertEqual(
+            self.fetch_code('/bounded/v1/bounded?sleep=0.4', '10'), 504)
+
+    def test_invalid_client_deadlines_are_answered_with_400(self):
+        for timeout in ('nan', 'inf', '0', '-1', 'soon'):
+            response = self.fetch('/bounded/v1/bounded?sleep=0', headers={
+                'X-Request-Timeout': timeout})
+            self.assertEqual(response.code, 400, timeout)
+            error = json.loads(response.body)
+            self.assertEqual(error['message'], 'Invalid deadline')
+            self.assertEqual(error['errors'], [{
+                'path': 'X-Request-Timeout',
+                'message': 'Expecting a positive number of seconds'}])
+        self.assertIn('restful_requests_in_flight'
+                      '{method_id="bounded.bounded"} 0',
+                      self._app.metrics.render())
+
+
+class DefaultDeadlineTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Bounded])
+
+    def test_client_deadlines_are_ignored(self):
+        for timeout in ('0.01', 'nan', '0'):
+            response = self.fetch('/bounded/v1/unbounded?sleep=0.05',
+                                  headers={'X-Request-Timeout': timeout})
+            self.assertEqual(response.code, 200, timeout)
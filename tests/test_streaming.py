@@ -0,0 +1,258 @@
+# standard library imports
+import asyncio
+import gc
+import json
+import time
+import unittest
+
+# third-party imports
+from tornado.tcpclient import TCPClient
+from tornado.testing import AsyncHTTPTestCase
+from tornado.testing import ExpectLog
+from tornado.testing import gen_test
+
+# application-specific imports
+from tornado_restful import RestResource
+from tornado_restful import RestService
+from tornado_restful import api
+from tornado_restful import method
+from tornado_restful.api_streaming import _JsonStreamParser
+
+
+def _parse(data, chunk_size=None, framing=None):
+    parser = _JsonStreamParser(framing)
+    records = []
+    chunk_size = chunk_size or len(data) or 1
+    for start in range(0, len(data), chunk_size):
+        records += parser.feed(data[start:start + chunk_size])
+    records += parser.feed(b'', final=True)
+    return records
+
+
+class JsonStreamParserTest(unittest.TestCase):
+    def test_array_and_ndjson_bodies(self):
+        array = b'[{"a": [1, {"b": "]}"}]}, "x\\"y", 2.5, null, true]'
+        ndjson = b'{"a": 1}\n"x"\n-3\n{"b": "{\\n"}\n'
+        for chunk_size in (None, 1, 2, 3, 7):
+            self.assertEqual(
+                _parse(array, chunk_size),
+                [{'a': [1, {'b': ']}'}]}, 'x"y', 2.5, True])
+            self.assertEqual(_parse(ndjson, chunk_size),
+                             [{'a': 1}, 'x', -3, {'b': '{\n'}])
+
+    def test_declared_framing(self):
+        ndjson = b'[1, 2]\n[3, 4]\n'
+        self.assertEqual(_parse(ndjson, 3, 'ndjson'), [[1, 2], [3, 4]])
+        self.assertEqual(_parse(b'[[1, 2], [3]]', 3, 'array'), [[1, 2], [3]])
+        self.assertEqual(_parse(b'', None, 'array'), [])
+        with self.assertRaises(ValueError):
+            _parse(ndjson, 3, 'array')
+        with self.assertRaises(ValueError):
+            _parse(b'{"a": 1}', 3, 'array')
+
+    def test_records_are_decoded_by_the_given_function(self):
+        parser = _JsonStreamParser('ndjson', decode=lambda text: text)
+        self.assertEqual(parser.feed(b'{"a": 1}\n[2]\n', final=True),
+                         ['{"a": 1}', '[2]'])
+
+    def test_multibyte_characters_split_across_chunks(self):
+        self.assertEqual(_parse(u'["été", "😀"]'.encode('utf-8'), 1),
+                         [u'été', u'😀'])
+
+    def test_invalid_bodies(self):
+        for data in (b'[1 2]', b'[1,', b'{"a": 1', b'[1] 2', b'{a}', b'12x'):
+            with self.assertRaises(ValueError, msg=data):
+                _parse(data, 2)
+
+    def test_large_records_parse_in_linear_time(self):
+        def duration(size):
+            record = json.dumps({'values': ['x"}]' * 16] * size})
+            data = record.encode('utf-8')
+            started = time.perf_counter()
+            self.assertEqual(len(_parse(data, 4096)), 1)
+            return time.perf_counter() - started
+
+        duration(1000)
+        small = min(duration(5000) for _ in range(3))
+        large = min(duration(40000) for _ in range(3))
+        # Quadratic parsing would take about 64 times longer.
+        self.assertLess(large, small * 20)
+
+
+@api(name='ingest', version='v1')
+class Ingest(RestResource):
+    @method(path='records', http_method='POST', stream_body=True)
+    async def ingest(self):
+        count = 0
+        async for record in self.body_stream:
+            count += 1
+        return {'count': count}
+
+    @method(path='points', http_method='POST', stream_body=True,
+            content_type='application/x-ndjson',
+            request_schema={'type': 'array', 'items': {'type': 'integer'}})
+    async def points(self):
+        points = []
+        async for record in self.body_stream:
+            points.append(record)
+        return {'points': points}
+
+    @method(path='blobs', http_method='POST', stream_body=True,
+            content_type='application/octet-stream', max_body_size=1024,
+            response_schema={'type': 'object',
+                             'properties': {'size': {'type': 'string'}}})
+    async def upload_blob(self):
+        size = 0
+        async for chunk in self.body_stream:
+            size += len(chunk)
+        return {'size': size}
+
+
+@api(name='feed', version='v1')
+class Feed(RestResource):
+    produced = 0
+    closed = False
+
+    @method(path='numbers', http_method='GET')
+    def numbers(self):
+        for n in range(int(self.get_query_argument('count'))):
+            yield {'n': n}
+
+    @method(path='endless', http_method='GET')
+    async def endless(self):
+        try:
+            while True:
+                Feed.produced += 1
+                yield {'n': Feed.produced, 'padding': 'x' * 1000}
+        finally:
+            Feed.closed = True
+
+
+class StreamedResponseTest(AsyncHTTPTestCase):
+    def setUp(self):
+        super(StreamedResponseTest, self).setUp()
+        Feed.produced = 0
+        Feed.closed = False
+
+    def get_app(self):
+        return RestService([Feed])
+
+    def test_generators_are_sent_chunked(self):
+        response = self.fetch('/feed/v1/numbers?count=20000')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers['Transfer-Encoding'], 'chunked')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(json.loads(response.body),
+                         {'items': [{'n': n} for n in range(20000)]})
+        response = self.fetch('/feed/v1/numbers?count=0')
+        self.assertEqual(json.loads(response.body), {'items': []})
+
+    @gen_test
+    async def test_slow_clients_pause_the_generator(self):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(b'GET /feed/v1/endless HTTP/1.1\r\n'
+                           b'Host: localhost\r\n\r\n')
+        await stream.read_until(b'\r\n\r\n')
+        # The client reads nothing more: once the socket buffers are full
+        # the generator waits.
+        await asyncio.sleep(0.5)
+        produced = Feed.produced
+        await asyncio.sleep(0.2)
+        self.assertEqual(Feed.produced, produced)
+        self.assertFalse(Feed.closed)
+        stream.close()
+        for _ in range(100):
+            if Feed.closed:
+                break
+            await asyncio.sleep(0.01)
+        self.assertTrue(Feed.closed)
+
+
+class StreamedBodyTest(AsyncHTTPTestCase):
+    def get_app(self):
+        return RestService([Ingest], response_validation=True)
+
+    def test_records_are_streamed(self):
+        response = self.fetch('/ingest/v1/records', method='POST',
+                              body='[{"a": 1}, {"a": 2}, {"a": 3}]')
+        self.assertEqual(json.loads(response.body), {'count': 3})
+
+    def test_invalid_body(self):
+        response = self.fetch('/ingest/v1/records', method='POST',
+                              body='[{"a": 1} {"a": 2}]')
+        self.assertEqual(response.code, 400)
+
+    def test_framing_follows_the_content_type(self):
+        response = self.fetch(
+            '/ingest/v1/points', method='POST', body='[1, 2]\n[3, 4]\n',
+            headers={'Content-Type': 'application/x-ndjson'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body),
+                         {'points': [[1, 2], [3, 4]]})
+        response = self.fetch(
+            '/ingest/v1/points', method='POST', body='[[1, 2], [3, 4]]',
+            headers={'Content-Type': 'application/json'})
+        self.assertEqual(json.loads(response.body),
+                         {'points': [[1, 2], [3, 4]]})
+        response = self.fetch(
+            '/ingest/v1/records', method='POST', body='{"a": 1}',
+            headers={'Content-Type': 'application/json'})
+        self.assertEqual(response.code, 400)
+
+    def test_records_are_validated(self):
+        response = self.fetch(
+            '/ingest/v1/points', method='POST', body='[1, 2]\n[3, "x"]\n',
+            headers={'Content-Type': 'application/x-ndjson'})
+        self.assertEqual(response.code, 400)
+        error = json.loads(response.body)
+        self.assertEqual(error['message'], 'Invalid record')
+        self.assertEqual(error['errors'][0]['path'], '$[1]')
+
+    def test_responses_are_validated(self):
+        with ExpectLog('tornado_restful.apiserving',
+                       r'Invalid response of ingest.upload_blob at \$.size'):
+            response = self.fetch('/ingest/v1/blobs', method='POST',
+                                  body=b'x' * 10)
+        self.assertEqual(json.loads(response.body), {'size': 10})
+
+    @gen_test
+    async def test_invalid_content_length(self):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(
+            b'POST /ingest/v1/blobs HTTP/1.1\r\nHost: localhost\r\n'
+            b'Content-Length: ten\r\n\r\n')
+        status_line = await stream.read_until(b'\r\n')
+        stream.close()
+        self.assertEqual(status_line.split()[1], b'400')
+
+    @gen_test
+    async def test_unroutable_uploads_are_rejected_before_their_body(self):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(
+            b'PUT /ingest/v1/records HTTP/1.1\r\nHost: localhost\r\n'
+            b'Content-Length: 20971520\r\n\r\n' + b'x' * 1000)
+        # Answered while most of the body is still to be sent.
+        status_line = await asyncio.wait_for(
+            stream.read_until(b'\r\n'), 2)
+        stream.close()
+        self.assertEqual(status_line.split()[1], b'405')
+
+    def test_options_of_upload_paths_list_the_allowed_methods(self):
+        response = self.fetch('/ingest/v1/records', method='OPTIONS')
+        self.assertEqual(response.code, 204)
+        self.assertEqual(response.headers['Allow'], 'POST')
+
+    @gen_test
+    async def test_aborted_upload_outcome_is_retrieved(self):
+        stream = await TCPClient().connect('127.0.0.1', self.get_http_port())
+        await stream.write(
+            b'POST /ingest/v1/records HTTP/1.1\r\nHost: localhost\r\n'
+            b'Content-Length: 100000\r\n\r\n[{"a": 1},')
+        await asyncio.sleep(0.1)
+        with ExpectLog('asyncio', 'Task exception was never retrieved',
+                       required=False) as expect_log:
+            stream.close()
+            await asyncio.sleep(0.1)
+            gc.collect()
+            await asyncio.sleep(0.01)
+        self.assertFalse(expect_log.logged_stack)
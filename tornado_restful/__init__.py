@@ -3,9 +3,11 @@ from __future__ import absolute_import
 
 """Apiserving Module."""
 from .api_config import api
-# from api_config import AUTH_LEVEL
+from .api_config import AUTH_LEVEL
 from .api_config import method
+from .api_events import Broadcast
+from .api_events import ServerSentEvent
 # from api_config import ResourceContainer
-# from api_exceptions import *
+from .api_exceptions import ApiConfigurationError
 from .apiserving import RestService
 from .apiserving import RestResource
@@ -0,0 +1,199 @@
+# standard library imports
+import datetime
+import heapq
+import itertools
+import math
+
+# third-party imports
+import tornado.web
+from tornado import gen
+from tornado.concurrent import Future
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+# Priority classes, highest first, and the share of a limit each may use: the
+# remaining share is kept for the higher priorities, so that cheap critical
+# methods (health checks, reads) keep being served while sheddable ones are
+# rejected.
+PRIORITIES = ('critical', 'normal', 'sheddable')
+PRIORITY_SHARES = {'critical': 1.0, 'normal': 0.9, 'sheddable': 0.5}
+DEFAULT_PRIORITY = 'normal'
+
+# Seconds a request may wait for a slot in a limiter queue.
+DEFAULT_QUEUE_TIMEOUT = 1.0
+
+# Seconds clients are told to wait before retrying a rejected request.
+RETRY_AFTER = 1
+
+
+class _Overloaded(tornado.web.HTTPError):
+    """Request rejected by a concurrency limiter, answered with a 503."""
+    def __init__(self, reason):
+        super(_Overloaded, self).__init__(503, 'Overloaded: %s', reason)
+        self.cause = reason
+        self.retry_after = RETRY_AFTER
+
+
+class _GradientLimit(object):
+    """Concurrency limit adapted to the latency gradient.
+
+    The limit shrinks when the short term latency rises above the long term
+    latency (requests are queuing somewhere) and grows by sqrt(limit) while
+    latencies are stable.
+    """
+    def __init__(self, initial=20, min_limit=1, max_limit=1000,
+                 smoothing=0.2, tolerance=1.5, short_window=10,
+                 long_window=600):
+        self.limit = float(initial)
+        self.__min_limit = min_limit
+        self.__max_limit = max_limit
+        self.__smoothing = smoothing
+        self.__tolerance = tolerance
+        self.__short_factor = 2.0 / (short_window + 1)
+        self.__long_factor = 2.0 / (long_window + 1)
+        self.__short_latency = None
+        self.__long_latency = None
+
+    def update(self, latency, in_flight):
+        """Update the limit with the latency of a finished request.
+
+        Args:
+            latency: float, Duration of the request in seconds.
+            in_flight: integer, Requests in flight when it finished.
+        """
+        if self.__short_latency is None:
+            self.__short_latency = self.__long_latency = latency
+            return
+        self.__short_latency += self.__short_factor * (
+            latency - self.__short_latency)
+        self.__long_latency += self.__long_factor * (
+            latency - self.__long_latency)
+        if self.__short_latency <= 0:
+            return
+        # Recover quickly from a latency drop.
+        if self.__long_latency / self.__short_latency > 2:
+            self.__long_latency *= 0.95
+        # Not limited by the limit, it says nothing of the latency.
+        if in_flight < self.limit / 2:
+            return
+        gradient = max(0.5, min(1.0, self.__tolerance * (
+            self.__long_latency / self.__short_latency)))
+        limit = self.limit * gradient + math.sqrt(self.limit)
+        limit = (self.limit * (1 - self.__smoothing) +
+                 limit * self.__smoothing)
+        self.limit = max(self.__min_limit, min(self.__max_limit, limit))
+
+
+class _ConcurrencyLimiter(object):
+    """Bounds the requests served at the same time by a method or resource.
+
+    Requests over the limit wait in a bounded queue, served by priority then
+    in arrival order, for at most queue_timeout seconds. Requests which can
+    not be queued are rejected at once with an _Overloaded exception; a full
+    queue makes room for a higher priority request by rejecting its lowest
+    priority waiter. Counters are only updated from the IOLoop thread.
+    """
+    def __init__(self, limit, max_queue=0, queue_timeout=None):
+        """Constructor for _ConcurrencyLimiter.
+
+        Args:
+            limit: integer, Maximum number of requests in flight, or
+              'adaptive' to adapt it to the latency gradient.
+            max_queue: integer, Maximum number of requests waiting for a
+              slot. (Default: 0, rejected at once)
+            queue_timeout: number, Seconds a request may wait for a slot.
+              (Default: DEFAULT_QUEUE_TIMEOUT)
+
+        Raises:
+            ApiConfigurationError: If the limit is invalid.
+        """
+        if limit == 'adaptive':
+            self.__gradient = _GradientLimit()
+        elif isinstance(limit, int) and limit > 0:
+            self.__gradient = None
+            self.__limit = limit
+        else:
+            raise ApiConfigurationError(
+                'Invalid concurrency limit: %r' % (limit,))
+        self.__max_queue = max_queue or 0
+        self.__queue_timeout = datetime.timedelta(
+            seconds=queue_timeout or DEFAULT_QUEUE_TIMEOUT)
+        self.__counter = itertools.count()
+        # Heap of (priority rank, arrival number, future).
+        self.__waiters = []
+        self.in_flight = 0
+
+    @property
+    def limit(self):
+        """Current maximum number of requests in flight."""
+        if self.__gradient is not None:
+            return self.__gradient.limit
+        return self.__limit
+
+    def __has_room(self, priority):
+        return self.in_flight < self.limit * PRIORITY_SHARES[priority]
+
+    def __remove_waiter(self, waiter):
+        self.__waiters.remove(waiter)
+        heapq.heapify(self.__waiters)
+
+    async def acquire(self, priority=DEFAULT_PRIORITY):
+        """Take a slot, waiting in the queue if needed.
+
+        Raises:
+            _Overloaded: If the request can not be queued, is rejected by a
+              higher priority request or waited for queue_timeout seconds.
+        """
+        rank = PRIORITIES.index(priority)
+        if self.__has_room(priority) and (
+                not self.__waiters or self.__waiters[0][0] > rank):
+            self.in_flight += 1
+            return
+        if self.__max_queue <= 0:
+            raise _Overloaded('concurrency limit')
+        if len(self.__waiters) >= self.__max_queue:
+            lowest = max(self.__waiters)
+            if lowest[0] <= rank:
+                raise _Overloaded('queue full')
+            self.__remove_waiter(lowest)
+            lowest[2].set_exception(_Overloaded('preempted'))
+        waiter = (rank, next(self.__counter), Future())
+        heapq.heappush(self.__waiters, waiter)
+        future = waiter[2]
+        try:
+            await gen.with_timeout(self.__queue_timeout, future)
+        except gen.TimeoutError:
+            if future.done() and future.exception() is None:
+                # The slot was given just as the timeout fired.
+                return
+            if not future.done():
+                self.__remove_waiter(waiter)
+            raise _Overloaded('queue timeout')
+        except BaseException:
+            if not future.done():
+                self.__remove_waiter(waiter)
+            elif not future.cancelled() and future.exception() is None:
+                self.release()
+            raise
+
+    def release(self, latency=None):
+        """Give a slot back and wake up the next waiters.
+
+        Args:
+            latency: float, Seconds the slot was held, updating an adaptive
+              limit. (Default: None)
+        """
+        if self.__gradient is not None and latency is not None:
+            self.__gradient.update(latency, self.in_flight)
+        self.in_flight -= 1
+        while self.__waiters:
+            rank = self.__waiters[0][0]
+            if not self.__has_room(PRIORITIES[rank]):
+                break
+            future = heapq.heappop(self.__waiters)[2]
+            self.in_flight += 1
+            future.set_result(None)
+
+    def __len__(self):
+        return len(self.__waiters)
@@ -0,0 +1,283 @@
+# standard library imports
+import asyncio
+
+# third-party imports
+import tornado.web
+from tornado import httputil
+from tornado.concurrent import Future
+from tornado.iostream import StreamClosedError
+
+# application-specific imports
+
+DEFAULT_BATCH_CONCURRENCY = 8
+DEFAULT_BATCH_MAX_SIZE = 100
+
+# Seconds a sub-request may run before it is cancelled and answered with a
+# 504.
+DEFAULT_BATCH_TIMEOUT = 30.0
+
+# Headers framing the body of a sub-request, set by the batch handler only.
+_FRAMING_HEADERS = ('Content-Length', 'Transfer-Encoding')
+
+# Headers of the batch request not inherited by its sub-requests.
+_NOT_INHERITED_HEADERS = ('Content-Length', 'Content-Type', 'Content-Encoding',
+                          'Transfer-Encoding', 'Accept', 'Accept-Encoding',
+                          'Expect')
+
+
+class _BatchConnection(object):
+    """In-memory HTTP connection receiving the response of a sub-request.
+
+    Event streams never finish: the connection is closed as soon as their
+    headers are written, as a client going away would.
+    """
+    def __init__(self, context):
+        self.context = context
+        self.status_code = None
+        self.headers = None
+        self.chunks = []
+        self.finished = Future()
+        self.closed = False
+        self.event_stream = False
+        self.__close_callback = None
+
+    def set_close_callback(self, callback):
+        self.__close_callback = callback
+
+    def set_max_body_size(self, max_body_size):
+        pass
+
+    def close(self):
+        """Close the connection, cancelling the sub-request."""
+        if self.closed:
+            return
+        self.closed = True
+        callback, self.__close_callback = self.__close_callback, None
+        if callback is not None:
+            callback()
+        self.finish()
+
+    def _done(self):
+        future = Future()
+        if self.closed:
+            future.set_exception(StreamClosedError())
+            # Like tornado connections, do not log writes nobody waits for.
+            future.exception()
+        else:
+            future.set_result(None)
+        return future
+
+    def write_headers(self, start_line, headers, chunk=None):
+        if self.closed:
+            return self._done()
+        self.status_code = start_line.code
+        self.headers = headers
+        if headers.get('Content-Type', '').startswith('text/event-stream'):
+            self.event_stream = True
+            self.close()
+            return self._done()
+        if chunk:
+            self.chunks.append(chunk)
+        return self._done()
+
+    def write(self, chunk):
+        if not self.closed:
+            self.chunks.append(chunk)
+        return self._done()
+
+    def finish(self):
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+
+class _BatchHandler(tornado.web.RequestHandler):
+    """Serves a JSON array of sub-requests through the application.
+
+    Each sub-request ({"method", "path", "body", "headers"}) goes through the
+    application routing and handlers exactly like an HTTP request, but
+    in memory. Sub-requests run concurrently, at most batch_concurrency at a
+    time. The response is {"items": [{"status", "body"}, ...]} in the order of
+    the sub-requests or, with ?stream=true, NDJSON lines {"index", "status",
+    "body"} written as each sub-request completes.
+
+    Sub-requests running longer than batch_timeout are cancelled and
+    answered with a 504, event streams with a 400, and all of them are
+    cancelled when the client disconnects. Structured bodies are encoded
+    with the codec of their Content-Type (JSON by default).
+    """
+    _tasks = ()
+
+    def initialize(self, concurrency=DEFAULT_BATCH_CONCURRENCY,
+                   max_size=DEFAULT_BATCH_MAX_SIZE,
+                   timeout=DEFAULT_BATCH_TIMEOUT):
+        self.concurrency = concurrency
+        self.max_size = max_size
+        self.timeout = timeout
+
+    def write_error(self, status_code, **kwargs):
+        """See Tornado doc"""
+        self.set_header('Content-Type', 'application/json')
+        error = {'code': status_code, 'reason': self._reason}
+        exception = kwargs.get('exc_info', (None, None))[1]
+        if isinstance(exception, tornado.web.HTTPError) and exception.log_message:  # noqa
+            error['message'] = exception.log_message % exception.args
+        self.finish(self.application.json_codec.encode(error))
+
+    def _parse_items(self):
+        try:
+            items = self.application.json_codec.decode(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400, 'Invalid JSON')
+        if not isinstance(items, list):
+            raise tornado.web.HTTPError(400, 'Expecting a JSON array')
+        if len(items) > self.max_size:
+            raise tornado.web.HTTPError(
+                413, 'At most %d sub-requests per batch', self.max_size)
+        for item in items:
+            if (not isinstance(item, dict) or
+                    not isinstance(item.get('path'), str) or
+                    not item['path'].startswith('/')):
+                raise tornado.web.HTTPError(
+                    400, 'Sub-requests need an absolute path')
+            if not isinstance(item.get('method') or '', str):
+                raise tornado.web.HTTPError(
+                    400, 'Sub-request methods must be strings')
+            headers = item.get('headers') or {}
+            if not isinstance(headers, dict) or not all(
+                    isinstance(value, str) for value in headers.values()):
+                raise tornado.web.HTTPError(
+                    400, 'Sub-request headers must be objects of strings')
+            if not isinstance(item.get('body'), (str, type(None))) and (
+                    self._body_codec(item) is None):
+                raise tornado.web.HTTPError(
+                    400, 'Structured sub-request bodies need the '
+                    'Content-Type of a supported codec')
+        return items
+
+    def _body_codec(self, item):
+        """Get the codec encoding the structured body of a sub-request,
+        None when its Content-Type has none.
+        """
+        content_type = httputil.HTTPHeaders(
+            item.get('headers') or {}).get('Content-Type')
+        return self.application.codecs.for_content_type(content_type)
+
+    def _make_headers(self, item, body):
+        headers = httputil.HTTPHeaders()
+        for name, value in self.request.headers.get_all():
+            if name not in _NOT_INHERITED_HEADERS:
+                headers.add(name, value)
+        item_headers = httputil.HTTPHeaders(item.get('headers') or {})
+        for name, value in item_headers.get_all():
+            if name not in _FRAMING_HEADERS:
+                headers[name] = value
+        if body:
+            headers.setdefault('Content-Type', 'application/json')
+            headers['Content-Length'] = str(len(body))
+        return headers
+
+    async def _run(self, item):
+        """Serve a sub-request.
+
+        Returns:
+            A (status code, body) tuple, body being decoded when JSON.
+        """
+        http_method = (item.get('method') or 'GET').upper()
+        path = item['path']
+        if path.split('?')[0] == self.request.path:
+            return 400, {'code': 400, 'reason': 'Nested batch request'}
+        body = item.get('body')
+        if body is None:
+            body = b''
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        else:
+            body = self._body_codec(item).encode(body)
+
+        connection = _BatchConnection(self.request.connection.context)
+        try:
+            await asyncio.wait_for(
+                self._serve(connection, http_method, path, item, body),
+                self.timeout)
+        except asyncio.TimeoutError:
+            connection.close()
+            return 504, {'code': 504, 'reason': 'Sub-request timeout'}
+        except BaseException:
+            connection.close()
+            raise
+        if connection.event_stream:
+            return 400, {'code': 400,
+                         'reason': 'Event streams can not be batched'}
+
+        response_body = b''.join(connection.chunks)
+        response_codec = self.application.codecs.for_content_type(
+            connection.headers.get('Content-Type', 'text/plain'))
+        if response_codec is not None and response_body:
+            try:
+                return (connection.status_code,
+                        response_codec.decode(response_body))
+            except ValueError:
+                pass
+        return (connection.status_code,
+                response_body.decode('utf-8', 'replace') or None)
+
+    async def _serve(self, connection, http_method, path, item, body):
+        """Feed a sub-request to the application and wait for its response.
+        """
+        delegate = self.application.start_request(None, connection)
+        prepared = delegate.headers_received(
+            httputil.RequestStartLine(http_method, path, 'HTTP/1.1'),
+            self._make_headers(item, body))
+        if prepared is not None:
+            await prepared
+        if body:
+            received = delegate.data_received(body)
+            if received is not None:
+                await received
+        delegate.finish()
+        await connection.finished
+
+    async def post(self):
+        items = self._parse_items()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(index, item):
+            async with semaphore:
+                status_code, body = await self._run(item)
+            return index, status_code, body
+
+        tasks = self._tasks = [asyncio.ensure_future(run(index, item))
+                               for index, item in enumerate(items)]
+        codec = self.application.json_codec
+
+        if self.get_query_argument('stream', 'false').lower() in ('1', 'true'):
+            self.set_header('Content-Type', 'application/x-ndjson')
+            try:
+                for task in asyncio.as_completed(tasks):
+                    index, status_code, body = await task
+                    self.write(codec.encode(
+                        {'index': index, 'status': status_code,
+                         'body': body}) + b'\n')
+                    await self.flush()
+            except (StreamClosedError, asyncio.CancelledError):
+                for task in tasks:
+                    task.cancel()
+                return
+            self.finish()
+            return
+
+        try:
+            results = await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # Cancelled by on_connection_close(), the client went away.
+            return
+        self.set_header('Content-Type', 'application/json')
+        self.finish(codec.encode({'items': [
+            {'status': status_code, 'body': body}
+            for _, status_code, body in results]}))
+
+    def on_connection_close(self):
+        """See Tornado doc"""
+        for task in self._tasks:
+            task.cancel()
+        super(_BatchHandler, self).on_connection_close()
@@ -0,0 +1,252 @@
+# standard library imports
+import inspect
+import typing
+import uuid
+
+# third-party imports
+
+# application-specific imports
+
+# Query argument values read as true or false by bool parameters.
+_TRUE_VALUES = frozenset(('1', 'true', 'yes', 'on'))
+_FALSE_VALUES = frozenset(('0', 'false', 'no', 'off'))
+
+_MISSING = object()
+
+
+class _BindingError(ValueError):
+    """A request value which can not be bound to a parameter."""
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise _BindingError('expected an integer')
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise _BindingError('expected an integer')
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise _BindingError('expected a number')
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    raise _BindingError('expected a number')
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        lowered = value.lower()
+        if lowered in _TRUE_VALUES:
+            return True
+        if lowered in _FALSE_VALUES:
+            return False
+    raise _BindingError('expected a boolean')
+
+
+def _to_str(value):
+    if isinstance(value, str):
+        return value
+    raise _BindingError('expected a string')
+
+
+def _to_uuid(value):
+    if isinstance(value, str):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            pass
+    raise _BindingError('expected a UUID')
+
+
+def _any(value):
+    return value
+
+
+# Converters of the parameters, by annotation. They accept both query
+# argument strings and JSON body values.
+COERCERS = {
+    int: _to_int,
+    float: _to_float,
+    bool: _to_bool,
+    str: _to_str,
+    uuid.UUID: _to_uuid,
+}
+
+
+class _Parameter(object):
+    """A function parameter bound from the query string or the JSON body."""
+    __slots__ = ('name', 'kind', 'coerce', 'is_list', 'default')
+
+    def __init__(self, name, kind, coerce, is_list, default):
+        self.name = name
+        self.kind = kind
+        self.coerce = coerce
+        self.is_list = is_list
+        self.default = default
+
+
+def _parameter(name, kind, annotation, default):
+    """Compile a parameter from its annotation and default value.
+
+    Optional[X] is bound as X, list[X] (or List[X]) from every value of a
+    query argument or a JSON array. Unannotated parameters are typed after
+    their default value (bool, int, float or str), others are passed as is.
+    """
+    if annotation is inspect.Parameter.empty or isinstance(annotation, str):
+        annotation = type(default) if type(default) in COERCERS else None
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation)
+                if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else None
+        origin = typing.get_origin(annotation)
+    is_list = annotation is list or origin is list
+    if is_list:
+        args = typing.get_args(annotation)
+        annotation = args[0] if args else None
+    return _Parameter(name, kind, COERCERS.get(annotation, _any), is_list,
+                      default)
+
+
+class _Binder(object):
+    """Maps the query arguments and JSON body fields of a request to the
+    keyword arguments of a resource function.
+
+    The signature is inspected once, binding a request only walks the
+    compiled parameters.
+    """
+    def __init__(self, parameters):
+        self.__parameters = tuple(parameters)
+
+    @property
+    def names(self):
+        """Tuple of the names of the bound parameters."""
+        return tuple(parameter.name for parameter in self.__parameters)
+
+    @classmethod
+    def from_function(cls, func):
+        """Compile the parameters of a function, after self.
+
+        Returns:
+            A _Binder.
+        """
+        signature = inspect.signature(func)
+        try:
+            hints = typing.get_type_hints(func)
+        except Exception:
+            hints = {}
+        parameters = []
+        for parameter in list(signature.parameters.values())[1:]:
+            default = parameter.default
+            if default is inspect.Parameter.empty:
+                default = _MISSING
+            annotation = hints.get(parameter.name, parameter.annotation)
+            parameters.append(_parameter(
+                parameter.name, parameter.kind, annotation, default))
+        return cls(parameters)
+
+    def skip(self, count):
+        """Get the binder of the parameters left once the path params are
+        passed to the first count positional parameters.
+
+        *args, **kwargs and the remaining positional-only parameters are
+        never bound.
+
+        Returns:
+            A _Binder, None when no parameter is left to bind.
+        """
+        parameters = []
+        for parameter in self.__parameters:
+            if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+                count = 0
+            elif count and parameter.kind in (
+                    inspect.Parameter.POSITIONAL_ONLY,
+                    inspect.Parameter.POSITIONAL_OR_KEYWORD):
+                count -= 1
+            elif parameter.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                                    inspect.Parameter.KEYWORD_ONLY):
+                parameters.append(parameter)
+        if not parameters:
+            return None
+        return _Binder(parameters)
+
+    def exclude(self, names):
+        """Split parameters off the binder.
+
+        Returns:
+            A (binder of the other parameters or None, tuple of the names of
+            the excluded parameters present) tuple.
+        """
+        parameters = [parameter for parameter in self.__parameters
+                      if parameter.name not in names]
+        excluded = tuple(parameter.name for parameter in self.__parameters
+                         if parameter.name in names)
+        return (_Binder(parameters) if parameters else None), excluded
+
+    def bind(self, request):
+        """Get the keyword arguments of a request.
+
+        Each parameter is read from the query argument of its name, then from
+        the field of its name of a JSON object body. Missing parameters with
+        a default value are left to it.
+
+        Args:
+            request: HTTPServerRequest, Request whose JSON body, if any, is
+              already decoded.
+
+        Returns:
+            A (kwargs, errors) tuple, errors being a list of dicts with the
+            'name', 'in' and 'message' of each invalid or missing parameter.
+        """
+        query_arguments = request.query_arguments
+        body = request.body
+        if not isinstance(body, dict):
+            body = None
+        kwargs = {}
+        errors = []
+        for parameter in self.__parameters:
+            name = parameter.name
+            raw_values = query_arguments.get(name)
+            if raw_values:
+                location = 'query'
+                values = [value.decode('utf-8', 'replace')
+                          for value in raw_values]
+                if not parameter.is_list:
+                    values = values[-1]
+            elif body is not None and name in body:
+                location = 'body'
+                values = body[name]
+                if parameter.is_list and not isinstance(values, list):
+                    errors.append({'name': name, 'in': location,
+                                   'message': 'expected an array'})
+                    continue
+            elif parameter.default is not _MISSING:
+                continue
+            else:
+                errors.append({'name': name,
+                               'in': 'query' if body is None else 'body',
+                               'message': 'missing'})
+                continue
+            try:
+                if parameter.is_list:
+                    kwargs[name] = [parameter.coerce(value)
+                                    for value in values]
+                else:
+                    kwargs[name] = parameter.coerce(values)
+            except _BindingError as e:
+                errors.append({'name': name, 'in': location,
+                               'message': str(e)})
+        return kwargs, errors
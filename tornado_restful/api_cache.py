@@ -0,0 +1,152 @@
+# standard library imports
+import collections
+import hashlib
+import time
+
+# third-party imports
+
+# application-specific imports
+from .api_compression import compress
+
+DEFAULT_CACHE_MAX_ENTRIES = 1024
+
+# Headers of a response not stored with it: set by tornado, or computed again
+# each time the entry is written.
+UNSTORED_HEADERS = frozenset([
+    'Server', 'Date', 'Content-Type', 'Content-Length', 'Content-Encoding',
+    'Etag', 'Vary', 'Server-Timing', 'Transfer-Encoding'])
+
+
+class _CacheEntry(object):
+    """Encoded response stored in a response cache, with the status code
+    and headers set by its method.
+    """
+    __slots__ = ('body', 'content_type', 'etag', 'expires', 'variants',
+                 'status_code', 'reason', 'headers')
+
+    def __init__(self, body, content_type, expires, status_code=200,
+                 reason=None, headers=()):
+        self.body = body
+        self.content_type = content_type
+        self.status_code = status_code
+        self.reason = reason
+        # (name, value) tuples, see UNSTORED_HEADERS.
+        self.headers = tuple(headers)
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self.expires = expires
+        # Compressed bodies and ETags, by encoding.
+        self.variants = {}
+
+    def compressed(self, encoding):
+        """Get the body and ETag of the entry compressed with an encoding.
+
+        The body is compressed on the first call only.
+
+        Returns:
+            A (body, etag) tuple.
+        """
+        variant = self.variants.get(encoding)
+        if variant is None:
+            variant = (compress(self.body, encoding),
+                       '"%s-%s"' % (self.etag[1:-1], encoding))
+            self.variants[encoding] = variant
+        return variant
+
+
+class _ResponseCache(object):
+    """In-process LRU/TTL cache of the encoded responses of a method.
+
+    Entries are keyed on the path params values and the values of the query
+    arguments selected by cache_key, and store the encoded response body, so a
+    hit skips both the method and the serialization.
+    """
+    def __init__(self, ttl, key=None, max_entries=None):
+        """Constructor for _ResponseCache.
+
+        Args:
+            ttl: number, Time to live of the entries, in seconds.
+            key: list of query arguments names, or function called with the
+              request handler returning a hashable value, completing the path
+              params in the cache key. (Default: None, path params only)
+            max_entries: integer, Maximum number of entries, the least
+              recently used entries are evicted first.
+              (Default: DEFAULT_CACHE_MAX_ENTRIES)
+        """
+        self.__ttl = ttl
+        self.__max_entries = max_entries or DEFAULT_CACHE_MAX_ENTRIES
+        self.__entries = collections.OrderedDict()
+        if key is None:
+            self.__key_func = None
+        elif callable(key):
+            self.__key_func = key
+        else:
+            arguments = tuple(key)
+            self.__key_func = lambda handler: tuple(
+                tuple(handler.request.query_arguments.get(argument, ()))
+                for argument in arguments)
+
+    def make_key(self, handler, params_values, variant=None):
+        """Get the cache key of a request.
+
+        Args:
+            handler: RestResource, Handler of the request.
+            params_values: list, Path params values of the request.
+            variant: Representation of the response, e.g. its content type.
+              (Default: None)
+        """
+        if self.__key_func is None:
+            return (tuple(params_values), None, variant)
+        return (tuple(params_values), self.__key_func(handler), variant)
+
+    def get(self, key):
+        """Get the live entry of a key, None when missing or expired."""
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            del self.__entries[key]
+            return None
+        self.__entries.move_to_end(key)
+        return entry
+
+    def set(self, key, body, content_type, status_code=200, reason=None,
+            headers=()):
+        """Store an encoded response.
+
+        Args:
+            key: Cache key, as returned by make_key().
+            body: bytes, Encoded response body.
+            content_type: string, Content-Type of the body.
+            status_code: integer, Status code of the response. (Default: 200)
+            reason: string, Reason phrase of the status code. (Default: None,
+              the standard one)
+            headers: list, (name, value) tuples of the headers set by the
+              method. (Default: ())
+
+        Returns:
+            The new _CacheEntry.
+        """
+        entry = _CacheEntry(body, content_type, time.monotonic() + self.__ttl,
+                            status_code, reason, headers)
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.__max_entries:
+            self.__entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, params_values=None):
+        """Drop entries.
+
+        Args:
+            params_values: list, Drop only the entries of these path params
+              values. (Default: None, drop every entry)
+        """
+        if params_values is None:
+            self.__entries.clear()
+            return
+        params_values = tuple(params_values)
+        for key in [key for key in self.__entries if key[0] == params_values]:
+            del self.__entries[key]
+
+    def __len__(self):
+        return len(self.__entries)
@@ -0,0 +1,110 @@
+# standard library imports
+
+# third-party imports
+from tornado.concurrent import Future
+
+# application-specific imports
+
+DEFAULT_MAX_WAITERS = 1000
+
+
+class _Flight(object):
+    """Call of a method whose result is shared by identical requests."""
+    __slots__ = ('future', 'waiters')
+
+    def __init__(self):
+        self.future = Future()
+        self.waiters = 0
+
+
+class _Coalescer(object):
+    """Single-flight coalescing of the identical concurrent requests of a
+    method.
+
+    The first request of a key (the leader) calls the method, identical
+    requests arriving while it runs wait for its encoded response (a
+    _CacheEntry, holding its status code and headers as well) instead of
+    calling the method again.
+    """
+    def __init__(self, key=None, headers=None, max_waiters=None):
+        """Constructor for _Coalescer.
+
+        Args:
+            key: list of query arguments names, or function called with the
+              request handler returning a hashable value, completing the path
+              params in the coalescing key. (Default: None, path params only)
+            headers: list of headers names completing the coalescing key.
+              (Default: None)
+            max_waiters: integer, Maximum number of requests waiting for a
+              leader, the next identical requests call the method themselves.
+              (Default: DEFAULT_MAX_WAITERS)
+        """
+        self.__max_waiters = max_waiters or DEFAULT_MAX_WAITERS
+        self.__flights = {}
+        self.__key_func = key if callable(key) else None
+        self.__arguments = tuple(key) if key and not callable(key) else ()
+        self.__headers = tuple(headers or ())
+
+    def make_key(self, handler, params_values, variant=None):
+        """Get the coalescing key of a request.
+
+        Args:
+            handler: RestResource, Handler of the request.
+            params_values: list, Path params values of the request.
+            variant: Representation of the response, e.g. its content type.
+              (Default: None)
+        """
+        request = handler.request
+        if self.__key_func is not None:
+            selected = self.__key_func(handler)
+        else:
+            selected = tuple(
+                tuple(request.query_arguments.get(argument, ()))
+                for argument in self.__arguments)
+        if self.__headers:
+            selected = (selected, tuple(
+                request.headers.get(header) for header in self.__headers))
+        return (tuple(params_values), selected, variant)
+
+    def enter(self, key):
+        """Join the flight of a key, or start it.
+
+        Returns:
+            A (leading, future) tuple. The leader gets (True, None) and must
+            call leave() once done. Waiters get (False, future), the future
+            resolving to the leader _CacheEntry (None when its response can
+            not be shared). Requests over the waiters cap get (False, None)
+            and call the method themselves.
+        """
+        flight = self.__flights.get(key)
+        if flight is None:
+            self.__flights[key] = _Flight()
+            return True, None
+        if flight.waiters >= self.__max_waiters:
+            return False, None
+        flight.waiters += 1
+        return False, flight.future
+
+    def leave(self, key, entry=None, exception=None):
+        """End the flight of a key, passing its outcome to the waiters.
+
+        Args:
+            key: Coalescing key, as returned by make_key().
+            entry: _CacheEntry, Encoded response of the leader, None if it
+              can not be shared. (Default: None)
+            exception: BaseException, Exception raised by the leader, raised
+              to the waiters as well. (Default: None)
+
+        Returns:
+            The number of waiters served by the leader outcome.
+        """
+        flight = self.__flights.pop(key)
+        # Waiters of a cancelled leader call the method themselves.
+        if isinstance(exception, Exception) and flight.waiters:
+            flight.future.set_exception(exception)
+            return flight.waiters
+        flight.future.set_result(entry)
+        return flight.waiters if entry is not None else 0
+
+    def __len__(self):
+        return len(self.__flights)
@@ -0,0 +1,281 @@
+# standard library imports
+import json
+import logging
+
+# third-party imports
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of parsed Accept headers remembered by a codec registry.
+ACCEPT_CACHE_SIZE = 256
+
+# (prefix, separator, suffix) bytes framing the items of a streamed JSON
+# {"items": [...]} document, see the items_framing member of the codecs.
+_JSON_ITEMS_FRAMING = (b'{"items":[', b',', b']}')
+
+
+class _StdlibJsonCodec(object):
+    """JSON codec based on the standard library json module."""
+    name = 'json'
+    content_type = 'application/json'
+    items_framing = _JSON_ITEMS_FRAMING
+
+    def __init__(self):
+        self.__encoder = json.JSONEncoder(
+            ensure_ascii=False, separators=(',', ':'))
+        self.__decode = json.JSONDecoder().decode
+
+    def encode(self, obj):
+        """Encode an object to UTF-8 JSON bytes."""
+        return self.__encoder.encode(obj).encode('utf-8')
+
+    def decode(self, data):
+        """Decode JSON bytes or string.
+
+        Raises:
+            ValueError: If data is not valid JSON.
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return self.__decode(data)
+
+
+class _OrjsonCodec(object):
+    """JSON codec based on orjson, which encodes straight to bytes."""
+    name = 'orjson'
+    content_type = 'application/json'
+    items_framing = _JSON_ITEMS_FRAMING
+
+    def __init__(self):
+        self.__fallback = _StdlibJsonCodec()
+
+    def encode(self, obj):
+        """Encode an object to UTF-8 JSON bytes.
+
+        Non-string keys are converted as the json module does, and the
+        objects orjson refuses (e.g. integers over 64 bits) are encoded by
+        the json module.
+        """
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return self.__fallback.encode(obj)
+
+    def decode(self, data):
+        """Decode JSON bytes or string.
+
+        Integers out of the 64 bits range (below -2 ** 63 or over
+        2 ** 64 - 1) are decoded to floats, losing their precision, see
+        get_json_codec().
+
+        Raises:
+            ValueError: If data is not valid JSON (orjson.JSONDecodeError
+              subclasses it).
+        """
+        return orjson.loads(data)
+
+
+_JSON_CODECS = {
+    'json': _StdlibJsonCodec,
+    'orjson': _OrjsonCodec,
+}
+
+
+def get_json_codec(name=None):
+    """Get a JSON codec.
+
+    Args:
+        name: string, 'json' for the standard library, 'orjson' or None for
+          the fastest one installed. A codec whose library is not installed
+          falls back to the standard library. orjson decodes the integers
+          out of the 64 bits range to floats: services receiving such
+          integers need 'json' to decode them exactly. (Default: None)
+
+    Returns:
+        Codec instance with encode(obj) -> bytes and decode(data) methods.
+
+    Raises:
+        ValueError: If name is not a known codec.
+    """
+    if name is None:
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in _JSON_CODECS:
+        raise ValueError('Unknown JSON codec: %s' % name)
+    if name == 'orjson' and orjson is None:
+        logger.warning('orjson is not installed, using the json module')
+        name = 'json'
+    return _JSON_CODECS[name]()
+
+
+# Codec of handlers served outside of a RestService.
+default_json_codec = get_json_codec()
+
+
+class _MsgpackCodec(object):
+    """MessagePack codec, based on msgpack."""
+    name = 'msgpack'
+    content_type = 'application/msgpack'
+    aliases = ('application/x-msgpack', 'application/vnd.msgpack')
+    # MessagePack arrays are prefixed with their length, so streamed items
+    # are buffered into a document.
+    items_framing = None
+
+    def encode(self, obj):
+        """Encode an object to MessagePack bytes."""
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, data):
+        """Decode MessagePack bytes.
+
+        Raises:
+            ValueError: If data is not valid MessagePack.
+        """
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise ValueError('Invalid MessagePack: %s' % e)
+
+
+class _CborCodec(object):
+    """CBOR codec, based on cbor2."""
+    name = 'cbor'
+    content_type = 'application/cbor'
+    aliases = ()
+    # A one entry map of an indefinite-length array: 0xa1, the 'items' text
+    # string and 0x9f, ended by a 0xff break.
+    items_framing = (b'\xa1eitems\x9f', b'', b'\xff')
+
+    def encode(self, obj):
+        """Encode an object to CBOR bytes."""
+        return cbor2.dumps(obj)
+
+    def decode(self, data):
+        """Decode CBOR bytes.
+
+        Raises:
+            ValueError: If data is not valid CBOR.
+        """
+        try:
+            return cbor2.loads(data)
+        except Exception as e:
+            raise ValueError('Invalid CBOR: %s' % e)
+
+
+# Built-in codecs of the binary formats, with the library they need.
+_BINARY_CODECS = {
+    'msgpack': (_MsgpackCodec, lambda: msgpack),
+    'cbor': (_CborCodec, lambda: cbor2),
+}
+
+
+class _CodecRegistry(object):
+    """Codecs of the request and response documents, by media type.
+
+    Request bodies are decoded by the codec of their Content-Type and dict/list
+    responses encoded by the codec the Accept header prefers, JSON being the
+    default of both.
+    """
+    def __init__(self, json_codec, codecs=None):
+        """Constructor for _CodecRegistry.
+
+        Args:
+            json_codec: JSON codec, see get_json_codec().
+            codecs: list, Codecs in addition to JSON: names of the built-in
+              ones ('msgpack', 'cbor') or codec instances with name,
+              content_type, encode(obj) -> bytes and decode(data) members.
+              (Default: None, the built-in codecs whose library is
+              installed)
+
+        Raises:
+            ApiConfigurationError: If a codec is unknown or its library is
+              not installed.
+        """
+        self.default = json_codec
+        self.__by_media_type = {json_codec.content_type: json_codec}
+        if codecs is None:
+            codecs = [name for name, (_, library) in
+                      sorted(_BINARY_CODECS.items()) if library() is not None]
+        for codec in codecs:
+            if isinstance(codec, str):
+                if codec not in _BINARY_CODECS:
+                    raise ApiConfigurationError('Unknown codec: %s' % codec)
+                codec_class, library = _BINARY_CODECS[codec]
+                if library() is None:
+                    raise ApiConfigurationError(
+                        'The library of the %s codec is not installed' % (
+                            codec))
+                codec = codec_class()
+            self.__by_media_type[codec.content_type] = codec
+            for alias in getattr(codec, 'aliases', ()):
+                self.__by_media_type.setdefault(alias, codec)
+        self.__accept_cache = {}
+
+    @property
+    def negotiable(self):
+        """Whether responses have more than one possible format."""
+        return len(set(self.__by_media_type.values())) > 1
+
+    def for_content_type(self, content_type):
+        """Get the codec of a request Content-Type.
+
+        Returns:
+            The codec, the JSON one when content_type is empty, None when it
+            is not registered.
+        """
+        if not content_type:
+            return self.default
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        return self.__by_media_type.get(media_type)
+
+    def negotiate(self, accept):
+        """Get the codec of the response to a request Accept header.
+
+        The acceptable media type with the highest quality wins, JSON when
+        none is supported.
+        """
+        if not accept:
+            return self.default
+        codec = self.__accept_cache.get(accept)
+        if codec is None:
+            codec = self.default
+            best = 0.0
+            for item in accept.split(','):
+                parts = item.split(';')
+                media_type = parts[0].strip().lower()
+                quality = 1.0
+                for param in parts[1:]:
+                    name, _, value = param.partition('=')
+                    if name.strip() == 'q':
+                        try:
+                            quality = float(value)
+                        except ValueError:
+                            quality = 0.0
+                candidate = self.__by_media_type.get(media_type)
+                if candidate is not None and quality > best:
+                    codec = candidate
+                    best = quality
+            if len(self.__accept_cache) >= ACCEPT_CACHE_SIZE:
+                self.__accept_cache.clear()
+            self.__accept_cache[accept] = codec
+        return codec
+
+
+# Registry of handlers served outside of a RestService.
+default_codecs = _CodecRegistry(default_json_codec, codecs=())
@@ -0,0 +1,120 @@
+# standard library imports
+import gzip
+import logging
+
+# third-party imports
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Responses smaller than this many bytes are sent uncompressed by default.
+DEFAULT_MIN_SIZE = 1024
+
+# Maximum number of parsed Accept-Encoding headers remembered.
+ACCEPT_ENCODING_CACHE_SIZE = 256
+
+
+def _gzip(body):
+    # mtime=0 makes the output deterministic.
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def _brotli(body):
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+COMPRESSORS = {'gzip': _gzip}
+if brotli is not None:
+    COMPRESSORS['br'] = _brotli
+
+_accepted_encodings_cache = {}
+
+
+def _accepted_encodings(accept_encoding):
+    """Parse an Accept-Encoding header.
+
+    Returns:
+        Set of the acceptable encodings ('*' included when present).
+    """
+    encodings = _accepted_encodings_cache.get(accept_encoding)
+    if encodings is None:
+        encodings = set()
+        for item in accept_encoding.split(','):
+            parts = item.split(';')
+            encoding = parts[0].strip().lower()
+            quality = 1.0
+            for param in parts[1:]:
+                name, _, value = param.partition('=')
+                if name.strip() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if encoding and quality > 0:
+                encodings.add(encoding)
+        encodings = frozenset(encodings)
+        if len(_accepted_encodings_cache) >= ACCEPT_ENCODING_CACHE_SIZE:
+            _accepted_encodings_cache.clear()
+        _accepted_encodings_cache[accept_encoding] = encodings
+    return encodings
+
+
+class _CompressionPolicy(object):
+    """Response compression policy of a method."""
+    def __init__(self, compress, min_size=None):
+        """Constructor for _CompressionPolicy.
+
+        Args:
+            compress: string, 'auto' for the best encoding accepted by the
+              client, 'gzip' or 'br'.
+            min_size: integer, Minimum size in bytes of compressed responses.
+              (Default: DEFAULT_MIN_SIZE)
+
+        Raises:
+            ApiConfigurationError: If compress is not a known value.
+        """
+        if compress == 'auto':
+            self.encodings = tuple(
+                encoding for encoding in ('br', 'gzip')
+                if encoding in COMPRESSORS)
+        elif compress == 'br' and brotli is None:
+            logger.warning('brotli is not installed, using gzip')
+            self.encodings = ('gzip',)
+        elif compress in COMPRESSORS:
+            self.encodings = (compress,)
+        else:
+            raise ApiConfigurationError(
+                'Unknown compression: %s' % (compress,))
+        self.min_size = DEFAULT_MIN_SIZE if min_size is None else min_size
+
+    def negotiate(self, accept_encoding, size):
+        """Choose the encoding of a response.
+
+        Args:
+            accept_encoding: string, Accept-Encoding header of the request.
+            size: integer, Size in bytes of the uncompressed response.
+
+        Returns:
+            The encoding name, None to send the response uncompressed.
+        """
+        if size < self.min_size or not accept_encoding:
+            return None
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in self.encodings:
+            if encoding in accepted or '*' in accepted:
+                return encoding
+        return None
+
+
+def compress(body, encoding):
+    """Compress a response body with an encoding from COMPRESSORS."""
+    return COMPRESSORS[encoding](body)
@@ -1,9 +1,15 @@
 # standard library imports
+import functools
+import inspect
 import re
+import types
 
 # third-party imports
 
 # application-specific imports
+from .api_binding import _Binder
+from .api_exceptions import ApiConfigurationError
+from .api_hooks import AUTH_LEVEL  # noqa
 
 
 class _ApiInfo(object):
@@ -16,7 +22,8 @@ class _ApiInfo(object):
     the API (such as API name and version).
     """
     def __init__(self, common_info, resource_name=None, path=None,
-                 auth_level=None):
+                 auth_level=None, max_concurrency=None, max_queue=0,
+                 queue_timeout=None, hooks=None):
         """Constructor for _ApiInfo.
 
         Args:
@@ -28,6 +35,14 @@ class _ApiInfo(object):
               (Default: None)
             auth_level: enum from AUTH_LEVEL, Frontend authentication level.
               (Default: None)
+            max_concurrency: integer or 'adaptive', Maximum number of
+              requests served at the same time by the methods of the class.
+              (Default: None, unlimited)
+            max_queue: integer, Maximum number of requests waiting for one
+              of these slots. (Default: 0)
+            queue_timeout: number, Seconds a request may wait for a slot.
+              (Default: None, 1 second)
+            hooks: list, Hooks of the methods of the class. (Default: None)
         """
         # _CheckType(resource_name, basestring, 'resource_name')
         # _CheckType(path, basestring, 'path')
@@ -37,6 +52,10 @@ class _ApiInfo(object):
         self.__resource_name = resource_name
         self.__path = path
         self.__auth_level = auth_level
+        self.__max_concurrency = max_concurrency
+        self.__max_queue = max_queue
+        self.__queue_timeout = queue_timeout
+        self.__hooks = tuple(hooks or ())
 
     def is_same_api(self, other):
         """Check if this implements the same API as another
@@ -78,6 +97,28 @@ class _ApiInfo(object):
         """
         return self.__path
 
+    @property
+    def max_concurrency(self):
+        """Maximum number of requests served at the same time by the class
+        methods, None if unlimited.
+        """
+        return self.__max_concurrency
+
+    @property
+    def max_queue(self):
+        """Maximum number of requests waiting for a slot of the class."""
+        return self.__max_queue
+
+    @property
+    def queue_timeout(self):
+        """Seconds a request may wait for a slot of the class."""
+        return self.__queue_timeout
+
+    @property
+    def hooks(self):
+        """Hooks of the API then of the class, outermost first."""
+        return self.__common_info.hooks + self.__hooks
+
 
 class _ApiDecorator(object):
     """Decorator for single- or multi-class APIs.
@@ -86,16 +127,17 @@ class _ApiDecorator(object):
     single-class API.  Or call the api_class() method to decorate a multi-class
     API.
     """
-    def __init__(self, name, version, auth_level=None):
+    def __init__(self, name, version, auth_level=None, hooks=None):
         """Constructor for _ApiDecorator.
 
         Args:
           name: string, Name of the API.
           version: string, Version of the API.
           auth_level: enum from AUTH_LEVEL, Frontend authentication level.
+          hooks: list, Hooks of the methods of the API.
         """
         self.__common_info = self.__ApiCommonInfo(
-            name, version, auth_level=auth_level)
+            name, version, auth_level=auth_level, hooks=hooks)
         self.__classes = []
 
     class __ApiCommonInfo(object):
@@ -109,13 +151,14 @@ class _ApiDecorator(object):
         implement the same API, guaranteeing that they share the same common
         information.
         """
-        def __init__(self, name, version, auth_level=None):
+        def __init__(self, name, version, auth_level=None, hooks=None):
             """Constructor for _ApiCommonInfo.
 
             Args:
               name: string, Name of the API.
               version: string, Version of the API.
               auth_level: enum from AUTH_LEVEL, Frontend authentication level.
+              hooks: list, Hooks of the methods of the API.
             """
             # _CheckType(name, basestring, 'name', allow_none=False)
             # _CheckType(version, basestring, 'version', allow_none=False)
@@ -123,6 +166,7 @@ class _ApiDecorator(object):
             self.__name = name
             self.__version = version
             self.__auth_level = auth_level
+            self.__hooks = tuple(hooks or ())
 
         @property
         def name(self):
@@ -139,6 +183,11 @@ class _ApiDecorator(object):
             """Enum from AUTH_LEVEL specifying default frontend auth level."""
             return self.__auth_level
 
+        @property
+        def hooks(self):
+            """Hooks of the methods of the API."""
+            return self.__hooks
+
     def __call__(self, service_class):
         """Decorator for service class that configures server.
 
@@ -151,7 +200,9 @@ class _ApiDecorator(object):
         """
         return self.api_class()(service_class)
 
-    def api_class(self, resource_name=None, path=None, auth_level=None):
+    def api_class(self, resource_name=None, path=None, auth_level=None,
+                  max_concurrency=None, max_queue=0, queue_timeout=None,
+                  hooks=None):
         """Get a decorator for a class that implements an API.
 
         This can be used for single-class or multi-class implementations.
@@ -165,6 +216,19 @@ class _ApiDecorator(object):
                 class this decorates. (Default: None)
             auth_level: enum from AUTH_LEVEL, Frontend authentication
                 level. (Default: None)
+            max_concurrency: integer or 'adaptive', Maximum number of
+                requests served at the same time by all the methods of the
+                class, shared according to the methods priority. 'adaptive'
+                adjusts the limit to the latency gradient. Requests over the
+                limit are answered with a 503 and a Retry-After header.
+                (Default: None, unlimited)
+            max_queue: integer, Maximum number of requests waiting for a
+                slot, by priority then arrival order. (Default: 0)
+            queue_timeout: number, Seconds a request may wait for a slot.
+                (Default: None, 1 second)
+            hooks: list, Hooks of the methods of the class, run after the
+                RestService and API hooks and before the @method ones, see
+                RestService(hooks). (Default: None)
 
             Returns:
                 A decorator function to decorate a class that implements
@@ -182,7 +246,9 @@ class _ApiDecorator(object):
             self.__classes.append(api_class)
             api_class.api_info = _ApiInfo(
                 self.__common_info, resource_name=resource_name,
-                path=path, auth_level=auth_level)
+                path=path, auth_level=auth_level,
+                max_concurrency=max_concurrency, max_queue=max_queue,
+                queue_timeout=queue_timeout, hooks=hooks)
             return api_class
 
         return apiserving_api_decorator
@@ -194,7 +260,7 @@ class _ApiDecorator(object):
             return self.__classes
 
 
-def api(name, version, auth_level=None):
+def api(name, version, auth_level=None, hooks=None):
     """Decorate a Service class for use by the framework above.
 
     This decorator can be used to specify an API name and version for your API.
@@ -219,12 +285,14 @@ def api(name, version, auth_level=None):
     Args:
       name: string, Name of the API.
       version: string, Version of the API.
-      auth_level: enum from AUTH_LEVEL, frontend authentication level.
+      auth_level: enum from AUTH_LEVEL, frontend authentication level,
+        enforced before the hooks, see RestService(authenticate).
+      hooks: list, Hooks of the methods of the API, see RestService(hooks).
 
     Returns:
       Class decorated with api_info attribute, an instance of ApiInfo.
     """
-    return _ApiDecorator(name, version, auth_level=auth_level)
+    return _ApiDecorator(name, version, auth_level=auth_level, hooks=hooks)
 
 
 class _MethodInfo(object):
@@ -235,7 +303,17 @@ class _MethodInfo(object):
     calculated once.
     """
     def __init__(self, name=None, path=None, http_method=None,
-                 auth_level=None, content_type=None):
+                 auth_level=None, content_type=None, stream_body=False,
+                 max_body_size=None, cache_ttl=None, cache_key=None,
+                 cache_max_entries=None, compress=None, min_size=None,
+                 is_coroutine=False, executor=None, coalesce=False,
+                 coalesce_key=None, coalesce_headers=None,
+                 coalesce_max_waiters=None, max_concurrency=None,
+                 max_queue=0, queue_timeout=None, priority=None,
+                 timeout=None, binder=None, request_schema=None,
+                 response_schema=None, paginate=False, page_size=None,
+                 max_page_size=None, cursor_key=None, slow_threshold=None,
+                 inject=None, stream=None, keepalive=None, hooks=None):
         """Constructor.
 
         Args:
@@ -244,12 +322,84 @@ class _MethodInfo(object):
           path: string, Path portion of the URL to the method, for RESTful
           methods. http_method: string, HTTP method supported by the method.
           auth_level: enum from AUTH_LEVEL, Frontend auth level for the method.
+          content_type: string, Content type of the request body.
+          stream_body: boolean, Whether the request body is streamed to the
+            method instead of being buffered.
+          max_body_size: integer, Maximum size in bytes of a streamed request
+            body.
+          cache_ttl: number, Time to live in seconds of cached responses.
+          cache_key: list or function, Query arguments completing the path
+            params in the cache key.
+          cache_max_entries: integer, Maximum number of cached responses.
+          compress: string, Response compression, 'auto', 'gzip' or 'br'.
+          min_size: integer, Minimum size in bytes of compressed responses.
+          is_coroutine: boolean, Whether the method is an async def function.
+          executor: string, Name of the RestService executor pool running
+            the method.
+          coalesce: boolean, Whether identical concurrent requests share one
+            call of the method.
+          coalesce_key: list or function, Query arguments completing the
+            path params in the coalescing key.
+          coalesce_headers: list, Headers completing the coalescing key.
+          coalesce_max_waiters: integer, Maximum number of requests waiting
+            for one call of the method.
+          max_concurrency: integer or 'adaptive', Maximum number of requests
+            served at the same time by the method.
+          max_queue: integer, Maximum number of requests waiting for a slot.
+          queue_timeout: number, Seconds a request may wait for a slot.
+          priority: string, Priority class of the method requests.
+          timeout: number, Seconds after which the method is cancelled.
+          binder: _Binder, Binder of the method parameters.
+          request_schema: dict or class, Schema of the JSON request body.
+          response_schema: dict or class, Schema of the responses.
+          paginate: boolean, Whether the responses are paginated.
+          page_size: integer, Default number of items per page.
+          max_page_size: integer, Maximum number of items per page.
+          cursor_key: function, Cursor of the page after an item.
+          slow_threshold: number, Seconds over which requests are logged as
+            slow.
+          inject: list, Names of the RestService resources passed to the
+            parameters of the same names.
+          stream: string, Streaming protocol of the responses, 'sse'.
+          keepalive: number, Seconds between two keepalive comments of an
+            idle event stream.
+          hooks: list, Hooks of the method.
         """
         self.__name = name
         self.__path = path
         self.__http_method = http_method
         self.__auth_level = auth_level
         self.__content_type = content_type
+        self.__stream_body = stream_body
+        self.__max_body_size = max_body_size
+        self.__cache_ttl = cache_ttl
+        self.__cache_key = cache_key
+        self.__cache_max_entries = cache_max_entries
+        self.__compress = compress
+        self.__min_size = min_size
+        self.__is_coroutine = is_coroutine
+        self.__executor = executor
+        self.__coalesce = coalesce
+        self.__coalesce_key = coalesce_key
+        self.__coalesce_headers = coalesce_headers
+        self.__coalesce_max_waiters = coalesce_max_waiters
+        self.__max_concurrency = max_concurrency
+        self.__max_queue = max_queue
+        self.__queue_timeout = queue_timeout
+        self.__priority = priority
+        self.__timeout = timeout
+        self.__binder = binder
+        self.__request_schema = request_schema
+        self.__response_schema = response_schema
+        self.__paginate = paginate
+        self.__page_size = page_size
+        self.__max_page_size = max_page_size
+        self.__cursor_key = cursor_key
+        self.__slow_threshold = slow_threshold
+        self.__inject = tuple(inject or ())
+        self.__stream = stream
+        self.__keepalive = keepalive
+        self.__hooks = tuple(hooks or ())
 
     def __safe_name(self, method_name):
         """Restrict method name to a-zA-Z0-9_, first char lowercase."""
@@ -318,6 +468,170 @@ class _MethodInfo(object):
     def content_type(self):
         return self.__content_type
 
+    @property
+    def stream_body(self):
+        """Whether the request body is streamed to the method."""
+        return self.__stream_body
+
+    @property
+    def max_body_size(self):
+        """Maximum size in bytes of a streamed request body."""
+        return self.__max_body_size
+
+    @property
+    def cache_ttl(self):
+        """Time to live in seconds of cached responses, None if disabled."""
+        return self.__cache_ttl
+
+    @property
+    def cache_key(self):
+        """Query arguments names or function completing the cache key."""
+        return self.__cache_key
+
+    @property
+    def cache_max_entries(self):
+        """Maximum number of cached responses."""
+        return self.__cache_max_entries
+
+    @property
+    def compress(self):
+        """Response compression, 'auto', 'gzip', 'br' or None if disabled."""
+        return self.__compress
+
+    @property
+    def min_size(self):
+        """Minimum size in bytes of compressed responses."""
+        return self.__min_size
+
+    @property
+    def is_coroutine(self):
+        """Whether the method is an async def function, awaited directly."""
+        return self.__is_coroutine
+
+    @property
+    def executor(self):
+        """Name of the executor pool running the method, None on the
+        IOLoop.
+        """
+        return self.__executor
+
+    @property
+    def coalesce(self):
+        """Whether identical concurrent requests share one call."""
+        return self.__coalesce
+
+    @property
+    def coalesce_key(self):
+        """Query arguments names or function completing the coalescing
+        key.
+        """
+        return self.__coalesce_key
+
+    @property
+    def coalesce_headers(self):
+        """Headers names completing the coalescing key."""
+        return self.__coalesce_headers
+
+    @property
+    def coalesce_max_waiters(self):
+        """Maximum number of requests waiting for one call."""
+        return self.__coalesce_max_waiters
+
+    @property
+    def max_concurrency(self):
+        """Maximum number of requests served at the same time, None if
+        unlimited.
+        """
+        return self.__max_concurrency
+
+    @property
+    def max_queue(self):
+        """Maximum number of requests waiting for a slot."""
+        return self.__max_queue
+
+    @property
+    def queue_timeout(self):
+        """Seconds a request may wait for a slot."""
+        return self.__queue_timeout
+
+    @property
+    def priority(self):
+        """Priority class of the requests, None for the default one."""
+        return self.__priority
+
+    @property
+    def timeout(self):
+        """Seconds after which the method is cancelled, None if
+        unbounded.
+        """
+        return self.__timeout
+
+    @property
+    def binder(self):
+        """_Binder of the method parameters, compiled from its signature."""
+        return self.__binder
+
+    @property
+    def request_schema(self):
+        """Schema of the JSON request body, None if not validated."""
+        return self.__request_schema
+
+    @property
+    def response_schema(self):
+        """Schema of the responses, None if not validated."""
+        return self.__response_schema
+
+    @property
+    def paginate(self):
+        """Whether the responses are paginated."""
+        return self.__paginate
+
+    @property
+    def page_size(self):
+        """Default number of items per page."""
+        return self.__page_size
+
+    @property
+    def max_page_size(self):
+        """Maximum number of items per page."""
+        return self.__max_page_size
+
+    @property
+    def cursor_key(self):
+        """Function getting the cursor of the page after an item, None for
+        offset cursors.
+        """
+        return self.__cursor_key
+
+    @property
+    def slow_threshold(self):
+        """Seconds over which requests are logged as slow, None for the
+        RestService default.
+        """
+        return self.__slow_threshold
+
+    @property
+    def inject(self):
+        """Names of the RestService resources injected into the method."""
+        return self.__inject
+
+    @property
+    def stream(self):
+        """Streaming protocol of the responses, None if not streamed."""
+        return self.__stream
+
+    @property
+    def keepalive(self):
+        """Seconds between two keepalive comments of an idle event stream,
+        None for the default.
+        """
+        return self.__keepalive
+
+    @property
+    def hooks(self):
+        """Hooks of the method."""
+        return self.__hooks
+
     def method_id(self, api_info):
         """Computed method name."""
         if api_info.resource_name:
@@ -328,9 +642,27 @@ class _MethodInfo(object):
                             self.__safe_name(self.name))
 
 
+def _copy_function(func):
+    """Get a new function object sharing the code, globals, defaults and
+    closure of a function, called without any wrapper overhead.
+    """
+    copy = types.FunctionType(func.__code__, func.__globals__, func.__name__,
+                              func.__defaults__, func.__closure__)
+    copy.__kwdefaults__ = func.__kwdefaults__
+    return functools.update_wrapper(copy, func)
+
+
 def method(
         name=None, path=None, http_method='POST', auth_level=None,
-        content_type='application/json'):
+        content_type='application/json', stream_body=False,
+        max_body_size=None, cache_ttl=None, cache_key=None,
+        cache_max_entries=None, compress=None, min_size=None, executor=None,
+        coalesce=False, coalesce_key=None, coalesce_headers=None,
+        coalesce_max_waiters=None, max_concurrency=None, max_queue=0,
+        queue_timeout=None, priority=None, timeout=None, request_schema=None,
+        response_schema=None, paginate=False, page_size=None,
+        max_page_size=None, cursor_key=None, slow_threshold=None,
+        inject=None, stream=None, keepalive=None, hooks=None):
     """Decorate a Method for use by the framework above.
 
     This decorator can be used to specify a method name, path, http method,
@@ -343,12 +675,133 @@ def method(
       ...
       return response
 
+    The parameters of the method following the path params are bound, by
+    name, to the query arguments or the fields of a JSON object body, and
+    coerced to their annotation (int, float, bool, str, uuid.UUID, list[X]
+    or Optional[X]) or to the type of their default value. Parameters
+    without a default value are required. Invalid or missing values are
+    answered with a 400 listing the errors.
+
     Args:
     name: string, Name of the method, prepended with <apiname>. to make it
       unique. (Default: python method name)
     path: string, Path portion of the URL to the method, for RESTful methods.
+      Path params are written {name} or {name:type}, type being one of int,
+      float, str (the default) or uuid; values are converted before the
+      method is called, ill-typed ones answered with a JSON 404.
     http_method: string, HTTP method supported by the method. (Default: POST)
-    auth_level: enum from AUTH_LEVEL, Frontend auth level for the method.
+    auth_level: enum from AUTH_LEVEL, Frontend auth level for the method,
+      enforced before the hooks, see RestService(authenticate).
+      (Default: None, the level of the class or API)
+    content_type: string, Content type of the request body.
+      (Default: application/json)
+    stream_body: boolean, Route the request as soon as its headers arrive and
+      feed the body to the method while it is received, through
+      self.body_stream. JSON and NDJSON bodies are fed record by record, framed
+      after the request Content-Type (an application/json body is an array of
+      records, an application/x-ndjson one a sequence of records), other
+      bodies chunk by chunk. (Default: False)
+    max_body_size: integer, Maximum size in bytes of a streamed request body,
+      larger bodies are rejected with a 413. (Default: server limit)
+    cache_ttl: number, Cache the encoded dict/list responses of this GET
+      method in process for this many seconds, with the status code and
+      headers the method set. Hits skip the method and the serialization,
+      responses carry an ETag and If-None-Match is answered with a 304 for
+      200s. Invalidate with RestService.invalidate_cache().
+      (Default: None, no cache)
+    cache_key: list of query arguments names, or function called with the
+      request handler returning a hashable value, completing the path params
+      in the cache key. The limit and cursor arguments of paginated methods
+      always complete it. (Default: None, path params and the query
+      arguments bound to parameters)
+    cache_max_entries: integer, Maximum number of cached responses, least
+      recently used ones are evicted first. (Default: 1024)
+    compress: string, Compress dict/list responses with the encoding
+      negotiated from Accept-Encoding: 'auto' for the best one available
+      (br when brotli is installed, else gzip), 'gzip' or 'br'. Cached
+      responses are compressed once per encoding. (Default: None)
+    min_size: integer, Responses smaller than this many bytes are sent
+      uncompressed. (Default: 1024)
+    executor: string, Run the method off the IOLoop in a RestService executor
+      pool: 'thread', 'process' or the name of a pool given to RestService.
+      Methods run in a process pool get a picklable stand-in exposing only
+      self.request instead of the handler. (Default: None, on the IOLoop)
+    coalesce: boolean, Single-flight this GET method: identical requests
+      arriving while one is being served wait for its encoded dict/list
+      response instead of calling the method again, and get the same bytes,
+      status code and headers (or the same error). Counted in the
+      restful_coalesced_requests_total metric. (Default: False)
+    coalesce_key: list of query arguments names, or function called with the
+      request handler returning a hashable value, completing the path params
+      in the coalescing key. The limit and cursor arguments of paginated
+      methods always complete it. (Default: None, path params and the query
+      arguments bound to parameters)
+    coalesce_headers: list of headers names completing the coalescing key,
+      e.g. ['Accept-Language']. (Default: None)
+    coalesce_max_waiters: integer, Maximum number of requests waiting for one
+      call, the next identical requests call the method themselves.
+      (Default: 1000)
+    max_concurrency: integer or 'adaptive', Maximum number of requests served
+      at the same time by the method. 'adaptive' adjusts the limit to the
+      latency gradient. Requests over the limit (or over the limit of the
+      class, see api_class()) are answered with a fast 503 and a Retry-After
+      header, before the body is decoded. (Default: None, unlimited)
+    max_queue: integer, Maximum number of requests waiting for a slot, by
+      priority then arrival order. A full queue rejects its lowest priority
+      waiter to make room for a higher priority request. (Default: 0)
+    queue_timeout: number, Seconds a request may wait for a slot.
+      (Default: None, 1 second)
+    priority: string, Priority class of the requests: 'critical' ones may use
+      a whole limit, 'normal' ones 90% of it and 'sheddable' ones half of it,
+      so cheap critical methods keep being served while sheddable ones are
+      rejected. (Default: 'normal')
+    timeout: number, Seconds the method may run: past this deadline (or the
+      client deadline sent in the RestService(deadline_header) header when
+      it is enabled, whichever is sooner) it is cancelled and a 504 is
+      answered. Methods read the time left with self.remaining_time().
+      (Default: None, unbounded)
+    request_schema: dict, JSON-Schema (subset) of the decoded JSON request
+      body, or a dataclass or TypedDict class. It is compiled into a
+      validator when the RestService starts, and bodies which do not match
+      are answered with a 400 before the method is called. With stream_body,
+      each record of the JSON or NDJSON body is validated instead, and
+      self.body_stream raises the 400 at the first invalid one.
+      (Default: None)
+    response_schema: dict, JSON-Schema (subset) of the dict/list responses,
+      or a dataclass or TypedDict class. Responses are validated as set by
+      RestService(response_validation=...), by default only in debug mode.
+      (Default: None)
+    paginate: boolean, Paginate this GET method. Requests select a page with
+      the limit and cursor query arguments. The method reads them from
+      self.page (or from limit and cursor parameters) and returns the items
+      of the page, as a list, an iterator or an async iterator, read up to
+      one item past the limit. The response is {"items": [...], "cursor":
+      token, "next": url} with a Link header, cursor and next being null on
+      the last page. Cursors are opaque tokens signed with the RestService
+      cursor_secret. (Default: False)
+    page_size: integer, Items per page when the request sets no limit.
+      (Default: 50)
+    max_page_size: integer, Maximum items per page. (Default: 1000)
+    cursor_key: function, Called with the last item of a page, returning the
+      JSON-serializable cursor of the next page (keyset pagination). Without
+      it, cursors are offsets. Methods may also set self.page.next_cursor.
+      (Default: None)
+    slow_threshold: number, Requests lasting more than this many seconds are
+      logged to the tornado_restful.slow_requests logger with the duration
+      of each phase. (Default: None, the RestService slow_request_threshold)
+    inject: list, Names of RestService resources (see RestService(resources))
+      passed to the parameters of the same names, e.g. inject=['db'] for
+      def get_book(self, id, db). (Default: None)
+    stream: string, 'sse' to answer this GET method with a Server-Sent Events
+      stream held open while the method yields events (ServerSentEvent, or
+      any value sent as the data of a message), e.g. an async generator or a
+      Broadcast subscription. Events are flushed one at a time, waiting for
+      the client to receive each one. Resuming clients' Last-Event-ID is read
+      from self.last_event_id. (Default: None)
+    keepalive: number, Seconds between two keepalive comments of an idle
+      event stream. (Default: 15)
+    hooks: list, Hooks of the method, run after the RestService, API and
+      class ones, see RestService(hooks). (Default: None)
 
     Returns:
     'apiserving_method_wrapper' function.
@@ -365,24 +818,43 @@ def method(
           api_method: Original method being wrapped.
 
         Returns:
-          Function responsible for actual invocation.
-          Assigns the following attributes to invocation function:
-            remote: Instance of RemoteInfo, contains remote method information.
+          A copy of the original method, called directly by the dispatcher,
+          so a function can be decorated once per path or verb it serves.
+          Assigns the following attributes to the copy:
             method_info: Instance of _MethodInfo, api method configuration.
-          It is also assigned attributes corresponding to the aforementioned
-          kwargs.
-        """
-        def invoke_remote(*args, **kwargs):
-            return api_method(*args, **kwargs)
 
-        invoke_remote.method_info = _MethodInfo(
+        Raises:
+          ApiConfigurationError: If the method is already decorated.
+        """
+        if getattr(api_method, 'method_info', None) is not None:
+            raise ApiConfigurationError(
+                '%s is already decorated with @method' % (
+                    api_method.__name__))
+        if isinstance(api_method, types.FunctionType):
+            api_method = _copy_function(api_method)
+        api_method.method_info = _MethodInfo(
             name=name or api_method.__name__, path=path or api_method.__name__,
             http_method=http_method or DEFAULT_HTTP_METHOD,
             auth_level=auth_level,
-            content_type=content_type or DEFAULT_CONTENT_TYPE)
-        invoke_remote.__name__ = invoke_remote.method_info.name
-
-        return invoke_remote
+            content_type=content_type or DEFAULT_CONTENT_TYPE,
+            stream_body=stream_body, max_body_size=max_body_size,
+            cache_ttl=cache_ttl, cache_key=cache_key,
+            cache_max_entries=cache_max_entries, compress=compress,
+            min_size=min_size,
+            is_coroutine=inspect.iscoroutinefunction(api_method),
+            executor=executor, coalesce=coalesce, coalesce_key=coalesce_key,
+            coalesce_headers=coalesce_headers,
+            coalesce_max_waiters=coalesce_max_waiters,
+            max_concurrency=max_concurrency, max_queue=max_queue,
+            queue_timeout=queue_timeout, priority=priority, timeout=timeout,
+            binder=_Binder.from_function(api_method),
+            request_schema=request_schema, response_schema=response_schema,
+            paginate=paginate, page_size=page_size,
+            max_page_size=max_page_size, cursor_key=cursor_key,
+            slow_threshold=slow_threshold, inject=inject, stream=stream,
+            keepalive=keepalive, hooks=hooks)
+
+        return api_method
 
     # _CheckEnum(auth_level, AUTH_LEVEL, 'auth_level')
     return apiserving_method_decorator
@@ -0,0 +1,303 @@
+# standard library imports
+import asyncio
+import collections
+import itertools
+import re
+
+# third-party imports
+from tornado.concurrent import Future
+from tornado.iostream import StreamClosedError
+
+# application-specific imports
+from .api_codecs import default_json_codec
+
+# Line breaks of the text/event-stream format, other Unicode line
+# boundaries being sent as is.
+_LINE_BREAK_RE = re.compile(r'\r\n|\r|\n')
+
+# Seconds between two keepalive comments of an idle event stream, keeping
+# proxies from closing the connection.
+DEFAULT_KEEPALIVE = 15.0
+
+# Events buffered for a broadcast subscriber writing slower than the events
+# are published; past it the subscriber is dropped, and resumes from its
+# Last-Event-ID when it reconnects.
+DEFAULT_MAX_QUEUE = 256
+
+EVENT_STREAM_CONTENT_TYPE = 'text/event-stream; charset=utf-8'
+
+_KEEPALIVE_COMMENT = b': keepalive\n\n'
+
+
+class ServerSentEvent(object):
+    """An event of a text/event-stream response.
+
+    Methods declared with @method(stream='sse') yield these, or any other
+    value sent as the data of an unnamed event.
+    """
+    __slots__ = ('data', 'event', 'id', 'retry')
+
+    def __init__(self, data=None, event=None, id=None, retry=None):
+        """Constructor for ServerSentEvent.
+
+        Args:
+            data: Data of the event: strings are sent as is, other values
+              encoded to JSON. (Default: None, no data)
+            event: string, Event type. (Default: None, 'message')
+            id: string, Event identifier, sent back by reconnecting clients
+              in the Last-Event-ID header. (Default: None)
+            retry: integer, Milliseconds clients wait before reconnecting.
+              (Default: None)
+        """
+        self.data = data
+        self.event = event
+        self.id = id
+        self.retry = retry
+
+    def encode(self, codec):
+        """Encode the event in the text/event-stream format.
+
+        Args:
+            codec: JSON codec of the non-string data.
+
+        Raises:
+            ValueError: If the event type or identifier has a line break.
+        """
+        lines = []
+        for field, value in (('id', self.id), ('event', self.event)):
+            if value is not None:
+                value = str(value)
+                if '\n' in value or '\r' in value:
+                    raise ValueError('Line break in the event %s' % field)
+                lines.append('%s: %s' % (field, value))
+        if self.retry is not None:
+            lines.append('retry: %d' % self.retry)
+        data = self.data
+        if data is not None:
+            if not isinstance(data, str):
+                data = codec.encode(data).decode('utf-8')
+            lines.extend(
+                'data: ' + line for line in _LINE_BREAK_RE.split(data))
+        return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+class _EncodedEvent(object):
+    """An event encoded once for all the subscribers of a broadcast."""
+    __slots__ = ('id', 'payload')
+
+    def __init__(self, id, payload):
+        self.id = id
+        self.payload = payload
+
+    def encode(self, codec):
+        return self.payload
+
+
+class _Subscription(object):
+    """Events of a broadcast pending for a subscriber, as an async
+    iterator.
+    """
+    def __init__(self, broadcast, backlog, max_queue):
+        self.__broadcast = broadcast
+        self.__events = collections.deque(backlog)
+        self.__max_queue = max_queue
+        self.__waiter = None
+        self.__ended = False
+
+    def put(self, event):
+        """Queue an event, dropping the subscriber when it lags behind."""
+        if len(self.__events) >= self.__max_queue:
+            self.end()
+            return
+        self.__events.append(event)
+        self.__wake()
+
+    def end(self):
+        """End the iteration once the queued events are consumed, none at
+        all when the subscriber lags behind.
+        """
+        if len(self.__events) >= self.__max_queue:
+            self.__events.clear()
+        self.__ended = True
+        self.__broadcast.unsubscribe(self)
+        self.__wake()
+
+    def __wake(self):
+        if self.__waiter is not None and not self.__waiter.done():
+            self.__waiter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.__events:
+            if self.__ended:
+                raise StopAsyncIteration
+            self.__waiter = Future()
+            await self.__waiter
+        return self.__events.popleft()
+
+    async def aclose(self):
+        self.__ended = True
+        self.__broadcast.unsubscribe(self)
+
+
+class Broadcast(object):
+    """Fans events out to the event streams subscribed to it.
+
+    Each event is encoded once whatever the number of subscribers, and
+    publishing only queues it for each of them: no method is called per
+    subscriber. Sample usage:
+
+      news = Broadcast(history=100)
+
+      @method(path='news', http_method='GET', stream='sse')
+      def news_stream(self):
+          return news.subscribe(self.last_event_id)
+
+      news.publish({'title': 'Hello'})
+    """
+    def __init__(self, history=0, max_queue=DEFAULT_MAX_QUEUE,
+                 json_codec=None):
+        """Constructor for Broadcast.
+
+        Args:
+            history: integer, Number of past events replayed to subscribers
+              resuming from a Last-Event-ID. (Default: 0)
+            max_queue: integer, Events buffered per subscriber, subscribers
+              lagging further behind are dropped. (Default: 256)
+            json_codec: JSON codec of the events data.
+              (Default: the fastest one installed)
+        """
+        self.__subscriptions = set()
+        self.__history = collections.deque(maxlen=history or 0)
+        self.__max_queue = max_queue
+        self.__codec = json_codec or default_json_codec
+        self.__counter = itertools.count(1)
+
+    def publish(self, data=None, event=None, id=None):
+        """Send an event to the subscribers.
+
+        Args:
+            data: Data of the event, see ServerSentEvent.
+            event: string, Event type. (Default: None, 'message')
+            id: string, Event identifier. (Default: None, a sequence number)
+
+        Returns:
+            The event identifier.
+        """
+        if id is None:
+            id = str(next(self.__counter))
+        encoded = _EncodedEvent(id, ServerSentEvent(
+            data, event, id).encode(self.__codec))
+        self.__history.append(encoded)
+        for subscription in list(self.__subscriptions):
+            subscription.put(encoded)
+        return id
+
+    def subscribe(self, last_event_id=None):
+        """Subscribe to the events published from now on.
+
+        Args:
+            last_event_id: string, Identifier of the last event received by
+              a resuming client: the events published after it which are
+              still in the history are sent first. (Default: None)
+
+        Returns:
+            An async iterator of the events, to return from an SSE method.
+        """
+        backlog = ()
+        if last_event_id is not None:
+            ids = [event.id for event in self.__history]
+            if last_event_id in ids:
+                backlog = list(self.__history)[ids.index(last_event_id) + 1:]
+            else:
+                backlog = list(self.__history)
+        subscription = _Subscription(self, backlog, self.__max_queue)
+        self.__subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.__subscriptions.discard(subscription)
+
+    def close(self):
+        """End the event streams of the subscribers."""
+        for subscription in list(self.__subscriptions):
+            subscription.end()
+
+    def __len__(self):
+        return len(self.__subscriptions)
+
+
+async def write_event_stream(handler, events, keepalive=None):
+    """Stream events as a text/event-stream response.
+
+    Each event is flushed as soon as it is produced, and the next one is only
+    requested once the client received it, applying the connection
+    backpressure. Idle streams send a keepalive comment every keepalive
+    seconds. The stream ends when the events do or the client disconnects.
+
+    Args:
+        handler: RestResource, Handler of the request.
+        events: iterable or async iterable of events, see ServerSentEvent.
+        keepalive: number, Seconds between two keepalive comments.
+          (Default: DEFAULT_KEEPALIVE)
+    """
+    keepalive = keepalive or DEFAULT_KEEPALIVE
+    codec = handler.json_codec
+    handler.set_header('Content-Type', EVENT_STREAM_CONTENT_TYPE)
+    handler.set_header('Cache-Control', 'no-cache')
+    # Disable the response buffering of nginx.
+    handler.set_header('X-Accel-Buffering', 'no')
+    closed = handler._event_stream_closed = Future()
+    pending = None
+    try:
+        if handler.request.method == 'HEAD':
+            handler.finish()
+            return
+        await handler.flush()
+        if not hasattr(events, '__aiter__'):
+            for event in events:
+                handler.write(_encode_event(event, codec))
+                await handler.flush()
+        else:
+            iterator = events.__aiter__()
+            while not closed.done():
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                await asyncio.wait((pending, closed), timeout=keepalive,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if closed.done():
+                    return
+                if not pending.done():
+                    handler.write(_KEEPALIVE_COMMENT)
+                    await handler.flush()
+                    continue
+                done, pending = pending, None
+                try:
+                    event = done.result()
+                except StopAsyncIteration:
+                    break
+                handler.write(_encode_event(event, codec))
+                await handler.flush()
+    except StreamClosedError:
+        # The client went away, stop producing events.
+        return
+    finally:
+        if pending is not None:
+            pending.cancel()
+            # An async generator can only be closed once the step it runs
+            # is cancelled.
+            await asyncio.wait((pending,))
+        if hasattr(events, 'aclose'):
+            await events.aclose()
+        elif hasattr(events, 'close'):
+            events.close()
+    if not closed.done():
+        handler.finish()
+
+
+def _encode_event(event, codec):
+    if not isinstance(event, (ServerSentEvent, _EncodedEvent)):
+        event = ServerSentEvent(event)
+    return event.encode(codec)
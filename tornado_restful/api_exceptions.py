@@ -0,0 +1,5 @@
+"""A library containing exception types used by Endpoints."""
+
+
+class ApiConfigurationError(Exception):
+    """Exception thrown if there's an error in the API configuration."""
@@ -0,0 +1,172 @@
+# standard library imports
+import concurrent.futures
+import functools
+import os
+
+# third-party imports
+import tornado.httputil
+from tornado.ioloop import IOLoop
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+EXECUTOR_KINDS = ('thread', 'process')
+
+
+def _default_max_workers(kind):
+    """Default size of a pool, as chosen by concurrent.futures."""
+    cpu_count = os.cpu_count() or 1
+    if kind == 'thread':
+        return min(32, cpu_count + 4)
+    return cpu_count
+
+
+class _RequestSnapshot(object):
+    """Picklable copy of the request attributes a method may read."""
+    def __init__(self, request):
+        self.method = request.method
+        self.uri = request.uri
+        self.path = request.path
+        self.query = request.query
+        self.headers = tornado.httputil.HTTPHeaders(request.headers)
+        self.arguments = request.arguments
+        self.query_arguments = request.query_arguments
+        self.body_arguments = request.body_arguments
+        self.body = request.body
+        self.remote_ip = request.remote_ip
+
+
+class _HandlerSnapshot(object):
+    """Stand-in for the RequestHandler passed to methods run in a process.
+
+    Only self.request (a _RequestSnapshot) is available to such methods.
+    """
+    def __init__(self, handler):
+        self.request = _RequestSnapshot(handler.request)
+
+
+class _ExecutorPool(object):
+    """Named pool running resource methods off the IOLoop.
+
+    Keeps queue depth and saturation counters. They are only updated from
+    the IOLoop thread, so no locking is needed.
+    """
+    def __init__(self, name, kind='thread', max_workers=None, executor=None):
+        """Constructor for _ExecutorPool.
+
+        Args:
+            name: string, Name of the pool, used by @method(executor=name).
+            kind: string, 'thread' or 'process'. (Default: 'thread')
+            max_workers: integer, Size of the pool.
+              (Default: concurrent.futures default)
+            executor: concurrent.futures.Executor, Existing executor to use
+              instead of creating one on first use. (Default: None)
+
+        Raises:
+            ApiConfigurationError: If kind is not a known pool kind.
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ApiConfigurationError('Unknown executor kind: %s' % kind)
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers or getattr(
+            executor, '_max_workers', None) or _default_max_workers(kind)
+        self.__executor = executor
+        self.__in_flight = 0
+        self.__peak_in_flight = 0
+        self.__submitted = 0
+        self.__completed = 0
+
+    @property
+    def executor(self):
+        """The concurrent.futures executor, created on first use so that no
+        worker is started before the server processes are forked.
+        """
+        if self.__executor is None:
+            if self.kind == 'thread':
+                self.__executor = concurrent.futures.ThreadPoolExecutor(
+                    self.max_workers,
+                    thread_name_prefix='tornado-restful-%s' % self.name)
+            else:
+                self.__executor = concurrent.futures.ProcessPoolExecutor(
+                    self.max_workers)
+        return self.__executor
+
+    async def run(self, func, handler, params_values, kwargs=None):
+        """Run a resource function in the pool.
+
+        Methods run in a process pool get a _HandlerSnapshot instead of the
+        request handler, their function and result must be picklable.
+
+        Returns:
+            The result of the function.
+        """
+        if self.kind == 'process':
+            handler = _HandlerSnapshot(handler)
+        if kwargs:
+            func = functools.partial(func, **kwargs)
+        self.__submitted += 1
+        self.__in_flight += 1
+        if self.__in_flight > self.__peak_in_flight:
+            self.__peak_in_flight = self.__in_flight
+        try:
+            return await IOLoop.current().run_in_executor(
+                self.executor, func, handler, *params_values)
+        finally:
+            self.__in_flight -= 1
+            self.__completed += 1
+
+    def stats(self):
+        """Get the pool counters.
+
+        Returns:
+            Dict with the pool kind and size, the number of calls in flight,
+            queued (waiting for a worker), their peak, the saturation (calls in
+            flight per worker, 1.0 when all workers are busy) and the number
+            of calls submitted and completed.
+        """
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'in_flight': self.__in_flight,
+            'queued': max(0, self.__in_flight - self.max_workers),
+            'peak_in_flight': self.__peak_in_flight,
+            'saturation': float(self.__in_flight) / self.max_workers,
+            'submitted': self.__submitted,
+            'completed': self.__completed,
+        }
+
+    def shutdown(self, wait=True):
+        """Shut the executor down, if it was started."""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=wait)
+            self.__executor = None
+
+
+def create_executor_pools(executors=None):
+    """Create the executor pools of a RestService.
+
+    Args:
+        executors: dict, Pools by name. Values are a kind ('thread' or
+          'process'), a (kind, max_workers) tuple or a concurrent.futures
+          executor. 'thread' and 'process' pools of the default size exist
+          unless overridden. (Default: None)
+
+    Returns:
+        Dict of _ExecutorPool by name.
+    """
+    specs = {'thread': 'thread', 'process': 'process'}
+    specs.update(executors or {})
+    pools = {}
+    for name, spec in specs.items():
+        if isinstance(spec, concurrent.futures.Executor):
+            if isinstance(spec, concurrent.futures.ProcessPoolExecutor):
+                kind = 'process'
+            else:
+                kind = 'thread'
+            pools[name] = _ExecutorPool(name, kind, executor=spec)
+        elif isinstance(spec, tuple):
+            pools[name] = _ExecutorPool(name, spec[0], max_workers=spec[1])
+        else:
+            pools[name] = _ExecutorPool(name, spec)
+    return pools
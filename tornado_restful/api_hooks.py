@@ -0,0 +1,113 @@
+# standard library imports
+import inspect
+
+# third-party imports
+import tornado.web
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+
+class AUTH_LEVEL(object):
+    """Authentication levels of the methods.
+
+    REQUIRED: requests must be authenticated, else they are answered with a
+      401.
+    OPTIONAL: requests may be anonymous, but invalid credentials fail them.
+    OPTIONAL_CONTINUE: requests with invalid credentials are served as
+      anonymous.
+    NONE: requests are not authenticated.
+    """
+    REQUIRED = 'REQUIRED'
+    OPTIONAL = 'OPTIONAL'
+    OPTIONAL_CONTINUE = 'OPTIONAL_CONTINUE'
+    NONE = 'NONE'
+
+
+_AUTH_LEVELS = (AUTH_LEVEL.REQUIRED, AUTH_LEVEL.OPTIONAL,
+                AUTH_LEVEL.OPTIONAL_CONTINUE, AUTH_LEVEL.NONE)
+
+
+def _default_authenticate(handler):
+    return handler.get_current_user()
+
+
+def _authentication_hook(auth_level, authenticate=None):
+    """Get the hook enforcing an authentication level.
+
+    Args:
+        auth_level: string, AUTH_LEVEL value, None for AUTH_LEVEL.NONE.
+        authenticate: function, Called with the request handler, sync or
+          async, returning the user or None for anonymous requests, and
+          raising an HTTPError for invalid credentials.
+          (Default: None, the handler get_current_user() method)
+
+    Returns:
+        The before hook setting handler.current_user, None when requests are
+        not authenticated.
+
+    Raises:
+        ApiConfigurationError: If the level is unknown.
+    """
+    if auth_level is None or auth_level == AUTH_LEVEL.NONE:
+        return None
+    if auth_level not in _AUTH_LEVELS:
+        raise ApiConfigurationError('Unknown auth_level: %r' % (auth_level,))
+    authenticate = authenticate or _default_authenticate
+
+    async def authenticate_request(handler):
+        try:
+            user = authenticate(handler)
+            if inspect.isawaitable(user):
+                user = await user
+        except tornado.web.HTTPError as e:
+            if (auth_level != AUTH_LEVEL.OPTIONAL_CONTINUE or
+                    e.status_code not in (401, 403)):
+                raise
+            user = None
+        if user is None and auth_level == AUTH_LEVEL.REQUIRED:
+            raise tornado.web.HTTPError(401, 'Authentication required')
+        handler.current_user = user
+    return authenticate_request
+
+
+def compile_hooks(hooks, auth_level=None, authenticate=None):
+    """Flatten hooks into the call sequences of a route.
+
+    Args:
+        hooks: list, Hooks from the outermost (RestService) to the innermost
+          (@method). A hook is a function called with the request handler
+          before the method, or an object with before(handler) and/or
+          after(handler, response) methods. Any of them may be async. A
+          before hook returning a value other than None answers the request
+          with it, without calling the next hooks nor the method; an after
+          hook returning a value other than None replaces the response.
+        auth_level: string, AUTH_LEVEL of the route, enforced first.
+          (Default: None)
+        authenticate: function, See _authentication_hook(). (Default: None)
+
+    Returns:
+        A (before functions tuple, after functions tuple) tuple, after hooks
+        being called innermost first.
+
+    Raises:
+        ApiConfigurationError: If a hook or the auth_level is invalid.
+    """
+    before = []
+    after = []
+    authentication = _authentication_hook(auth_level, authenticate)
+    if authentication is not None:
+        before.append(authentication)
+    for hook in hooks:
+        before_hook = getattr(hook, 'before', None)
+        after_hook = getattr(hook, 'after', None)
+        if before_hook is None and after_hook is None:
+            if not callable(hook):
+                raise ApiConfigurationError('Invalid hook: %r' % (hook,))
+            before_hook = hook
+        if before_hook is not None:
+            before.append(before_hook)
+        if after_hook is not None:
+            after.append(after_hook)
+    after.reverse()
+    return tuple(before), tuple(after)
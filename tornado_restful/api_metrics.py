@@ -0,0 +1,220 @@
+# standard library imports
+import bisect
+
+# third-party imports
+import tornado.web
+
+# application-specific imports
+
+# Upper bounds in seconds of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+_PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _StatusMetrics(object):
+    """Counters of the requests of a method answered with a status code."""
+    __slots__ = ('count', 'buckets', 'latency_sum', 'request_bytes',
+                 'response_bytes')
+
+    def __init__(self):
+        self.count = 0
+        # Non cumulative count per LATENCY_BUCKETS bucket, plus +Inf.
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class _MethodMetrics(object):
+    """Counters of a method."""
+    __slots__ = ('in_flight', 'statuses')
+
+    def __init__(self):
+        self.in_flight = 0
+        self.statuses = {}
+
+
+class MetricsRegistry(object):
+    """Per method request metrics of a RestService.
+
+    Counters are plain integers only updated from the IOLoop thread, so
+    recording a request takes no lock. Each server process has its own
+    registry.
+    """
+    def __init__(self):
+        self.__methods = {}
+        # Additional counters: name -> (help, {labels tuple: value}).
+        self.__counters = {}
+
+    def __method(self, method_id):
+        method_metrics = self.__methods.get(method_id)
+        if method_metrics is None:
+            method_metrics = self.__methods[method_id] = _MethodMetrics()
+        return method_metrics
+
+    def request_started(self, method_id):
+        """Record the start of a request routed to a method."""
+        self.__method(method_id).in_flight += 1
+
+    def request_finished(self, method_id, status_code, latency,
+                         request_bytes, response_bytes):
+        """Record a finished request of a method.
+
+        Args:
+            method_id: string, Method identifier.
+            status_code: integer, HTTP status code of the response.
+            latency: float, Duration of the request in seconds.
+            request_bytes: integer, Size of the request body.
+            response_bytes: integer, Size of the response body.
+        """
+        method_metrics = self.__method(method_id)
+        method_metrics.in_flight -= 1
+        status_metrics = method_metrics.statuses.get(status_code)
+        if status_metrics is None:
+            status_metrics = method_metrics.statuses[status_code] = (
+                _StatusMetrics())
+        status_metrics.count += 1
+        status_metrics.buckets[
+            bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        status_metrics.latency_sum += latency
+        status_metrics.request_bytes += request_bytes
+        status_metrics.response_bytes += response_bytes
+
+    def increment(self, name, help_text, labels, value=1):
+        """Increment an additional counter.
+
+        Args:
+            name: string, Counter name, without the 'restful_' prefix.
+            help_text: string, Description of the counter.
+            labels: tuple of (name, value) tuples, Labels of the counter.
+            value: number, Increment. (Default: 1)
+        """
+        counter = self.__counters.get(name)
+        if counter is None:
+            counter = self.__counters[name] = (help_text, {})
+        values = counter[1]
+        values[labels] = values.get(labels, 0) + value
+
+    def snapshot(self):
+        """Get the counters of every method.
+
+        Returns:
+            Dict by method_id of dicts with the 'in_flight' gauge and, by
+            status code, the 'count', 'latency_sum', 'request_bytes' and
+            'response_bytes' counters.
+        """
+        methods = {}
+        for method_id, method_metrics in self.__methods.items():
+            statuses = {}
+            for status_code, status_metrics in method_metrics.statuses.items():
+                statuses[status_code] = {
+                    'count': status_metrics.count,
+                    'latency_sum': status_metrics.latency_sum,
+                    'request_bytes': status_metrics.request_bytes,
+                    'response_bytes': status_metrics.response_bytes,
+                }
+            methods[method_id] = {
+                'in_flight': method_metrics.in_flight,
+                'statuses': statuses,
+            }
+        return methods
+
+    def render(self, executor_stats=None):
+        """Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            executor_stats: dict, Executor pools counters by pool name, as
+              returned by RestService.executor_stats(). (Default: None)
+
+        Returns:
+            The metrics document, a string.
+        """
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append('# HELP restful_%s %s' % (name, help_text))
+            lines.append('# TYPE restful_%s %s' % (name, kind))
+
+        methods = sorted(self.__methods.items())
+        family('requests_in_flight', 'gauge',
+               'Requests being served, by method.')
+        for method_id, method_metrics in methods:
+            lines.append('restful_requests_in_flight{method_id="%s"} %d' % (
+                method_id, method_metrics.in_flight))
+
+        family('requests_total', 'counter',
+               'Requests served, by method and status code.')
+        for method_id, method_metrics in methods:
+            for code, status_metrics in sorted(
+                    method_metrics.statuses.items()):
+                lines.append(
+                    'restful_requests_total{method_id="%s",code="%d"} %d' % (
+                        method_id, code, status_metrics.count))
+
+        family('request_duration_seconds', 'histogram',
+               'Duration of the requests, by method and status code.')
+        for method_id, method_metrics in methods:
+            for code, status_metrics in sorted(
+                    method_metrics.statuses.items()):
+                labels = 'method_id="%s",code="%d"' % (method_id, code)
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS,
+                                        status_metrics.buckets):
+                    cumulative += count
+                    lines.append(
+                        'restful_request_duration_seconds_bucket{%s,le="%s"} '
+                        '%d' % (labels, bound, cumulative))
+                lines.append(
+                    'restful_request_duration_seconds_bucket{%s,le="+Inf"} '
+                    '%d' % (labels, status_metrics.count))
+                lines.append('restful_request_duration_seconds_sum{%s} %r' % (
+                    labels, status_metrics.latency_sum))
+                lines.append(
+                    'restful_request_duration_seconds_count{%s} %d' % (
+                        labels, status_metrics.count))
+
+        for name, attribute, help_text in (
+                ('request_bytes_total', 'request_bytes',
+                 'Size of the request bodies, by method and status code.'),
+                ('response_bytes_total', 'response_bytes',
+                 'Size of the response bodies, by method and status code.')):
+            family(name, 'counter', help_text)
+            for method_id, method_metrics in methods:
+                for code, status_metrics in sorted(
+                        method_metrics.statuses.items()):
+                    lines.append('restful_%s{method_id="%s",code="%d"} %d' % (
+                        name, method_id, code,
+                        getattr(status_metrics, attribute)))
+
+        for name, (help_text, values) in sorted(self.__counters.items()):
+            family(name, 'counter', help_text)
+            for labels, value in sorted(values.items()):
+                lines.append('restful_%s{%s} %r' % (name, ','.join(
+                    '%s="%s"' % label for label in labels), value))
+
+        if executor_stats:
+            for stat, kind, help_text in (
+                    ('in_flight', 'gauge', 'Calls running or queued.'),
+                    ('queued', 'gauge', 'Calls waiting for a worker.'),
+                    ('saturation', 'gauge', 'Calls in flight per worker.'),
+                    ('completed', 'counter', 'Calls completed.')):
+                name = 'executor_%s' % stat
+                if kind == 'counter':
+                    name += '_total'
+                family(name, kind, help_text + ' By executor pool.')
+                for pool, stats in sorted(executor_stats.items()):
+                    lines.append('restful_%s{pool="%s"} %r' % (
+                        name, pool, stats[stat]))
+
+        lines.append('')
+        return '\n'.join(lines)
+
+
+class _MetricsHandler(tornado.web.RequestHandler):
+    """Serves the RestService metrics in the Prometheus text format."""
+    def get(self):
+        self.set_header('Content-Type', _PROMETHEUS_CONTENT_TYPE)
+        self.finish(self.application.metrics.render(
+            self.application.executor_stats()))
@@ -0,0 +1,197 @@
+# standard library imports
+import base64
+import hashlib
+import hmac
+import inspect
+import json
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+# third-party imports
+import tornado.web
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 1000
+
+# Query arguments of the paginated methods.
+CURSOR_ARGUMENT = 'cursor'
+LIMIT_ARGUMENT = 'limit'
+
+# Bytes of HMAC-SHA256 kept in the cursor signatures.
+SIGNATURE_SIZE = 16
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class _CursorSigner(object):
+    """Encodes cursor values into opaque tokens signed with HMAC-SHA256.
+
+    Tokens are bound to a method, so a cursor of a method can not be replayed
+    on another one.
+    """
+    def __init__(self, secret):
+        if isinstance(secret, str):
+            secret = secret.encode('utf-8')
+        self.__secret = secret
+
+    def __sign(self, payload):
+        return hmac.new(self.__secret, payload,
+                        hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+    def encode(self, method_id, value):
+        """Get the token of a JSON-serializable cursor value."""
+        payload = json.dumps([method_id, value], separators=(',', ':'),
+                             sort_keys=True).encode('utf-8')
+        return '%s.%s' % (_b64encode(payload),
+                          _b64encode(self.__sign(payload)))
+
+    def decode(self, method_id, token):
+        """Get the cursor value of a token.
+
+        Raises:
+            ValueError: If the token is malformed, tampered with or issued
+              for another method.
+        """
+        try:
+            payload, signature = token.split('.')
+            payload = _b64decode(payload)
+            signature = _b64decode(signature)
+        except (ValueError, TypeError):
+            raise ValueError('Malformed cursor')
+        if not hmac.compare_digest(signature, self.__sign(payload)):
+            raise ValueError('Invalid cursor signature')
+        token_method_id, value = json.loads(payload.decode('utf-8'))
+        if token_method_id != method_id:
+            raise ValueError('Cursor of another method')
+        return value
+
+
+class _Page(object):
+    """Page requested from a paginated method, as self.page.
+
+    Attributes:
+        limit: integer, Maximum number of items of the page.
+        cursor: Cursor value (JSON-serializable) the page starts after, None
+          for the first page. Without a cursor_key it is the offset of the
+          page.
+        next_cursor: Cursor value of the next page, set by methods which
+          compute it themselves. (Default: None, see _Paginator)
+    """
+    def __init__(self, limit, cursor):
+        self.limit = limit
+        self.cursor = cursor
+        self.next_cursor = None
+
+
+class _Paginator(object):
+    """Pagination of the items returned by a method.
+
+    The method gets the requested page (limit and cursor) and returns the
+    page items, as a list, an iterator or an async iterator. One item past
+    the limit is read to know whether there is a next page, so iterators are
+    never consumed further: neither the server nor the backend loads the
+    whole collection.
+    """
+    def __init__(self, page_size=None, max_page_size=None, cursor_key=None):
+        """Constructor for _Paginator.
+
+        Args:
+            page_size: integer, Items per page when the request does not set
+              a limit. (Default: DEFAULT_PAGE_SIZE)
+            max_page_size: integer, Maximum items per page.
+              (Default: DEFAULT_MAX_PAGE_SIZE)
+            cursor_key: function, Called with the last item of a page,
+              returning the (JSON-serializable) cursor of the next page, for
+              keyset pagination. (Default: None, offset cursors)
+
+        Raises:
+            ApiConfigurationError: If the page sizes are inconsistent.
+        """
+        self.page_size = page_size or DEFAULT_PAGE_SIZE
+        self.max_page_size = max_page_size or max(
+            DEFAULT_MAX_PAGE_SIZE, self.page_size)
+        if not 0 < self.page_size <= self.max_page_size:
+            raise ApiConfigurationError(
+                'Invalid page sizes: %r, %r' % (page_size, max_page_size))
+        self.cursor_key = cursor_key
+
+    def start(self, handler, method_id, signer):
+        """Get the page requested by a request.
+
+        Raises:
+            HTTPError: 400 if the limit or the cursor is invalid.
+        """
+        limit = handler.get_query_argument(LIMIT_ARGUMENT, None)
+        if limit is None:
+            limit = self.page_size
+        else:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if not 0 < limit <= self.max_page_size:
+                raise tornado.web.HTTPError(
+                    400, 'limit must be between 1 and %d',
+                    self.max_page_size)
+        cursor = handler.get_query_argument(CURSOR_ARGUMENT, None)
+        if cursor is not None:
+            try:
+                cursor = signer.decode(method_id, cursor)
+            except ValueError as e:
+                raise tornado.web.HTTPError(400, '%s', e)
+        elif self.cursor_key is None:
+            cursor = 0
+        return _Page(limit, cursor)
+
+    async def collect(self, page, response):
+        """Read the items of a page from a method response.
+
+        Returns:
+            A (items list, next cursor value or None) tuple.
+        """
+        items = []
+        more = False
+        if hasattr(response, '__aiter__'):
+            async for item in response:
+                if len(items) == page.limit:
+                    more = True
+                    break
+                items.append(item)
+            if inspect.isasyncgen(response):
+                await response.aclose()
+        else:
+            for item in response:
+                if len(items) == page.limit:
+                    more = True
+                    break
+                items.append(item)
+            if inspect.isgenerator(response):
+                response.close()
+        if page.next_cursor is not None:
+            return items, page.next_cursor
+        if not more or not items:
+            return items, None
+        if self.cursor_key is not None:
+            return items, self.cursor_key(items[-1])
+        return items, page.cursor + len(items)
+
+
+def next_link(request, token):
+    """Get the URL of the next page: the request URL with another cursor."""
+    arguments = [(name, value) for name, values in
+                 request.query_arguments.items() if name != CURSOR_ARGUMENT
+                 for value in values]
+    arguments.append((CURSOR_ARGUMENT, token))
+    return '%s?%s' % (request.path, urlencode(arguments))
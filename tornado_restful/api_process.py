@@ -0,0 +1,317 @@
+# standard library imports
+import asyncio
+import errno
+import logging
+import os
+import random
+import signal
+import socket
+import time
+
+# third-party imports
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+logger = logging.getLogger(__name__)
+
+# Seconds a stopping worker waits for its in-flight requests.
+DEFAULT_DRAIN_TIMEOUT = 30
+
+# Seconds between two checks of the supervisor for exited workers.
+SUPERVISOR_POLL_INTERVAL = 0.2
+
+# Workers exiting sooner than this many seconds after their start are
+# respawned after a pause, so that a crashing worker does not fork-loop.
+MIN_WORKER_UPTIME = 1.0
+
+# Signals stopping (SIGTERM, SIGINT) or restarting (SIGHUP) the workers.
+SERVING_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+
+
+async def _serve_worker(application, sockets, drain_timeout, server_kwargs,
+                        ready_fd=None):
+    """Start the application resources, then serve on pre-bound sockets
+    until SIGTERM or SIGINT.
+
+    The worker then stops accepting connections, waits up to drain_timeout
+    seconds for its in-flight requests, closes the remaining connections and
+    the resources. SIGHUP, which restarts the workers of a supervisor, is
+    ignored.
+
+    Args:
+        ready_fd: integer, Pipe written to once the worker accepts
+          connections, closed then. (Default: None, no supervisor)
+    """
+    await application.start_resources()
+    server = HTTPServer(application, **server_kwargs)
+    server.add_sockets(sockets)
+    if ready_fd is not None:
+        os.write(ready_fd, b'1')
+        os.close(ready_fd)
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+    if ready_fd is None:
+        loop.add_signal_handler(signal.SIGHUP, logger.warning,
+                                'SIGHUP ignored: serving on a single process '
+                                'can not restart without downtime')
+    else:
+        loop.add_signal_handler(signal.SIGHUP, lambda: None)
+    await stopping.wait()
+
+    server.stop()
+    deadline = loop.time() + drain_timeout
+    while application.requests_in_flight and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+    if application.requests_in_flight:
+        logger.warning('Worker %d stopping with %d requests in flight',
+                       os.getpid(), application.requests_in_flight)
+    await server.close_all_connections()
+    await application.close_resources()
+    application.shutdown_executors(wait=False)
+
+
+def _run_worker(application, sockets, drain_timeout, server_kwargs,
+                ready_fd=None):
+    asyncio.run(_serve_worker(
+        application, sockets, drain_timeout, server_kwargs, ready_fd))
+
+
+class _Supervisor(object):
+    """Forks the workers, respawns the ones that die and restarts them one by
+    one on SIGHUP.
+
+    A rolling restart is a series of steps run between the non-blocking
+    reaps of the exited workers: the replacement of a worker is started, the
+    old worker is stopped once the replacement accepts connections, and the
+    next worker is replaced once the old one drained and exited.
+    """
+    def __init__(self, application, sockets, processes, drain_timeout,
+                 server_kwargs):
+        self.__application = application
+        self.__sockets = sockets
+        self.__processes = processes
+        self.__drain_timeout = drain_timeout
+        self.__server_kwargs = server_kwargs
+        # Worker start time by pid.
+        self.__workers = {}
+        # Readiness pipe of the workers not known to accept connections yet.
+        self.__ready_pipes = {}
+        self.__restart_requested = False
+        self.__stop_requested = False
+        # Workers left to replace by the rolling restart, the worker being
+        # replaced and its replacement, and the stopped workers not exited
+        # yet.
+        self.__pending_restarts = []
+        self.__replaced = None
+        self.__replacement = None
+        self.__draining = set()
+
+    def __spawn(self):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Worker process: never return into the supervisor code.
+            status = 0
+            try:
+                os.close(read_fd)
+                for fd in self.__ready_pipes.values():
+                    os.close(fd)
+                for signum in SERVING_SIGNALS:
+                    signal.signal(signum, signal.SIG_DFL)
+                random.seed()
+                _run_worker(self.__application, self.__sockets,
+                            self.__drain_timeout, self.__server_kwargs,
+                            write_fd)
+            except Exception:
+                logger.exception('Worker %d failed', os.getpid())
+                status = 1
+            finally:
+                logging.shutdown()
+                os._exit(status)
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        self.__ready_pipes[pid] = read_fd
+        self.__workers[pid] = time.monotonic()
+        logger.info('Started worker %d', pid)
+        return pid
+
+    def __is_ready(self, pid):
+        """Whether a worker accepts connections, without blocking."""
+        fd = self.__ready_pipes.get(pid)
+        if fd is None:
+            return True
+        try:
+            ready = os.read(fd, 1)
+        except BlockingIOError:
+            return False
+        if not ready:
+            # The worker exited before being ready, it will be reaped.
+            return False
+        del self.__ready_pipes[pid]
+        os.close(fd)
+        return True
+
+    def __on_restart(self, signum, frame):
+        self.__restart_requested = True
+
+    def __on_stop(self, signum, frame):
+        self.__stop_requested = True
+
+    def __reap(self, pid, status):
+        fd = self.__ready_pipes.pop(pid, None)
+        if fd is not None:
+            os.close(fd)
+        self.__draining.discard(pid)
+        started = self.__workers.pop(pid, None)
+        if started is None:
+            return
+        if self.__stop_requested:
+            return
+        if pid == self.__replaced:
+            # Its replacement is already starting.
+            logger.warning('Worker %d exited while being replaced', pid)
+            self.__replaced = None
+            return
+        if os.WIFSIGNALED(status):
+            logger.warning('Worker %d killed by signal %d, respawning', pid,
+                           os.WTERMSIG(status))
+        else:
+            logger.warning('Worker %d exited with status %d, respawning',
+                           pid, os.WEXITSTATUS(status))
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            time.sleep(MIN_WORKER_UPTIME)
+        new_pid = self.__spawn()
+        if pid == self.__replacement:
+            self.__replacement = new_pid
+
+    def __start_restart(self):
+        """Schedule the replacement of every worker but the one starting."""
+        self.__pending_restarts = [pid for pid in self.__workers
+                                   if pid != self.__replacement]
+        logger.info('Restarting %d workers', len(self.__pending_restarts))
+
+    def __step_restart(self):
+        """Run the next step of the rolling restart, if it is due: stop the
+        replaced worker once its replacement accepts connections, then start
+        the replacement of the next worker once the stopped one exited.
+        """
+        if self.__replacement is not None:
+            if not self.__is_ready(self.__replacement):
+                return
+            old_pid = self.__replaced
+            self.__replaced = self.__replacement = None
+            if self.__workers.pop(old_pid, None) is not None:
+                self.__draining.add(old_pid)
+                try:
+                    os.kill(old_pid, signal.SIGTERM)
+                except OSError as e:
+                    if e.errno != errno.ESRCH:
+                        raise
+        if self.__draining:
+            return
+        while self.__pending_restarts:
+            old_pid = self.__pending_restarts.pop(0)
+            # Workers which died meanwhile were already respawned.
+            if old_pid in self.__workers:
+                self.__replaced = old_pid
+                self.__replacement = self.__spawn()
+                return
+
+    def run(self):
+        """Supervise the workers until SIGTERM or SIGINT."""
+        signal.signal(signal.SIGHUP, self.__on_restart)
+        signal.signal(signal.SIGTERM, self.__on_stop)
+        signal.signal(signal.SIGINT, self.__on_stop)
+        for _ in range(self.__processes):
+            self.__spawn()
+
+        while not self.__stop_requested:
+            if self.__restart_requested:
+                self.__restart_requested = False
+                self.__start_restart()
+            self.__step_restart()
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno != errno.ECHILD:
+                    raise
+                pid = 0
+            if pid == 0:
+                time.sleep(SUPERVISOR_POLL_INTERVAL)
+            else:
+                self.__reap(pid, status)
+
+        logger.info('Stopping %d workers', len(self.__workers))
+        for pid in self.__workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as e:
+                if e.errno != errno.ESRCH:
+                    raise
+        for pid in list(self.__workers) + list(self.__draining):
+            try:
+                os.waitpid(pid, 0)
+            except OSError as e:
+                if e.errno != errno.ECHILD:
+                    raise
+        for fd in self.__ready_pipes.values():
+            os.close(fd)
+        self.__ready_pipes.clear()
+        self.__workers.clear()
+        self.__draining.clear()
+
+
+def serve(application, port, address=None, processes=None, reuse_port=True,
+          drain_timeout=DEFAULT_DRAIN_TIMEOUT, **server_kwargs):
+    """Serve an application on one or several processes.
+
+    The listening sockets are bound before forking, so every worker accepts
+    on the same sockets. With several processes the calling process becomes
+    a supervisor which respawns workers that die, restarts the workers one at
+    a time on SIGHUP (the old worker is drained and stopped once the new one
+    accepts connections) and stops them all on SIGTERM or SIGINT. Stopping
+    workers stop accepting connections and finish their in-flight requests
+    before exiting. A single process can not restart without downtime: it
+    ignores SIGHUP.
+
+    No IOLoop may have been started before calling this function.
+
+    Args:
+        application: RestService, Application to serve.
+        port: integer, Port to listen on.
+        address: string, Address to listen on. (Default: None, all
+          interfaces)
+        processes: integer, Number of worker processes, 1 to serve in the
+          calling process. (Default: None, one per CPU)
+        reuse_port: boolean, Bind with SO_REUSEPORT. (Default: True)
+        drain_timeout: number, Seconds a stopping worker waits for its
+          in-flight requests. (Default: 30)
+        server_kwargs: Arguments of tornado.httpserver.HTTPServer
+          (e.g. xheaders, max_body_size).
+
+    Raises:
+        ApiConfigurationError: If the profiler signal of the application is
+          one of SERVING_SIGNALS.
+    """
+    if getattr(application, 'profiler_signal', None) in SERVING_SIGNALS:
+        raise ApiConfigurationError(
+            'The profiler signal can not be SIGTERM, SIGINT or SIGHUP, '
+            'they stop and restart the workers')
+    if not processes:
+        processes = os.cpu_count() or 1
+    if reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+        reuse_port = False
+    sockets = bind_sockets(port, address, reuse_port=reuse_port)
+    if processes == 1:
+        _run_worker(application, sockets, drain_timeout, server_kwargs)
+    else:
+        _Supervisor(application, sockets, processes, drain_timeout,
+                    server_kwargs).run()
+    for sock in sockets:
+        sock.close()
@@ -0,0 +1,394 @@
+# standard library imports
+import asyncio
+import collections
+import cProfile
+import hmac
+import inspect
+import logging
+import marshal
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# third-party imports
+import tornado.web
+
+# application-specific imports
+
+logger = logging.getLogger(__name__)
+
+# Profiling modes: statistical sampling of the stacks, or deterministic
+# profiling with cProfile.
+PROFILE_MODES = ('sample', 'cprofile')
+
+# Seconds between two samples of the stacks.
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Maximum number of frames of a sampled stack, from the method frame.
+MAX_STACK_DEPTH = 128
+
+# Method identifier of the profiler admin routes standing for every method.
+ALL_METHODS = '*'
+
+# Download formats of the profiles.
+PROFILE_FORMATS = ('collapsed', 'pstats')
+
+
+class _Session(object):
+    """Profile of the requests of a method."""
+    def __init__(self, method_id, mode, rate):
+        self.method_id = method_id
+        self.mode = mode
+        self.rate = rate
+        self.started = time.time()
+        # Requests profiled so far.
+        self.requests = 0
+        # Profiled requests running, sampled by the sampler thread.
+        self.active = 0
+        # Count of each sampled stack, a tuple of (filename, first line,
+        # function name) from the method frame.
+        self.stacks = collections.Counter()
+        self.profile = cProfile.Profile() if mode == 'cprofile' else None
+
+    def describe(self):
+        """Get the JSON description of the session."""
+        return {'method_id': self.method_id, 'mode': self.mode,
+                'rate': self.rate, 'started': self.started,
+                'requests': self.requests,
+                'samples': sum(self.stacks.values())}
+
+
+def _frame_name(function):
+    filename, line, name = function
+    return '%s (%s:%d)' % (name, filename, line)
+
+
+class _Profiler(object):
+    """On-demand profiling of the methods of a RestService.
+
+    Profiling is enabled per method and for a share of its requests. In
+    'sample' mode a background thread records the stacks of the threads
+    running a profiled method every sample_interval seconds, which costs the
+    requests nothing; in 'cprofile' mode the profiled requests run under
+    cProfile, one at a time, and everything the IOLoop thread runs meanwhile
+    is profiled as well. Without a session, requests only check that
+    self.sessions is empty.
+    """
+    def __init__(self, routes, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        """Constructor for _Profiler.
+
+        Args:
+            routes: dict, Served _Route by method identifier.
+            sample_interval: number, Seconds between two samples of the
+              stacks. (Default: DEFAULT_SAMPLE_INTERVAL)
+        """
+        self.__routes = routes
+        self.__interval = sample_interval
+        self.sessions = {}
+        # Session by code object of the sampled methods, replaced as a
+        # whole so that the sampler thread reads it without a lock.
+        self.__targets = {}
+        self.__lock = threading.RLock()
+        self.__sampler_stop = None
+        self.__cprofile_running = False
+
+    @property
+    def method_ids(self):
+        """Identifiers of the methods which can be profiled."""
+        return sorted(self.__routes)
+
+    def start(self, method_id, mode='sample', rate=1.0):
+        """Start profiling a method, dropping its previous profile.
+
+        Args:
+            method_id: string, Method identifier, ALL_METHODS for all.
+            mode: string, 'sample' or 'cprofile'. (Default: 'sample')
+            rate: number, Share of the requests profiled, between 0 and 1.
+              (Default: 1.0)
+
+        Raises:
+            KeyError: If no served method has this identifier.
+            ValueError: If the mode or the rate is invalid.
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError('Unknown profiling mode: %s' % mode)
+        if not 0 < rate <= 1:
+            raise ValueError('Profiling rate must be in ]0, 1]')
+        method_ids = self.__method_ids(method_id)
+        with self.__lock:
+            for method_id in method_ids:
+                self.sessions[method_id] = _Session(method_id, mode, rate)
+            self.__update_sampler()
+
+    def stop(self, method_id):
+        """Stop profiling a method.
+
+        Returns:
+            The _Session of each stopped profile.
+
+        Raises:
+            KeyError: If the method is not profiled.
+        """
+        method_ids = [identifier for identifier in self.__method_ids(method_id)
+                      if identifier in self.sessions]
+        if not method_ids:
+            raise KeyError(method_id)
+        with self.__lock:
+            sessions = [self.sessions.pop(identifier)
+                        for identifier in method_ids]
+            self.__update_sampler()
+        return sessions
+
+    def __method_ids(self, method_id):
+        if method_id == ALL_METHODS:
+            return self.method_ids
+        if method_id not in self.__routes:
+            raise KeyError(method_id)
+        return [method_id]
+
+    def __update_sampler(self):
+        targets = {}
+        for method_id, session in self.sessions.items():
+            if session.mode == 'sample':
+                func = inspect.unwrap(self.__routes[method_id].func)
+                targets[func.__code__] = session
+        self.__targets = targets
+        if targets and self.__sampler_stop is None:
+            self.__sampler_stop = threading.Event()
+            threading.Thread(target=self.__sample, name='restful-profiler',
+                             args=(self.__sampler_stop,), daemon=True).start()
+        elif not targets and self.__sampler_stop is not None:
+            self.__sampler_stop.set()
+            self.__sampler_stop = None
+
+    def __sample(self, stop):
+        own_thread = threading.get_ident()
+        while not stop.wait(self.__interval):
+            targets = self.__targets
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                session = None
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno,
+                                  code.co_name))
+                    session = targets.get(code)
+                    if session is not None:
+                        break
+                    frame = frame.f_back
+                if session is None or not session.active:
+                    continue
+                stack.reverse()
+                with self.__lock:
+                    session.stacks[tuple(stack[:MAX_STACK_DEPTH])] += 1
+
+    async def profile(self, method_id, awaitable):
+        """Await the call of a method, profiling it if selected.
+
+        Returns:
+            The result of awaitable.
+        """
+        session = self.sessions.get(method_id)
+        if session is None or (
+                session.rate < 1.0 and random.random() >= session.rate):
+            return await awaitable
+        if session.mode == 'cprofile':
+            # A thread runs one cProfile at a time.
+            if self.__cprofile_running:
+                return await awaitable
+            session.requests += 1
+            self.__cprofile_running = True
+            session.profile.enable()
+            try:
+                return await awaitable
+            finally:
+                session.profile.disable()
+                self.__cprofile_running = False
+        session.requests += 1
+        session.active += 1
+        try:
+            return await awaitable
+        finally:
+            session.active -= 1
+
+    def collapsed(self, session):
+        """Get the collapsed stacks of a session, as read by flamegraph.pl.
+
+        Raises:
+            ValueError: If the session does not sample stacks.
+        """
+        if session.mode != 'sample':
+            raise ValueError('Only sampled profiles have stacks')
+        with self.__lock:
+            stacks = sorted(session.stacks.items())
+        lines = ['%s;%s %d' % (session.method_id, ';'.join(
+            _frame_name(function) for function in stack), count)
+            for stack, count in stacks]
+        return ''.join(line + '\n' for line in lines)
+
+    def pstats(self, session):
+        """Get the profile of a session in the pstats (marshal) format, as
+        written by cProfile.Profile.dump_stats().
+
+        Sampled profiles count a call per sample, each sample lasting
+        sample_interval seconds.
+        """
+        if session.profile is not None:
+            session.profile.snapshot_stats()
+            return marshal.dumps(session.profile.stats)
+        with self.__lock:
+            stacks = list(session.stacks.items())
+        interval = self.__interval
+        # function -> [cc, nc, tt, ct, {caller: [nc, cc, tt, ct]}]
+        stats = {}
+        for stack, count in stacks:
+            duration = count * interval
+            seen = set()
+            last = len(stack) - 1
+            for index, function in enumerate(stack):
+                entry = stats.get(function)
+                if entry is None:
+                    entry = stats[function] = [0, 0, 0.0, 0.0, {}]
+                if function not in seen:
+                    seen.add(function)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += duration
+                if index == last:
+                    entry[2] += duration
+                if index:
+                    edge = entry[4].setdefault(
+                        stack[index - 1], [0, 0, 0.0, 0.0])
+                    edge[0] += count
+                    edge[1] += count
+                    edge[3] += duration
+                    if index == last:
+                        edge[2] += duration
+        return marshal.dumps(dict(
+            (function, (cc, nc, tt, ct, dict(
+                (caller, tuple(edge)) for caller, edge in callers.items())))
+            for function, (cc, nc, tt, ct, callers) in stats.items()))
+
+    def on_signal(self, signum, frame):
+        """Signal handler scheduling toggle() on the running event loop.
+
+        The handler may interrupt the loop thread while it updates the
+        sessions, so it does nothing else. Signals received while no loop
+        runs are ignored.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.call_soon_threadsafe(self.toggle)
+
+    def toggle(self):
+        """Sample every method if no session runs, otherwise stop the
+        sessions and write their profiles to the temporary directory.
+        """
+        if not self.sessions:
+            logger.info('Profiling all methods')
+            self.start(ALL_METHODS)
+            return
+        directory = tempfile.gettempdir()
+        for session in self.stop(ALL_METHODS):
+            base = os.path.join(directory, 'profile-%d-%s' % (
+                os.getpid(), session.method_id))
+            with open(base + '.pstats', 'wb') as profile_file:
+                profile_file.write(self.pstats(session))
+            if session.mode == 'sample':
+                with open(base + '.collapsed', 'w') as profile_file:
+                    profile_file.write(self.collapsed(session))
+            logger.info('Profile of %s written to %s.*', session.method_id,
+                        base)
+
+
+class _ProfilerHandler(tornado.web.RequestHandler):
+    """Admin routes of the profiler.
+
+    GET lists the profiling sessions, POST /{method_id} starts one (query
+    arguments mode and rate), GET /{method_id} downloads its profile (query
+    argument format, 'collapsed' or 'pstats') and DELETE /{method_id} stops
+    it. Requests need the token as an 'Authorization: Bearer' header.
+    """
+    def initialize(self, token):
+        self.token = token
+
+    def prepare(self):
+        authorization = self.request.headers.get('Authorization', '')
+        if not hmac.compare_digest(authorization.encode('utf-8'),
+                                   b'Bearer ' + self.token.encode('utf-8')):
+            raise tornado.web.HTTPError(403)
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header('Content-Type', 'application/json')
+        error = {'code': status_code, 'reason': self._reason}
+        exception = kwargs.get('exc_info', (None, None))[1]
+        if isinstance(exception, tornado.web.HTTPError) and (
+                exception.log_message):
+            error['message'] = exception.log_message % exception.args
+        self.finish(self.application.json_codec.encode(error))
+
+    def _write_json(self, document):
+        self.set_header('Content-Type', 'application/json')
+        self.finish(self.application.json_codec.encode(document))
+
+    def get(self, method_id=None):
+        profiler = self.application.profiler
+        if method_id is None:
+            self._write_json({
+                'methods': profiler.method_ids,
+                'sessions': [session.describe() for _, session in sorted(
+                    profiler.sessions.items())]})
+            return
+        session = profiler.sessions.get(method_id)
+        if session is None:
+            raise tornado.web.HTTPError(404, 'Not profiled: %s', method_id)
+        profile_format = self.get_query_argument('format', 'collapsed')
+        if profile_format not in PROFILE_FORMATS:
+            raise tornado.web.HTTPError(
+                400, 'Unknown format: %s', profile_format)
+        if profile_format == 'pstats':
+            body = profiler.pstats(session)
+            self.set_header('Content-Type', 'application/octet-stream')
+        else:
+            try:
+                body = profiler.collapsed(session)
+            except ValueError as e:
+                raise tornado.web.HTTPError(400, '%s', e)
+            self.set_header('Content-Type', 'text/plain; charset=utf-8')
+        self.set_header('Content-Disposition',
+                        'attachment; filename="%s.%s"' % (
+                            method_id, profile_format))
+        self.finish(body)
+
+    def post(self, method_id=None):
+        if method_id is None:
+            raise tornado.web.HTTPError(405)
+        mode = self.get_query_argument('mode', 'sample')
+        try:
+            rate = float(self.get_query_argument('rate', '1'))
+            self.application.profiler.start(method_id, mode, rate)
+        except KeyError:
+            raise tornado.web.HTTPError(404, 'Unknown method: %s', method_id)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, '%s', e)
+        self._write_json({'sessions': [
+            session.describe() for _, session in sorted(
+                self.application.profiler.sessions.items())
+            if method_id in (ALL_METHODS, session.method_id)]})
+
+    def delete(self, method_id=None):
+        if method_id is None:
+            raise tornado.web.HTTPError(405)
+        try:
+            sessions = self.application.profiler.stop(method_id)
+        except KeyError:
+            raise tornado.web.HTTPError(404, 'Not profiled: %s', method_id)
+        self._write_json({'sessions': [
+            session.describe() for session in sessions]})
@@ -0,0 +1,227 @@
+# standard library imports
+import asyncio
+import inspect
+import logging
+
+# third-party imports
+import tornado.web
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+logger = logging.getLogger(__name__)
+
+# Seconds a resource health check may take before it is reported failed.
+DEFAULT_CHECK_TIMEOUT = 5.0
+
+# Lifecycle hooks of a resource, looked up on the resource itself when its
+# declaration does not give them.
+_HOOKS = ('warmup', 'check', 'close')
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        value = await value
+    return value
+
+
+class _SharedResource(object):
+    """A named resource shared by the requests of a worker process."""
+    def __init__(self, name, declaration):
+        """Constructor for _SharedResource.
+
+        Args:
+            name: string, Name the resource is injected by.
+            declaration: A factory called without arguments (sync or async)
+              returning the resource, or a dict of the 'factory' and of the
+              optional 'warmup', 'check' and 'close' functions, called with
+              the resource.
+
+        Raises:
+            ApiConfigurationError: If the declaration is invalid.
+        """
+        self.name = name
+        if callable(declaration):
+            declaration = {'factory': declaration}
+        if not isinstance(declaration, dict) or not callable(
+                declaration.get('factory')):
+            raise ApiConfigurationError(
+                'Invalid declaration of resource %s: %r' % (
+                    name, declaration))
+        unknown = set(declaration) - set(_HOOKS) - {'factory'}
+        if unknown:
+            raise ApiConfigurationError(
+                'Unknown options of resource %s: %s' % (
+                    name, ', '.join(sorted(unknown))))
+        self.__declaration = declaration
+        self.value = None
+
+    def __hook(self, hook):
+        function = self.__declaration.get(hook)
+        if function is not None:
+            return lambda: function(self.value)
+        return getattr(self.value, hook, None)
+
+    async def create(self):
+        """Create the resource, then warm it up."""
+        self.value = await _maybe_await(self.__declaration['factory']())
+        warmup = self.__hook('warmup')
+        if warmup is not None:
+            await _maybe_await(warmup())
+
+    async def check(self, timeout):
+        """Check the health of the resource.
+
+        Returns:
+            None when healthy, else the description of the failure.
+        """
+        check = self.__hook('check')
+        if check is None:
+            return None
+        try:
+            healthy = await asyncio.wait_for(_maybe_await(check()), timeout)
+        except asyncio.TimeoutError:
+            return 'check timed out'
+        except Exception as e:
+            return '%s: %s' % (type(e).__name__, e)
+        if healthy is False:
+            return 'check failed'
+        return None
+
+    async def close(self):
+        """Close the resource."""
+        close = self.__hook('close')
+        if close is not None:
+            await _maybe_await(close())
+        self.value = None
+
+
+class _ResourceRegistry(object):
+    """Named resources (connection pools, clients, caches) of a RestService.
+
+    Resources are created and warmed up once per worker process, before it
+    accepts connections (or by the first request needing them when the
+    application is not run by RestService.serve()), and closed in reverse
+    order when it stops.
+    """
+    def __init__(self, declarations=None, check_timeout=None):
+        """Constructor for _ResourceRegistry.
+
+        Args:
+            declarations: dict, Resource declarations by name, see
+              _SharedResource. (Default: None)
+            check_timeout: number, Seconds a health check may take.
+              (Default: DEFAULT_CHECK_TIMEOUT)
+        """
+        self.__resources = [
+            _SharedResource(name, declaration)
+            for name, declaration in (declarations or {}).items()]
+        self.__by_name = dict(
+            (resource.name, resource) for resource in self.__resources)
+        self.__check_timeout = check_timeout or DEFAULT_CHECK_TIMEOUT
+        self.__starting = None
+        self.started = False
+
+    @property
+    def names(self):
+        """Names of the resources, in creation order."""
+        return [resource.name for resource in self.__resources]
+
+    def __contains__(self, name):
+        return name in self.__by_name
+
+    def __getitem__(self, name):
+        """Get a started resource.
+
+        Raises:
+            KeyError: If there is no resource of this name.
+            RuntimeError: If the resources are not started.
+        """
+        resource = self.__by_name[name]
+        if not self.started:
+            raise RuntimeError('Resources are not started')
+        return resource.value
+
+    async def start(self):
+        """Create and warm up the resources, once.
+
+        Raises:
+            Exception: The exception of a resource failing to start, the
+              resources created before it being closed.
+        """
+        if self.started:
+            return
+        if self.__starting is not None:
+            await asyncio.shield(self.__starting)
+            return
+        self.__starting = asyncio.get_running_loop().create_future()
+        created = []
+        try:
+            for resource in self.__resources:
+                await resource.create()
+                created.append(resource)
+                logger.info('Started resource %s', resource.name)
+        except BaseException as e:
+            for resource in reversed(created):
+                try:
+                    await resource.close()
+                except Exception:
+                    logger.exception('Failed to close resource %s',
+                                     resource.name)
+            self.__starting.set_exception(e)
+            # Retrieved, so that no "exception never retrieved" is logged.
+            self.__starting.exception()
+            self.__starting = None
+            raise
+        self.started = True
+        self.__starting.set_result(None)
+
+    async def check(self):
+        """Check the health of the resources concurrently.
+
+        Returns:
+            A dict of None (healthy) or of the description of the failure by
+            resource name.
+        """
+        results = await asyncio.gather(*[
+            resource.check(self.__check_timeout)
+            for resource in self.__resources])
+        return dict(zip(self.names, results))
+
+    async def close(self):
+        """Close the resources in reverse creation order. Failures are
+        logged, the other resources being closed anyway.
+        """
+        if not self.started:
+            return
+        self.started = False
+        self.__starting = None
+        for resource in reversed(self.__resources):
+            try:
+                await resource.close()
+                logger.info('Closed resource %s', resource.name)
+            except Exception:
+                logger.exception('Failed to close resource %s',
+                                 resource.name)
+
+
+class _HealthHandler(tornado.web.RequestHandler):
+    """Answers with the health of the RestService resources: a 200 when all
+    of them are healthy, else a 503.
+    """
+    async def get(self):
+        resources = self.application.resources
+        try:
+            await resources.start()
+        except Exception as e:
+            failures = {'*': '%s: %s' % (type(e).__name__, e)}
+        else:
+            failures = await resources.check()
+        healthy = not any(failures.values())
+        self.set_status(200 if healthy else 503)
+        self.set_header('Content-Type', 'application/json')
+        self.set_header('Cache-Control', 'no-store')
+        self.finish(self.application.json_codec.encode({
+            'status': 'ok' if healthy else 'unhealthy',
+            'resources': dict((name, failure or 'ok')
+                              for name, failure in failures.items())}))
@@ -0,0 +1,576 @@
+# standard library imports
+import re
+import uuid
+
+try:
+    from urllib.parse import unquote
+except ImportError:
+    from urllib import unquote
+
+# third-party imports
+import tornado.routing
+import tornado.web
+
+# application-specific imports
+from .api_admission import DEFAULT_PRIORITY
+from .api_admission import PRIORITIES
+from .api_admission import _ConcurrencyLimiter
+from .api_cache import _ResponseCache
+from .api_coalesce import _Coalescer
+from .api_compression import _CompressionPolicy
+from .api_exceptions import ApiConfigurationError
+from .api_hooks import compile_hooks
+from .api_pagination import CURSOR_ARGUMENT
+from .api_pagination import LIMIT_ARGUMENT
+from .api_pagination import _Paginator
+from .api_schema import compile_schema
+from .api_streaming import JSON_STREAM_CONTENT_TYPES
+
+# Maximum number of 404/405 decisions remembered by a route table.
+MISS_CACHE_SIZE = 1024
+
+_PARAM_SEGMENT_RE = re.compile(r'^{(\w+)(?::(\w+))?}$')
+
+# Path params types usable in placeholders such as '{id:int}': the regex a
+# path segment must fully match and the function converting the matched
+# (still url-encoded) value. Untyped placeholders are 'str'.
+CONVERTERS = {
+    'str': (r'[^/]+', unquote),
+    'int': (r'-?[0-9]+', int),
+    'float': (r'-?[0-9]+(?:\.[0-9]+)?', float),
+    'uuid': (r'[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?'
+             r'[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}', uuid.UUID),
+}
+
+
+def _response_key(key, bound_arguments, page_arguments):
+    """Complete the declared cache or coalescing key of a route with the
+    query arguments selecting its response.
+
+    Args:
+        key: list or function, Declared key, None for the default one.
+        bound_arguments: tuple, Query arguments bound to the method
+          parameters, completing the default key.
+        page_arguments: tuple, Pagination query arguments, completing every
+          key.
+
+    Returns:
+        The query arguments names or the function completing the path params
+        in the key, None for the path params only.
+    """
+    if key is None:
+        return (bound_arguments + page_arguments) or None
+    if not callable(key):
+        return tuple(key) + tuple(
+            argument for argument in page_arguments if argument not in key)
+    if not page_arguments:
+        return key
+
+    def paginated_key(handler):
+        query_arguments = handler.request.query_arguments
+        return key(handler), tuple(
+            tuple(query_arguments.get(argument, ()))
+            for argument in page_arguments)
+    return paginated_key
+
+
+class _Route(object):
+    """A resource method compiled for dispatch.
+
+    Holds everything the dispatcher needs about a decorated function so that
+    nothing has to be recomputed per request.
+    """
+    def __init__(self, func, api_info, resource_limiter=None):
+        """Constructor for _Route.
+
+        Args:
+            func: function, Resource function decorated with @method.
+            api_info: _ApiInfo, API information of the resource class.
+            resource_limiter: _ConcurrencyLimiter, Concurrency limiter shared
+              by the methods of the resource class. (Default: None)
+        """
+        self.func = func
+        self.method_info = func.method_info
+        self.http_method = self.method_info.http_method
+        self.method_id = self.method_info.method_id(api_info)
+        self.is_coroutine = self.method_info.is_coroutine
+        self.timeout = self.method_info.timeout
+        self.slow_threshold = self.method_info.slow_threshold
+        self.executor = self.method_info.executor
+        if self.executor is not None and self.is_coroutine:
+            raise ApiConfigurationError(
+                'async def methods can not run in an executor: %s' % (
+                    self.method_id))
+        self.decode_body = (
+            self.http_method in ('POST', 'PUT', 'PATCH') and
+            self.method_info.content_type == 'application/json')
+        self.request_validator = None
+        if self.method_info.request_schema is not None:
+            # The records of streamed JSON bodies are validated one by one.
+            content_type = self.method_info.content_type
+            if not self.decode_body and not (
+                    self.method_info.stream_body and
+                    content_type in JSON_STREAM_CONTENT_TYPES):
+                raise ApiConfigurationError(
+                    'Only methods decoding their body can validate it: %s' % (
+                        self.method_id))
+            self.request_validator = compile_schema(
+                self.method_info.request_schema)
+        self.response_validator = None
+        if self.method_info.response_schema is not None:
+            self.response_validator = compile_schema(
+                self.method_info.response_schema)
+        # Query string templates (e.g. 'items?<sort>') are not part of the
+        # routed path.
+        self.path = self.method_info.get_path(api_info).split('?')[0]
+        self.segments = [part for part in self.path.split('/') if part]
+        self.param_names = []
+        self.converters = []
+        # (literal, None) or (param type name, fullmatch function) per
+        # segment, inserted into the dispatch trie.
+        self.parts = []
+        for segment in self.segments:
+            match = _PARAM_SEGMENT_RE.match(segment)
+            if match:
+                name, type_name = match.groups()
+                type_name = type_name or 'str'
+                try:
+                    regex, converter = CONVERTERS[type_name]
+                except KeyError:
+                    raise ApiConfigurationError(
+                        'Unknown path param type: %s (part of %s)' % (
+                            type_name, self.path))
+                self.param_names.append(name)
+                self.converters.append(converter)
+                self.parts.append((type_name, re.compile(regex).fullmatch))
+            elif '{' in segment or '}' in segment:
+                raise ApiConfigurationError(
+                    'Invalid path segment: %s (part of %s)' % (
+                        segment, self.path))
+            else:
+                self.parts.append((segment, None))
+        # Parameters bound from the query and body, after the path params.
+        self.binder = None
+        if self.method_info.binder is not None:
+            self.binder = self.method_info.binder.skip(len(self.param_names))
+        # Parameters receiving the RestService resources.
+        self.injected = self.method_info.inject
+        if self.injected:
+            excluded = ()
+            if self.binder is not None:
+                self.binder, excluded = self.binder.exclude(self.injected)
+            missing = set(self.injected) - set(excluded)
+            if missing:
+                raise ApiConfigurationError(
+                    'Injected resources without parameter in %s: %s' % (
+                        self.method_id, ', '.join(sorted(missing))))
+        # Parameters receiving the page limit and cursor.
+        self.page_arguments = ()
+        self.paginator = None
+        if self.method_info.paginate:
+            if self.http_method != 'GET':
+                raise ApiConfigurationError(
+                    'Only GET methods can be paginated: %s' % self.method_id)
+            self.paginator = _Paginator(
+                self.method_info.page_size, self.method_info.max_page_size,
+                self.method_info.cursor_key)
+            if self.binder is not None:
+                self.binder, self.page_arguments = self.binder.exclude(
+                    (LIMIT_ARGUMENT, CURSOR_ARGUMENT))
+        self.auth_level = self.method_info.auth_level or api_info.auth_level
+        self.hooks = api_info.hooks + self.method_info.hooks
+        # Call sequences of the route served outside of a RestService, each
+        # RestService compiling its own with its hooks and authenticate.
+        self.default_hooks = self.compile_hooks()
+
+        self.keepalive = self.method_info.keepalive
+        self.event_stream = self.method_info.stream is not None
+        if self.event_stream:
+            if self.method_info.stream != 'sse':
+                raise ApiConfigurationError('Unknown stream %s of %s' % (
+                    self.method_info.stream, self.method_id))
+            if self.http_method != 'GET' or self.paginator is not None or (
+                    self.method_info.cache_ttl is not None or
+                    self.method_info.coalesce or
+                    self.method_info.stream_body):
+                raise ApiConfigurationError(
+                    'Event streams must be GET methods neither paginated, '
+                    'cached, coalesced nor streaming their body: %s' % (
+                        self.method_id))
+        # Query arguments selecting the response besides the path params.
+        bound_arguments = ()
+        if self.binder is not None:
+            bound_arguments = self.binder.names
+        page_arguments = ()
+        if self.paginator is not None:
+            page_arguments = (LIMIT_ARGUMENT, CURSOR_ARGUMENT)
+        self.cache = None
+        if self.method_info.cache_ttl is not None:
+            if self.http_method != 'GET':
+                raise ApiConfigurationError(
+                    'Only GET methods can be cached: %s' % self.method_id)
+            self.cache = _ResponseCache(
+                self.method_info.cache_ttl, key=_response_key(
+                    self.method_info.cache_key, bound_arguments,
+                    page_arguments),
+                max_entries=self.method_info.cache_max_entries)
+
+        self.coalescer = None
+        if self.method_info.coalesce:
+            if self.http_method != 'GET':
+                raise ApiConfigurationError(
+                    'Only GET methods can be coalesced: %s' % self.method_id)
+            self.coalescer = _Coalescer(
+                key=_response_key(
+                    self.method_info.coalesce_key, bound_arguments,
+                    page_arguments),
+                headers=self.method_info.coalesce_headers,
+                max_waiters=self.method_info.coalesce_max_waiters)
+
+        self.priority = self.method_info.priority or DEFAULT_PRIORITY
+        if self.priority not in PRIORITIES:
+            raise ApiConfigurationError(
+                'Unknown priority %s of %s' % (self.priority, self.method_id))
+        # Concurrency limiters a request takes a slot of, narrowest first.
+        limiters = []
+        if self.method_info.max_concurrency is not None:
+            limiters.append(_ConcurrencyLimiter(
+                self.method_info.max_concurrency,
+                max_queue=self.method_info.max_queue,
+                queue_timeout=self.method_info.queue_timeout))
+        if resource_limiter is not None:
+            limiters.append(resource_limiter)
+        self.limiters = tuple(limiters)
+
+        self.compression = None
+        if self.method_info.compress is not None:
+            self.compression = _CompressionPolicy(
+                self.method_info.compress, self.method_info.min_size)
+
+    def convert_params(self, raw_values):
+        """Convert the captured path params values to their declared types.
+
+        Args:
+            raw_values: tuple, Url-encoded values captured from the path.
+
+        Returns:
+            List of converted values.
+        """
+        return [converter(value)
+                for converter, value in zip(self.converters, raw_values)]
+
+    def compile_hooks(self, service_hooks=(), authenticate=None):
+        """Flatten the hooks of the route into its call sequences, the
+        auth_level being enforced first.
+
+        Args:
+            service_hooks: list, Hooks of the RestService, run before the
+              API, class and method ones. (Default: ())
+            authenticate: function, Authenticating the requests, see
+              RestService(authenticate). (Default: None)
+
+        Returns:
+            A (before functions tuple, after functions tuple) tuple, see
+            api_hooks.compile_hooks().
+
+        Raises:
+            ApiConfigurationError: If a hook or the auth_level is invalid.
+        """
+        return compile_hooks(
+            tuple(service_hooks) + self.hooks, self.auth_level, authenticate)
+
+    @property
+    def specificity(self):
+        """Sort key preferring literal segments over path params."""
+        return [1 if _PARAM_SEGMENT_RE.match(s) else 0 for s in self.segments]
+
+    def __repr__(self):
+        return '<_Route %s %s>' % (self.http_method, self.path)
+
+
+class _Node(object):
+    """Node of a dispatch trie, one per path prefix.
+
+    Literal children are looked up by segment, param children (one per param
+    type) are tried in turn.
+    """
+    __slots__ = ('literals', 'params', 'routes')
+
+    def __init__(self):
+        self.literals = {}
+        # (param type name, fullmatch function, _Node) tuples.
+        self.params = []
+        # Routes of the path ending at the node, by HTTP verb.
+        self.routes = {}
+
+    def child(self, name, matcher):
+        """Get the child of a path part, created if missing.
+
+        Args:
+            name: string, Literal segment, or param type name.
+            matcher: function, fullmatch function of the param type, None
+              for a literal segment.
+        """
+        if matcher is None:
+            node = self.literals.get(name)
+            if node is None:
+                node = self.literals[name] = _Node()
+            return node
+        for type_name, _, node in self.params:
+            if type_name == name:
+                return node
+        node = _Node()
+        self.params.append((name, matcher, node))
+        return node
+
+
+def _walk(node, segments, index, values):
+    """Find the nodes ending a path, literal segments preferred over params.
+
+    Args:
+        node: _Node, Node of the path prefix matched so far.
+        segments: list, Url-encoded segments of the path.
+        index: integer, Index of the next segment to match.
+        values: tuple, Raw params values matched so far.
+
+    Yields:
+        (node, raw params values) tuples, the most specific first.
+    """
+    if index == len(segments):
+        if node.routes:
+            yield node, values
+        return
+    segment = segments[index]
+    child = node.literals.get(segment)
+    if child is not None:
+        yield from _walk(child, segments, index + 1, values)
+    for _, matcher, child in node.params:
+        if matcher(segment) is not None:
+            yield from _walk(child, segments, index + 1, values + (segment,))
+
+
+def _find(node, segments, index, http_method, values):
+    """Find the route of a verb for a path: the one of the first node found
+    by _walk() serving the verb.
+
+    Args:
+        node: _Node, Node of the path prefix matched so far.
+        segments: list, Url-encoded segments of the path.
+        index: integer, Index of the next segment to match.
+        http_method: string, Http request verb.
+        values: list, Raw params values matched so far, completed with the
+          values of the route found.
+
+    Returns:
+        The _Route, None if no route serves the verb for the path.
+    """
+    if index == len(segments):
+        return node.routes.get(http_method)
+    segment = segments[index]
+    child = node.literals.get(segment)
+    if child is not None:
+        route = _find(child, segments, index + 1, http_method, values)
+        if route is not None:
+            return route
+    for _, matcher, child in node.params:
+        if matcher(segment) is not None:
+            values.append(segment)
+            route = _find(child, segments, index + 1, http_method, values)
+            if route is not None:
+                return route
+            values.pop()
+    return None
+
+
+def _split(path):
+    """Get the url-encoded segments of a request path, None when it is not
+    absolute.
+    """
+    if path == '/':
+        return []
+    if not path.startswith('/'):
+        return None
+    return path[1:].split('/')
+
+
+class _RouteTable(object):
+    """Immutable dispatch table of RestResource routes.
+
+    Routes are inserted once into a trie of path segments, so a request is
+    routed by one dictionary lookup per literal segment and one regex match
+    per param segment, whatever the number of routes. Typed path params only
+    match well-formed values, so ill-typed values are answered with a 404
+    before any handler code runs. Negative (404/405) decisions are cached and
+    looked up first.
+    """
+    def __init__(self, routes):
+        """Constructor for _RouteTable.
+
+        Args:
+            routes: list, Compiled _Route objects. Of routes with the same
+              path and verb, the first one is served.
+        """
+        self.__routes = list(routes)
+        self.__root = _Node()
+        nodes = []
+        # Literal segments are preferred over path params, as the trie walk
+        # does, so routes are inserted the same way.
+        for route in sorted(self.__routes,
+                            key=lambda route: route.specificity):
+            node = self.__root
+            for name, matcher in route.parts:
+                node = node.child(name, matcher)
+            node.routes.setdefault(route.http_method, route)
+            nodes.append(node)
+        verbs = set()
+        for node in nodes:
+            # HEAD requests are served by the GET methods unless declared,
+            # tornado drops the body.
+            if 'GET' in node.routes:
+                node.routes.setdefault('HEAD', node.routes['GET'])
+            verbs.update(node.routes)
+        self.__http_methods = frozenset(verbs)
+        self.__misses = {}
+
+    @classmethod
+    def for_resource(cls, resources_functions, api_info):
+        """Compile the routes of a RestResource class into a table.
+
+        Args:
+            resources_functions: list, Functions decorated with @method.
+            api_info: _ApiInfo, API information of the resource class.
+        """
+        resource_limiter = None
+        if api_info.max_concurrency is not None:
+            resource_limiter = _ConcurrencyLimiter(
+                api_info.max_concurrency, max_queue=api_info.max_queue,
+                queue_timeout=api_info.queue_timeout)
+        return cls([_Route(func, api_info, resource_limiter)
+                    for func in resources_functions])
+
+    @property
+    def routes(self):
+        """List of the compiled routes, in declaration order."""
+        return list(self.__routes)
+
+    @property
+    def http_methods(self):
+        """Set of HTTP methods served by the routes."""
+        return self.__http_methods
+
+    def allowed_methods(self, path):
+        """Get the HTTP methods served for a path.
+
+        Returns:
+            Sorted list of the HTTP methods with a route matching the path.
+        """
+        segments = _split(path)
+        if segments is None:
+            return []
+        verbs = set()
+        for node, _ in _walk(self.__root, segments, 0, ()):
+            verbs.update(node.routes)
+        return sorted(verbs)
+
+    def lookup(self, http_method, path):
+        """Find the route serving a request, without raising.
+
+        Args:
+            http_method: string, Http request verb.
+            path: string, Request path.
+
+        Returns:
+            A (route, params_values, status_code) tuple. Matched requests get
+            (route, converted path params values, None), requests whose path
+            is only served for other verbs (route of the path, (), 405) and
+            unmatched ones (None, (), 404).
+        """
+        miss = self.__misses.get((http_method, path))
+        if miss is not None:
+            return miss
+        segments = _split(path)
+        other = None
+        if segments is not None:
+            values = []
+            route = _find(self.__root, segments, 0, http_method, values)
+            if route is not None:
+                try:
+                    return route, route.convert_params(values), None
+                except ValueError:
+                    # Well-formed values the converter still refuses, e.g.
+                    # integers over the int() digits limit, are not found.
+                    pass
+            else:
+                for node, _ in _walk(self.__root, segments, 0, ()):
+                    other = next(iter(node.routes.values()))
+                    break
+        miss = (other, (), 404 if other is None else 405)
+        if len(self.__misses) >= MISS_CACHE_SIZE:
+            self.__misses.clear()
+        self.__misses[(http_method, path)] = miss
+        return miss
+
+    def match(self, http_method, path):
+        """Find the route serving a request.
+
+        Args:
+            http_method: string, Http request verb.
+            path: string, Request path.
+
+        Returns:
+            A (route, params_values) tuple, params_values being the list of
+            converted path params values in the order they appear in the path.
+
+        Raises:
+            tornado.web.HTTPError: 404 if no route matches the path, 405 if
+              routes match the path but none for this verb.
+        """
+        route, params_values, status_code = self.lookup(http_method, path)
+        if status_code is not None:
+            raise tornado.web.HTTPError(status_code)
+        return route, params_values
+
+
+class _ResourceRouter(tornado.routing.Router):
+    """Router of a RestService, dispatching every request of its resources
+    through one route table instead of one URLSpec per path.
+
+    The lookup result is kept on the request as request.restful_route, a
+    (route_table, route, params_values, status_code) tuple, so the handler
+    does not route it again.
+    """
+    def __init__(self, application, route_table, handler_classes,
+                 handler_kwargs=None, not_found_class=None):
+        """Constructor for _ResourceRouter.
+
+        Args:
+            application: RestService, Application of the handlers.
+            route_table: _RouteTable, Routes of the application resources.
+            handler_classes: dict, RestResource class serving each route.
+            handler_kwargs: dict, Keyword arguments passed to the initialize()
+              method of the handlers. (Default: None)
+            not_found_class: RestResource class answering the requests of
+              unknown paths, None to leave them to the next rules.
+              (Default: None)
+        """
+        self.__application = application
+        self.__route_table = route_table
+        self.__handler_classes = handler_classes
+        self.__handler_kwargs = handler_kwargs or {}
+        self.__not_found_class = not_found_class
+
+    def find_handler(self, request, **kwargs):
+        route, params_values, status_code = self.__route_table.lookup(
+            request.method, request.path)
+        if route is not None:
+            handler_class = self.__handler_classes[route]
+            handler_kwargs = self.__handler_kwargs
+        elif self.__not_found_class is not None:
+            handler_class = self.__not_found_class
+            handler_kwargs = {}
+        else:
+            return None
+        request.restful_route = (
+            self.__route_table, route, params_values, status_code)
+        return self.__application.get_handler_delegate(
+            request, handler_class, handler_kwargs)
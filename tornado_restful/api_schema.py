@@ -0,0 +1,298 @@
+# standard library imports
+import dataclasses
+import re
+import typing
+
+# third-party imports
+
+# application-specific imports
+from .api_exceptions import ApiConfigurationError
+
+# Python types of the JSON-Schema types. Booleans are not integers.
+_JSON_TYPES = {
+    'null': (type(None),),
+    'boolean': (bool,),
+    'integer': (int,),
+    'number': (int, float),
+    'string': (str,),
+    'array': (list,),
+    'object': (dict,),
+}
+
+# JSON-Schema types of the annotations of dataclasses and TypedDicts.
+_ANNOTATION_TYPES = {
+    type(None): 'null',
+    bool: 'boolean',
+    int: 'integer',
+    float: 'number',
+    str: 'string',
+    list: 'array',
+    dict: 'object',
+}
+
+# Placeholder of the dynamic parts of the compiled paths.
+DYNAMIC = '\x00'
+
+# Keywords of the supported JSON-Schema subset.
+SCHEMA_KEYWORDS = frozenset((
+    'type', 'enum', 'const', 'properties', 'required',
+    'additionalProperties', 'items', 'minimum', 'maximum', 'minLength',
+    'maxLength', 'pattern', 'minItems', 'maxItems', 'title', 'description',
+    'default', '$schema'))
+
+
+class _SchemaError(ValueError):
+    """A document not matching a schema."""
+    def __init__(self, template, message):
+        super(_SchemaError, self).__init__(message)
+        # Path of the value, DYNAMIC standing for each array index or
+        # additional property name, kept in self.dynamic.
+        self.template = template
+        self.dynamic = []
+        self.message = message
+
+    @property
+    def path(self):
+        """Path of the mismatching value, e.g. '$.items[2].id'."""
+        parts = self.template.split(DYNAMIC)
+        path = [parts[0]]
+        for value, part in zip(self.dynamic, parts[1:]):
+            path.append(str(value))
+            path.append(part)
+        return ''.join(path)
+
+
+def _is_typed_dict(schema):
+    return isinstance(schema, type) and issubclass(schema, dict) and hasattr(
+        schema, '__annotations__') and hasattr(schema, '__total__')
+
+
+def _annotation_schema(annotation):
+    """Translate a type annotation to a JSON-Schema."""
+    if annotation is typing.Any:
+        return {}
+    if dataclasses.is_dataclass(annotation) or _is_typed_dict(annotation):
+        return _class_schema(annotation)
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        schemas = [_annotation_schema(arg) for arg in args
+                   if arg is not type(None)]
+        if len(schemas) == 1 and 'type' in schemas[0] and len(args) == 2:
+            # Optional[X]
+            schema = dict(schemas[0])
+            schema['type'] = [schema['type'], 'null']
+            return schema
+        types = []
+        for schema in schemas:
+            if set(schema) != {'type'}:
+                raise ApiConfigurationError(
+                    'Unsupported union in schema: %r' % (annotation,))
+            types.append(schema['type'])
+        if len(schemas) < len(args):
+            types.append('null')
+        return {'type': types}
+    if origin is list:
+        schema = {'type': 'array'}
+        if args:
+            schema['items'] = _annotation_schema(args[0])
+        return schema
+    if origin is dict:
+        return {'type': 'object'}
+    if annotation in _ANNOTATION_TYPES:
+        return {'type': _ANNOTATION_TYPES[annotation]}
+    raise ApiConfigurationError(
+        'Unsupported annotation in schema: %r' % (annotation,))
+
+
+def _class_schema(schema_class):
+    """Translate a dataclass or TypedDict to a JSON-Schema."""
+    hints = typing.get_type_hints(schema_class)
+    if dataclasses.is_dataclass(schema_class):
+        required = [
+            field.name for field in dataclasses.fields(schema_class)
+            if field.default is dataclasses.MISSING and
+            field.default_factory is dataclasses.MISSING]
+    else:
+        required = sorted(getattr(
+            schema_class, '__required_keys__', hints.keys()))
+    return {
+        'type': 'object',
+        'properties': dict((name, _annotation_schema(annotation))
+                           for name, annotation in hints.items()),
+        'required': required,
+    }
+
+
+def _compile(schema, path):
+    """Compile a JSON-Schema into a function checking a value.
+
+    Only the keywords present in the schema produce a check, and paths are
+    only formatted for mismatches, so validating a document never looks a
+    keyword up.
+
+    Args:
+        schema: dict, JSON-Schema.
+        path: string, Path of the checked values, with DYNAMIC placeholders.
+    """
+    if not isinstance(schema, dict):
+        raise ApiConfigurationError('Invalid schema at %s: %r' % (
+            path.replace(DYNAMIC, '*'), schema))
+    unknown = set(schema) - SCHEMA_KEYWORDS
+    if unknown:
+        raise ApiConfigurationError('Unsupported schema keywords at %s: %s' % (
+            path.replace(DYNAMIC, '*'), ', '.join(sorted(unknown))))
+    checks = []
+
+    if 'type' in schema:
+        names = schema['type']
+        if isinstance(names, str):
+            names = [names]
+        try:
+            types = tuple(t for name in names for t in _JSON_TYPES[name])
+        except KeyError:
+            raise ApiConfigurationError('Unknown type at %s: %r' % (
+                path.replace(DYNAMIC, '*'), schema['type']))
+        rejects_bool = bool not in types
+        expected = 'expected %s' % ' or '.join(names)
+
+        def check_type(value):
+            if not isinstance(value, types) or (
+                    rejects_bool and isinstance(value, bool)):
+                raise _SchemaError(path, expected)
+        checks.append(check_type)
+
+    if 'enum' in schema or 'const' in schema:
+        allowed = schema['enum'] if 'enum' in schema else [schema['const']]
+        message = 'expected one of %s' % ', '.join(
+            repr(value) for value in allowed)
+
+        def check_enum(value):
+            if value not in allowed:
+                raise _SchemaError(path, message)
+        checks.append(check_enum)
+
+    for keyword, compare, message in (
+            ('minimum', lambda value, bound: value < bound, 'less than'),
+            ('maximum', lambda value, bound: value > bound, 'more than')):
+        if keyword in schema:
+            def check_bound(value, bound=schema[keyword],
+                            compare=compare,
+                            message='%s %r' % (message, schema[keyword])):
+                if (isinstance(value, (int, float)) and
+                        not isinstance(value, bool) and
+                        compare(value, bound)):
+                    raise _SchemaError(path, message)
+            checks.append(check_bound)
+
+    for keyword, value_type, compare, message in (
+            ('minLength', str, lambda size, bound: size < bound,
+             'shorter than'),
+            ('maxLength', str, lambda size, bound: size > bound,
+             'longer than'),
+            ('minItems', list, lambda size, bound: size < bound,
+             'fewer items than'),
+            ('maxItems', list, lambda size, bound: size > bound,
+             'more items than')):
+        if keyword in schema:
+            def check_size(value, bound=schema[keyword],
+                           value_type=value_type, compare=compare,
+                           message='%s %r' % (message, schema[keyword])):
+                if isinstance(value, value_type) and compare(
+                        len(value), bound):
+                    raise _SchemaError(path, message)
+            checks.append(check_size)
+
+    if 'pattern' in schema:
+        search = re.compile(schema['pattern']).search
+        pattern_message = 'does not match %r' % schema['pattern']
+
+        def check_pattern(value):
+            if isinstance(value, str) and search(value) is None:
+                raise _SchemaError(path, pattern_message)
+        checks.append(check_pattern)
+
+    if 'required' in schema:
+        required = tuple(schema['required'])
+
+        def check_required(value):
+            if isinstance(value, dict):
+                for name in required:
+                    if name not in value:
+                        raise _SchemaError(path + '.' + name, 'missing')
+        checks.append(check_required)
+
+    properties = dict(
+        (name, _compile(property_schema, '%s.%s' % (path, name)))
+        for name, property_schema in schema.get('properties', {}).items())
+    additional = schema.get('additionalProperties', True)
+    if additional is False:
+        check_additional = False
+    elif additional is True:
+        check_additional = None
+    else:
+        check_additional = _compile(additional, path + '.' + DYNAMIC)
+    if properties or check_additional is not None:
+        def check_properties(value):
+            if not isinstance(value, dict):
+                return
+            for name, item in value.items():
+                check = properties.get(name, check_additional)
+                if check is None:
+                    continue
+                if check is False:
+                    raise _SchemaError(path + '.' + name,
+                                       'unexpected property')
+                try:
+                    check(item)
+                except _SchemaError as e:
+                    if name not in properties:
+                        e.dynamic.insert(0, name)
+                    raise
+        checks.append(check_properties)
+
+    if 'items' in schema:
+        check_item = _compile(schema['items'], path + '[' + DYNAMIC + ']')
+
+        def check_items(value):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    try:
+                        check_item(item)
+                    except _SchemaError as e:
+                        e.dynamic.insert(0, index)
+                        raise
+        checks.append(check_items)
+
+    checks = tuple(checks)
+    if not checks:
+        return lambda value: None
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value):
+        for check in checks:
+            check(value)
+    return check_all
+
+
+def compile_schema(schema):
+    """Compile a schema into a validator function.
+
+    Args:
+        schema: dict, JSON-Schema (type, enum, const, properties, required,
+          additionalProperties, items, minimum, maximum, minLength,
+          maxLength, pattern, minItems and maxItems keywords), or a
+          dataclass or TypedDict class whose annotations are translated to
+          one.
+
+    Returns:
+        A function called with a decoded JSON document, raising a
+        _SchemaError on the first mismatch (fail fast).
+
+    Raises:
+        ApiConfigurationError: If the schema is not supported.
+    """
+    if dataclasses.is_dataclass(schema) or _is_typed_dict(schema):
+        schema = _class_schema(schema)
+    return _compile(schema, '$')
@@ -0,0 +1,529 @@
+# standard library imports
+import asyncio
+import codecs
+import inspect
+import json
+import re
+import time
+
+# third-party imports
+import tornado.web
+from tornado.iostream import StreamClosedError
+from tornado.queues import Queue
+from tornado.queues import QueueEmpty
+
+# application-specific imports
+from .api_schema import _SchemaError
+
+# Content types of streamed bodies parsed record by record.
+JSON_STREAM_CONTENT_TYPES = ('application/json', 'application/x-ndjson')
+
+# Framing of the streamed JSON bodies, by Content-Type of the request.
+JSON_STREAM_FRAMINGS = {
+    'application/json': 'array',
+    'application/x-ndjson': 'ndjson',
+}
+
+# Maximum number of chunks or records buffered between the connection and the
+# method, reading pauses when it is reached.
+STREAM_QUEUE_SIZE = 16
+
+# Number of response bytes written between two flushes of a streamed response.
+RESPONSE_FLUSH_SIZE = 64 * 1024
+
+# Characters the scanning of a JSON value stops at: the structural characters
+# of arrays, objects and strings, the end or escape of a string, and the
+# characters ending a number, true, false or null.
+_STRUCTURE_RE = re.compile(r'[\[\]{}"]')
+_STRING_END_RE = re.compile(r'["\\]')
+_SCALAR_END_RE = re.compile(r'[ \t\n\r,\[\]{}"]')
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+
+_EOF = object()
+
+
+class _JsonStreamParser(object):
+    """Incremental parser of a JSON array or NDJSON body.
+
+    An 'array' body is a JSON array whose elements are the records, an
+    'ndjson' body a sequence of whitespace separated JSON values (which may be
+    arrays). Without a framing, a body whose first character is '[' is read
+    as an array, any other body as NDJSON.
+
+    Each chunk is scanned once, tracking the nesting depth and the strings of
+    the record being received, and a record is only decoded once complete:
+    parsing is linear in the size of the body, whatever the size of the
+    records.
+    """
+    def __init__(self, framing=None, decode=None):
+        """Constructor for _JsonStreamParser.
+
+        Args:
+            framing: string, 'array' or 'ndjson', Framing of the body.
+              (Default: None, guessed from its first character)
+            decode: function, Decoding the text of a record, e.g. the decode
+              method of a JSON codec. (Default: None, the json module)
+        """
+        if framing not in (None, 'array', 'ndjson'):
+            raise ValueError('Unknown framing %r' % framing)
+        self.__decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__decode = decode or json.JSONDecoder().decode
+        self.__in_array = None if framing is None else framing == 'array'
+        # Next expected token of an array: 'open', 'first', 'value' or
+        # 'separator'.
+        self.__expect = 'open'
+        self.__closed = False
+        # Text of the record being received from the previous chunks, None
+        # between records.
+        self.__pieces = None
+        self.__scalar = False
+        self.__depth = 0
+        self.__in_string = False
+        self.__escaped = False
+
+    def feed(self, chunk, final=False):
+        """Feed a chunk of the body.
+
+        Args:
+            chunk: bytes, Next chunk of the body.
+            final: boolean, Whether this is the last chunk.
+
+        Returns:
+            List of the records completed by this chunk.
+
+        Raises:
+            ValueError: If the body is not valid JSON.
+        """
+        text = self.__decoder.decode(chunk, final)
+        records = []
+        pos = 0
+        while True:
+            if self.__pieces is None:
+                pos = _WHITESPACE_RE.match(text, pos).end()
+                if pos == len(text):
+                    break
+                if self.__closed:
+                    raise ValueError('Extra data after the JSON array')
+                char = text[pos]
+                if self.__in_array is None:
+                    self.__in_array = char == '['
+                if self.__in_array:
+                    if self.__expect == 'open':
+                        if char != '[':
+                            raise ValueError('Expecting a JSON array')
+                        self.__expect = 'first'
+                        pos += 1
+                        continue
+                    if char == ']' and self.__expect != 'value':
+                        self.__closed = True
+                        pos += 1
+                        continue
+                    if self.__expect == 'separator':
+                        if char != ',':
+                            raise ValueError('Expecting , delimiter')
+                        self.__expect = 'value'
+                        pos += 1
+                        continue
+                self.__pieces = []
+                self.__scalar = char not in '[{"'
+            start = pos
+            end = self.__scan(text, pos)
+            if end is None:
+                self.__pieces.append(text[start:])
+                break
+            self.__pieces.append(text[start:end])
+            self.__end_record(records)
+            pos = end
+
+        if final:
+            if self.__pieces is not None:
+                if not self.__scalar:
+                    raise ValueError('Unterminated JSON value')
+                self.__end_record(records)
+            # An empty body has no records, whatever its framing.
+            if (self.__in_array and self.__expect != 'open' and
+                    not self.__closed):
+                raise ValueError('Unterminated JSON array')
+        return records
+
+    def __scan(self, text, pos):
+        """Scan the record being received through text, from pos.
+
+        Returns:
+            The index in text past the end of the record, None when the
+            record does not end in text.
+        """
+        if self.__scalar:
+            match = _SCALAR_END_RE.search(text, pos)
+            return match.start() if match is not None else None
+        while pos < len(text):
+            if self.__escaped:
+                self.__escaped = False
+                pos += 1
+            elif self.__in_string:
+                match = _STRING_END_RE.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                if match.group() == '\\':
+                    self.__escaped = True
+                else:
+                    self.__in_string = False
+                    if self.__depth == 0:
+                        return pos
+            else:
+                match = _STRUCTURE_RE.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self.__in_string = True
+                elif char in '[{':
+                    self.__depth += 1
+                else:
+                    self.__depth -= 1
+                    if self.__depth <= 0:
+                        return pos
+        return None
+
+    def __end_record(self, records):
+        """Decode the received record."""
+        text = ''.join(self.__pieces)
+        self.__pieces = None
+        self.__depth = 0
+        self.__in_string = self.__escaped = False
+        record = self.__decode(text)
+        self.__expect = 'separator'
+        if record is not None:
+            records.append(record)
+
+
+class _BodyStream(object):
+    """Request body fed to a method while it is received.
+
+    Chunks (or records for JSON bodies) are buffered in a bounded queue: when
+    the method does not keep up, reading from the connection is paused.
+    Use 'async for' or read().
+    """
+    def __init__(self, parser=None, validate=None):
+        """Constructor for _BodyStream.
+
+        Args:
+            parser: _JsonStreamParser, Parser of the body, raw chunks are
+              fed to the method when None. (Default: None)
+            validate: function called with each record, raising
+              tornado.web.HTTPError to reject the body. (Default: None)
+        """
+        self.__queue = Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.__parser = parser
+        self.__validate = validate
+        self.__aborted = False
+        self.__eof = False
+
+    async def feed(self, chunk, final=False):
+        """Feed a chunk received from the connection.
+
+        Returns once the chunk records are queued.
+        """
+        if self.__aborted:
+            return
+        if self.__parser is None:
+            items = [chunk] if chunk else []
+        else:
+            try:
+                items = self.__parser.feed(chunk, final)
+            except ValueError:
+                items = [tornado.web.HTTPError(400, 'Invalid JSON')]
+                self.__parser = _DiscardParser()
+            else:
+                if self.__validate is not None:
+                    items = self.__validated(items)
+        for item in items:
+            if self.__aborted:
+                return
+            await self.__queue.put(item)
+
+    async def close(self):
+        """Signal the end of the body."""
+        await self.feed(b'', final=True)
+        if not self.__aborted:
+            await self.__queue.put(_EOF)
+
+    def __validated(self, records):
+        """Get the records up to the first invalid one, replaced by the
+        error rejecting it.
+        """
+        for index, record in enumerate(records):
+            try:
+                self.__validate(record)
+            except tornado.web.HTTPError as e:
+                self.__parser = _DiscardParser()
+                return records[:index] + [e]
+        return records
+
+    def abort(self):
+        """Drop the buffered and further chunks.
+
+        Called once the method returned, so that reading from the connection
+        never waits for a reader that is gone.
+        """
+        self.__aborted = True
+        while True:
+            try:
+                self.__queue.get_nowait()
+            except QueueEmpty:
+                break
+
+    async def read(self):
+        """Read the next chunk or record.
+
+        Returns:
+            The next chunk (bytes) or record, None at the end of the body.
+            null JSON records are skipped.
+
+        Raises:
+            tornado.web.HTTPError: 400 if the body is not valid JSON.
+        """
+        if self.__eof:
+            return None
+        item = await self.__queue.get()
+        if item is _EOF:
+            self.__eof = True
+            return None
+        if isinstance(item, Exception):
+            self.__eof = True
+            raise item
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self.read()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+
+class _DiscardParser(object):
+    """Parser used once a body is known to be invalid."""
+    def feed(self, chunk, final=False):
+        return []
+
+
+class _StreamingBodyMixin(object):
+    """RestResource behaviour for routes with streamed request bodies.
+
+    The request is routed in prepare(), as soon as the headers arrived, so
+    unroutable or oversize requests are rejected before their body is read.
+    Methods with stream_body start right away and read self.body_stream,
+    bodies of other methods are buffered as usual. JSON records are framed
+    after the Content-Type of the request and validated against the
+    request_schema of the method, if any.
+    """
+    body_stream = None
+    _body_stream_future = None
+
+    async def prepare(self):
+        result = super(_StreamingBodyMixin, self).prepare()
+        if result is not None:
+            await result
+        self._body_chunks = []
+        self._request_size = 0
+        if self._finished:
+            return
+        started = time.monotonic()
+        _, route, params_values, status_code = self._lookup_route()
+        if status_code is not None:
+            if self.request.method == 'OPTIONS' and status_code == 405:
+                # Left to _handle(), answering with the allowed methods.
+                return
+            # Rejected before the body is received.
+            raise tornado.web.HTTPError(status_code)
+        method_info = route.method_info
+        if not method_info.stream_body:
+            return
+        self._enter_route(route, params_values, started)
+        if self._before_hooks:
+            response = await self._run_before_hooks()
+            if self._timings is not None:
+                self._end_phase('hooks')
+            if response is not None:
+                await self._write_response(route, response)
+                return
+
+        max_body_size = method_info.max_body_size
+        if max_body_size is not None:
+            content_length = self.request.headers.get('Content-Length')
+            if content_length is not None:
+                try:
+                    content_length = int(content_length)
+                except ValueError:
+                    raise tornado.web.HTTPError(400, 'Invalid Content-Length')
+                if content_length > max_body_size:
+                    raise tornado.web.HTTPError(413)
+            self.request.connection.set_max_body_size(max_body_size)
+        await self._admit(route)
+        if self._timings is not None:
+            self._end_phase('queue')
+
+        if method_info.content_type in JSON_STREAM_CONTENT_TYPES:
+            content_type = self.request.headers.get('Content-Type', '')
+            framing = JSON_STREAM_FRAMINGS.get(
+                content_type.split(';')[0].strip().lower())
+            validate = None
+            if route.request_validator is not None:
+                validate = self._validate_record
+            self.body_stream = _BodyStream(
+                _JsonStreamParser(framing, self.json_codec.decode), validate)
+        else:
+            self.body_stream = _BodyStream()
+        body_stream = self.body_stream
+        self._body_stream_route = route
+        self._body_stream_future = asyncio.ensure_future(
+            self._run_method(route, params_values))
+        self._body_stream_future.add_done_callback(
+            lambda future: body_stream.abort())
+
+    def _validate_record(self, record):
+        """Validate a record of the body against the route schema.
+
+        Raises:
+            tornado.web.HTTPError: 400 if the record does not match it.
+        """
+        try:
+            self._body_stream_route.request_validator(record)
+        except _SchemaError as e:
+            raise self._invalid_request('Invalid record', [
+                {'path': e.path, 'message': e.message}])
+
+    def on_connection_close(self):
+        super(_StreamingBodyMixin, self).on_connection_close()
+        future = self._body_stream_future
+        if future is not None:
+            # _handle() is not called for bodies cut short by the client,
+            # retrieve the outcome of the method (a 499) instead.
+            future.add_done_callback(
+                lambda future: future.cancelled() or future.exception())
+
+    def data_received(self, chunk):
+        self._request_size += len(chunk)
+        if self._finished:
+            # Rest of the body of a request answered in prepare().
+            return None
+        if self.body_stream is None:
+            self._body_chunks.append(chunk)
+            return None
+        return self.body_stream.feed(chunk)
+
+    async def _handle(self, method):
+        if self.body_stream is None:
+            self.request.body = b''.join(self._body_chunks)
+            await super(_StreamingBodyMixin, self)._handle(method)
+            return
+        await self.body_stream.close()
+        response = await self._body_stream_future
+        if self._timings is not None:
+            self._end_phase('method')
+        route = self._body_stream_route
+        if route.response_validator is not None:
+            self._validate_response(route, response)
+            if self._timings is not None:
+                self._end_phase('validate')
+        if self._after_hooks:
+            response = await self._run_after_hooks(response)
+        await self._write_response(route, response)
+
+
+def streaming_resource_class(resource_class):
+    """Get the variant of a RestResource class serving streamed bodies.
+
+    tornado can only stream the request bodies of a whole handler class, so
+    the methods with stream_body are served by a subclass decorated
+    with tornado.web.stream_request_body, sharing the resource routes.
+
+    Args:
+        resource_class: RestResource class.
+
+    Returns:
+        The streaming RestResource subclass, created once per class.
+    """
+    variant = resource_class.__dict__.get('_streaming_class')
+    if variant is None:
+        variant = tornado.web.stream_request_body(type(
+            resource_class.__name__, (_StreamingBodyMixin, resource_class),
+            {'_route_table': resource_class.get_route_table()}))
+        resource_class._streaming_class = variant
+    return variant
+
+
+def is_items_stream(response):
+    """Whether a method response is a generator of items to stream."""
+    return inspect.isgenerator(response) or inspect.isasyncgen(response)
+
+
+async def write_items_stream(handler, items):
+    """Stream the items of a generator as a {"items": [...]} document, in
+    the negotiated format.
+
+    Items are encoded one by one and the response is flushed (sent with
+    chunked transfer) every RESPONSE_FLUSH_SIZE bytes. Waiting for each flush
+    to complete applies the client backpressure to the generator. Formats
+    without an items_framing (e.g. MessagePack, whose arrays start with their
+    length) get the items collected into one document instead.
+
+    Args:
+        handler: RestResource, Handler of the request.
+        items: generator or async generator, Items of the response.
+    """
+    codec = handler.response_codec
+    handler.set_header('Content-Type', codec.content_type)
+    framing = getattr(codec, 'items_framing', None)
+    if framing is None:
+        await _write_items_document(handler, codec, items)
+        return
+    prefix, item_separator, suffix = framing
+    handler.write(prefix)
+    separator = b''
+    buffered = 0
+    try:
+        if inspect.isasyncgen(items):
+            async for item in items:
+                chunk = separator + codec.encode(item)
+                handler.write(chunk)
+                separator = item_separator
+                buffered += len(chunk)
+                if buffered >= RESPONSE_FLUSH_SIZE:
+                    buffered = 0
+                    await handler.flush()
+        else:
+            for item in items:
+                chunk = separator + codec.encode(item)
+                handler.write(chunk)
+                separator = item_separator
+                buffered += len(chunk)
+                if buffered >= RESPONSE_FLUSH_SIZE:
+                    buffered = 0
+                    await handler.flush()
+    except StreamClosedError:
+        # The client went away, stop producing items.
+        return
+    finally:
+        if inspect.isasyncgen(items):
+            await items.aclose()
+        else:
+            items.close()
+    handler.write(suffix)
+    handler.finish()
+
+
+async def _write_items_document(handler, codec, items):
+    """Collect the items of a generator into one {"items": [...]} document
+    and write it.
+    """
+    if inspect.isasyncgen(items):
+        collected = [item async for item in items]
+    else:
+        collected = list(items)
+    handler.finish(codec.encode({'items': collected}))
@@ -1,51 +1,155 @@
 # standard library imports
+import asyncio
 import logging
 import inspect
-import re
+import os
+import random
+import signal
+import time
 import traceback
-import json
 
 # third-party imports
+import tornado.routing
 import tornado.web
-from tornado import gen
-from tornado.escape import json_decode
+from tornado import httputil
+from tornado.concurrent import is_future
 
 # application-specific imports
+from .api_admission import _Overloaded
+from .api_batch import DEFAULT_BATCH_CONCURRENCY
+from .api_batch import DEFAULT_BATCH_MAX_SIZE
+from .api_batch import DEFAULT_BATCH_TIMEOUT
+from .api_batch import _BatchHandler
+from .api_cache import UNSTORED_HEADERS
+from .api_cache import _CacheEntry
+from .api_codecs import _CodecRegistry
+from .api_codecs import default_codecs
+from .api_codecs import default_json_codec
+from .api_codecs import get_json_codec
+from .api_events import write_event_stream
+from .api_compression import compress
+from .api_exceptions import ApiConfigurationError
+from .api_executors import create_executor_pools
+from .api_metrics import MetricsRegistry
+from .api_metrics import _MetricsHandler
+from .api_pagination import _CursorSigner
+from .api_pagination import next_link
+from .api_process import DEFAULT_DRAIN_TIMEOUT
+from .api_profiling import _Profiler
+from .api_profiling import _ProfilerHandler
+from .api_resources import _HealthHandler
+from .api_resources import _ResourceRegistry
+from .api_process import serve
+from .api_routing import _ResourceRouter
+from .api_routing import _RouteTable
+from .api_schema import _SchemaError
+from .api_streaming import is_items_stream
+from .api_streaming import streaming_resource_class
+from .api_streaming import write_items_stream
 
 logger = logging.getLogger(__name__)
+slow_request_logger = logging.getLogger('tornado_restful.slow_requests')
 
 
 class RestResource(tornado.web.RequestHandler):
-    @gen.coroutine
+    # Route of the request, once routed.
+    _route = None
+    # Bytes of response body flushed so far.
+    _response_size = 0
+    # Bytes of request body received, counted before request.body is
+    # replaced by the decoded document.
+    _request_size = None
+    # Concurrency limiters the request holds a slot of, and since when.
+    _admitted = ()
+    _admitted_at = None
+    # Deadline of the request (time.monotonic() value), None if unbounded.
+    deadline = None
+    # Task running the resource function, cancelled on client disconnection.
+    _method_task = None
+    _disconnected = False
+    # Cause of the cancellation of the method ('deadline' or 'disconnect').
+    _cancellation = None
+    # Page requested from a paginated method (a _Page), None otherwise.
+    page = None
+    # Codec of the response documents, once negotiated.
+    _response_codec = None
+    # (phase, seconds) durations of the phases of a timed request, the
+    # current phase starting at _phase_start (time.monotonic() values).
+    _timings = None
+    _phase_start = None
+    _started = None
+    _params_values = ()
+    # Future resolved when the client of an event stream disconnects.
+    _event_stream_closed = None
+    # Whether the end of the request was recorded in the metrics.
+    _metrics_ended = False
+    # Hooks of the route in the application serving the request.
+    _before_hooks = ()
+    _after_hooks = ()
+
+    @property
+    def json_codec(self):
+        """JSON codec of the application serving the request."""
+        return getattr(self.application, 'json_codec', default_json_codec)
+
+    @property
+    def codecs(self):
+        """Codecs registry of the application serving the request."""
+        return getattr(self.application, 'codecs', default_codecs)
+
+    @property
+    def last_event_id(self):
+        """Identifier of the last event received by a client resuming an
+        event stream, None for a new stream.
+        """
+        return self.request.headers.get('Last-Event-ID')
+
+    @property
+    def response_codec(self):
+        """Codec of the response documents, negotiated from the request
+        Accept header.
+        """
+        if self._response_codec is None:
+            self._response_codec = self.codecs.negotiate(
+                self.request.headers.get('Accept'))
+        return self._response_codec
+
+    # Verbs return the _handle() coroutine, awaited by tornado.
     def get(self):
         """Get method."""
-        yield self._handle('GET')
+        return self._handle('GET')
+
+    def head(self):
+        """Head method, served by the GET methods unless one is declared."""
+        return self._handle('HEAD')
 
-    @gen.coroutine
     def post(self):
         """Post method."""
-        # try:
-        #     self.request.body = tornado.escape.json_decode(self.request.body)
-        # except ValueError:
-        #     raise tornado.web.HTTPError(400, 'Invalid JSON')
-        yield self._handle('POST')
+        return self._handle('POST')
 
-    @gen.coroutine
     def put(self):
         """Put method."""
-        # try:
-        #     self.request.body = tornado.escape.json_decode(self.request.body)
-        # except ValueError:
-        #     raise tornado.web.HTTPError(400, 'Invalid JSON')
-        yield self._handle('PUT')
+        return self._handle('PUT')
+
+    def patch(self):
+        """Patch method."""
+        return self._handle('PATCH')
 
-    @gen.coroutine
     def delete(self):
         """Delete method."""
-        yield self._handle('DELETE')
+        return self._handle('DELETE')
+
+    def options(self):
+        """Options method, answers with the allowed methods unless one is
+        declared.
+        """
+        return self._handle('OPTIONS')
 
     def write_error(self, status_code, **kwargs):
         """See Tornado doc"""
+        exception = kwargs.get('exc_info', (None, None))[1]
+        if isinstance(exception, _Overloaded):
+            self.set_header('Retry-After', str(exception.retry_after))
         if self.settings.get("serve_traceback") and "exc_info" in kwargs:
             # in debug mode, try to send a traceback
             self.set_header('Content-Type', 'text/plain')
@@ -53,20 +157,20 @@ class RestResource(tornado.web.RequestHandler):
                 self.write(line)
             self.finish()
         else:
-            self.set_header('Content-Type', 'application/json')
+            codec = self.response_codec
+            self.set_header('Content-Type', codec.content_type)
             error = {'code': status_code, 'reason': self._reason}
             if 'exc_info' in kwargs:
                 exception = kwargs['exc_info'][1]
                 if isinstance(exception, tornado.web.HTTPError) and exception.log_message:  # noqa
                     try:
-                        error.update(
-                            json.loads(exception.log_message % exception.args))
+                        error.update(self.json_codec.decode(
+                            exception.log_message % exception.args))
                     except Exception:
                         error['message'] = exception.log_message % exception.args  # noqa
-            self.finish(error)
+            self.finish(codec.encode(error))
 
-    @gen.coroutine
-    def _handle(self, method):
+    async def _handle(self, method):
         """Handle the request.
 
         This function handle the request for executing the right Rest service
@@ -74,65 +178,626 @@ class RestResource(tornado.web.RequestHandler):
         Args:
             method: string, Http request verb.
         """
-        path_parts = self.request.path.split('/')
-        endpoints_and_params = list(filter(lambda x: x != '', path_parts))
+        started = time.monotonic()
+        if self._request_size is None:
+            self._request_size = len(self.request.body)
+        route_table, route, params_values, status_code = self._lookup_route()
+        if status_code is not None:
+            if method == 'OPTIONS' and status_code == 405:
+                # Paths without an OPTIONS method list their allowed methods.
+                self.set_header('Allow', ', '.join(
+                    route_table.allowed_methods(self.request.path)))
+                self.set_status(204)
+                self.finish()
+                return
+            raise tornado.web.HTTPError(status_code)
+        self._enter_route(route, params_values, started)
+        timed = self._timings is not None
 
-        resources_functions = self.get_resources_functions()
-        # Get all http methods configured in the class RestHandler
-        http_methods = set([func.method_info.http_method for func in resources_functions])  # noqa
+        if self._before_hooks:
+            response = await self._run_before_hooks()
+            if timed:
+                self._end_phase('hooks')
+            if response is not None:
+                await self._write_response(route, response)
+                return
 
-        if method not in http_methods:
-            raise tornado.web.HTTPError(405)
+        # Responses of the cache and of the coalesced calls are encoded, so
+        # each content type has its own.
+        variant = None
+        if self.codecs.negotiable:
+            self._add_vary('Accept')
+            variant = self.response_codec.content_type
+        cache = route.cache
+        if cache is not None:
+            cache_key = cache.make_key(self, params_values, variant)
+            entry = cache.get(cache_key)
+            if timed:
+                self._end_phase('cache')
+            if entry is not None:
+                self._write_cache_entry(route, entry)
+                return
 
-        # Find the right function to execute
-        for func in resources_functions:
-            method_info = func.method_info
-
-            if method_info.http_method != method:
-                continue
-
-            # List of service endpoints
-            endpoint = re.findall(
-                r"(?<=/)\w+", method_info.get_path(self.api_info))
-            #
-            endpoint_from_request = list(filter(
-                lambda x: x in path_parts, endpoint))
-
-            if endpoint != endpoint_from_request:
-                continue
-            endpoint_params = re.findall(
-                r"(?<={)\w+", method_info.get_path(self.api_info))
-
-            if len(endpoint_params) + len(endpoint) != len(endpoints_and_params):  # noqa
-                continue
-
-            if (method_info.http_method in ['POST', 'PUT'] and
-                    method_info.content_type == 'application/json'):
-                try:
-                    self.request.body = json_decode(self.request.body)
-                except ValueError:
-                    raise tornado.web.HTTPError(400, 'Invalid JSON')
-
-            # try:
-            params_values = self._find_params_value_of_url(
-                endpoint, self.request.path)
-            # p_values = self._convert_params_values(params_values, params_types)
-            response = yield func(self, *params_values)
-
-            if isinstance(response, dict):
-                self.set_header("Content-Type", 'application/json')
-                self.write(response)
-                self.finish()
-            elif isinstance(response, list):
-                self.set_header("Content-Type", 'application/json')
-                self.write({'items': response})
-                self.finish()
+        coalescer = route.coalescer
+        leading = False
+        if coalescer is not None:
+            coalesce_key = coalescer.make_key(self, params_values, variant)
+            leading, flight = coalescer.enter(coalesce_key)
+            if flight is not None:
+                entry = await flight
+                if timed:
+                    self._end_phase('coalesce')
+                if entry is not None:
+                    self._write_cache_entry(route, entry)
+                    return
+
+        try:
+            if route.paginator is not None:
+                self.page = route.paginator.start(
+                    self, route.method_id, self.application.cursor_signer)
+            await self._admit(route)
+            if timed:
+                self._end_phase('queue')
+            if route.decode_body:
+                self.request.body = self._decode_body()
+                if route.request_validator is not None:
+                    try:
+                        route.request_validator(self.request.body)
+                    except _SchemaError as e:
+                        raise self._invalid_request('Invalid body', [
+                            {'path': e.path, 'message': e.message}])
+                if timed:
+                    self._end_phase('decode')
+            profiler = getattr(self.application, 'profiler', None)
+            if profiler is not None and profiler.sessions:
+                response = await profiler.profile(
+                    route.method_id, self._run_method(route, params_values))
             else:
-                self.write(response)
-                self.finish()
-                # raise tornado.web.HTTPError(500, 'Response is not a json document')
-            # except Exception:
-            #     raise tornado.web.HTTPError(500)
+                response = await self._run_method(route, params_values)
+            if route.paginator is not None:
+                response = await self._paginate(route, response)
+            if timed:
+                self._end_phase('method')
+            if route.response_validator is not None:
+                self._validate_response(route, response)
+                if timed:
+                    self._end_phase('validate')
+            if self._after_hooks:
+                response = await self._run_after_hooks(response)
+                if timed:
+                    self._end_phase('hooks')
+
+            entry = None
+            if isinstance(response, (dict, list)) and (
+                    cache is not None or leading):
+                # The status and headers set by the method are replayed with
+                # the body.
+                body = self._encode_document(response)
+                content_type = self.response_codec.content_type
+                headers = self._stored_headers()
+                if cache is not None:
+                    entry = cache.set(cache_key, body, content_type,
+                                      self.get_status(), self._reason,
+                                      headers)
+                else:
+                    entry = _CacheEntry(body, content_type, 0,
+                                        self.get_status(), self._reason,
+                                        headers)
+        except BaseException as e:
+            if leading:
+                # A leader cancelled by its own deadline or disconnection
+                # has no outcome to share, its waiters call the method.
+                if self._cancellation is not None:
+                    outcome = asyncio.CancelledError()
+                else:
+                    outcome = e
+                self._leave_flight(route, coalesce_key, exception=outcome)
+            raise
+        if leading:
+            self._leave_flight(route, coalesce_key, entry)
+        if entry is not None:
+            self._write_cache_entry(route, entry)
+            return
+        if route.event_stream:
+            await write_event_stream(self, response, route.keepalive)
+            return
+        await self._write_response(route, response)
+
+    def _lookup_route(self):
+        """Find the route of the request.
+
+        Requests dispatched by a RestService were routed by its route table,
+        others are routed by the table of the handler class.
+
+        Returns:
+            A (route_table, route, params_values, status_code) tuple, see
+            _RouteTable.lookup().
+        """
+        routed = getattr(self.request, 'restful_route', None)
+        if routed is not None:
+            return routed
+        route_table = self.get_route_table()
+        return (route_table,) + route_table.lookup(
+            self.request.method, self.request.path)
+
+    async def _run_before_hooks(self):
+        """Run the before hooks of the route.
+
+        Returns:
+            The response of the hook answering the request, None if all of
+            them let it through.
+        """
+        for hook in self._before_hooks:
+            response = hook(self)
+            if inspect.isawaitable(response):
+                response = await response
+            if response is not None:
+                return response
+        return None
+
+    async def _run_after_hooks(self, response):
+        """Run the after hooks of the route, innermost first.
+
+        Returns:
+            The response, as replaced by the hooks.
+        """
+        for hook in self._after_hooks:
+            replaced = hook(self, response)
+            if inspect.isawaitable(replaced):
+                replaced = await replaced
+            if replaced is not None:
+                response = replaced
+        return response
+
+    def _enter_route(self, route, params_values, started):
+        """Record that the request is served by a route, set its deadline
+        and start timing its phases if needed.
+
+        Args:
+            route: _Route, Route of the request.
+            params_values: list, Path params values of the request.
+            started: float, time.monotonic() when routing started.
+        """
+        self._route = route
+        route_hooks = getattr(self.application, 'route_hooks', None)
+        hooks = route_hooks.get(route) if route_hooks else None
+        self._before_hooks, self._after_hooks = (
+            hooks if hooks is not None else route.default_hooks)
+        if getattr(self.application, 'server_timing', False) or (
+                self._slow_threshold() is not None):
+            self._timings = []
+            self._started = self._phase_start = started
+            self._params_values = params_values
+            self._end_phase('route')
+        metrics = getattr(self.application, 'metrics', None)
+        if metrics is not None:
+            metrics.request_started(route.method_id)
+        timeout = route.timeout
+        client_timeout = self._client_timeout()
+        if client_timeout is not None and (
+                timeout is None or client_timeout < timeout):
+            timeout = client_timeout
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+
+    def _client_timeout(self):
+        """Get the client deadline of the request, in seconds.
+
+        Returns:
+            The number of seconds sent in the RestService(deadline_header)
+            header, None when the header is not enabled or not sent.
+
+        Raises:
+            HTTPError: 400 when the header is not a positive number.
+        """
+        deadline_header = getattr(self.application, 'deadline_header', None)
+        if deadline_header is None:
+            return None
+        value = self.request.headers.get(deadline_header)
+        if value is None:
+            return None
+        try:
+            client_timeout = float(value)
+        except ValueError:
+            client_timeout = None
+        if client_timeout is None or not 0 < client_timeout < float('inf'):
+            raise self._invalid_request('Invalid deadline', [{
+                'path': deadline_header,
+                'message': 'Expecting a positive number of seconds'}])
+        return client_timeout
+
+    async def _admit(self, route):
+        """Take a slot of each concurrency limiter of the route, released
+        when the request finishes.
+
+        Raises:
+            _Overloaded: If a limiter rejects the request (a 503).
+        """
+        admitted = []
+        try:
+            for limiter in route.limiters:
+                await limiter.acquire(route.priority)
+                admitted.append(limiter)
+        except BaseException as e:
+            for limiter in admitted:
+                limiter.release()
+            metrics = getattr(self.application, 'metrics', None)
+            if isinstance(e, _Overloaded) and metrics is not None:
+                metrics.increment(
+                    'shed_requests_total',
+                    'Requests rejected by a concurrency limiter, by method '
+                    'and reason.', (('method_id', route.method_id),
+                                    ('reason', e.cause)))
+            raise
+        if admitted:
+            self._admitted = admitted
+            self._admitted_at = time.monotonic()
+
+    def on_finish(self):
+        """See Tornado doc"""
+        self._release_slots()
+        if self._timings is not None:
+            self._log_slow_request()
+
+    def _release_slots(self):
+        """Release the concurrency limiters slots held by the request.
+
+        Called when the request finishes or its client disconnects, whichever
+        comes first: requests aborted while their body is received are never
+        finished.
+        """
+        if self._admitted:
+            latency = time.monotonic() - self._admitted_at
+            admitted, self._admitted = self._admitted, ()
+            for limiter in admitted:
+                limiter.release(latency)
+
+    def _end_metrics(self, status_code):
+        """Record the end of a routed request in the application metrics,
+        once.
+
+        Args:
+            status_code: integer, HTTP status code of the response.
+        """
+        if self._route is None or self._metrics_ended:
+            return
+        self._metrics_ended = True
+        metrics = getattr(self.application, 'metrics', None)
+        if metrics is not None:
+            request_size = self._request_size
+            if request_size is None:
+                request_size = len(self.request.body or b'')
+            metrics.request_finished(
+                self._route.method_id, status_code,
+                self.request.request_time(), request_size,
+                self._response_size)
+
+    def _slow_threshold(self):
+        """Get the seconds over which the request is logged as slow, None
+        if never.
+        """
+        threshold = self._route.slow_threshold
+        if threshold is None:
+            threshold = getattr(
+                self.application, 'slow_request_threshold', None)
+        return threshold
+
+    def _end_phase(self, phase):
+        """Record the duration of a phase of a timed request, ending now."""
+        now = time.monotonic()
+        self._timings.append((phase, now - self._phase_start))
+        self._phase_start = now
+
+    def _log_slow_request(self):
+        """Log the request with the duration of its phases when it lasted
+        more than its slow threshold.
+        """
+        threshold = self._slow_threshold()
+        duration = time.monotonic() - self._started
+        if threshold is None or duration < threshold:
+            return
+        route = self._route
+        record = {
+            'method_id': route.method_id,
+            'path_params': dict(zip(route.param_names, (
+                str(value) for value in self._params_values))),
+            'status': self.get_status(),
+            'duration': duration,
+            'phases': dict(self._timings),
+        }
+        slow_request_logger.warning(
+            'Slow request %s %.1fms: %s', route.method_id, duration * 1000,
+            self.json_codec.encode(record).decode('utf-8'),
+            extra={'slow_request': record})
+
+    def _leave_flight(self, route, key, entry=None, exception=None):
+        """End the coalesced call led by the request, passing its outcome to
+        the identical requests waiting for it.
+        """
+        waiters = route.coalescer.leave(key, entry, exception)
+        metrics = getattr(self.application, 'metrics', None)
+        if waiters and metrics is not None:
+            metrics.increment(
+                'coalesced_requests_total',
+                'Requests served by the call of an identical request, '
+                'by method.', (('method_id', route.method_id),), waiters)
+
+    def flush(self, include_footers=False):
+        """See Tornado doc"""
+        if self._timings is not None and not self._headers_written:
+            # Everything since the method returned prepared the response.
+            self._end_phase('write')
+            if getattr(self.application, 'server_timing', False):
+                self.set_header('Server-Timing', ', '.join(
+                    '%s;dur=%.3f' % (phase, duration * 1000)
+                    for phase, duration in self._timings + [
+                        ('total', self._phase_start - self._started)]))
+        for chunk in self._write_buffer:
+            self._response_size += len(chunk)
+        return super(RestResource, self).flush(include_footers)
+
+    def remaining_time(self):
+        """Get the time left before the request deadline, to bound the
+        downstream calls of a method.
+
+        Returns:
+            Seconds left (0.0 once passed), None if the request has no
+            deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def on_connection_close(self):
+        """See Tornado doc"""
+        self._disconnected = True
+        if self._method_task is not None:
+            self._method_task.cancel()
+        self._release_slots()
+        # Requests whose response was not started are counted as 499s.
+        self._end_metrics(
+            self.get_status() if self._headers_written else 499)
+        closed = self._event_stream_closed
+        if closed is not None and not closed.done():
+            closed.set_result(None)
+        super(RestResource, self).on_connection_close()
+
+    async def _run_method(self, route, params_values):
+        """Call the resource function of a route in a task cancelled when
+        the request deadline passes or the client disconnects.
+
+        Functions neither async nor bounded by a deadline are called
+        directly, there would be nothing to cancel.
+
+        Returns:
+            The response of the function.
+
+        Raises:
+            HTTPError: 504 when the deadline passed, 499 when the client
+              disconnected.
+        """
+        if self.deadline is None and not route.is_coroutine:
+            return await self._call_method(route, params_values)
+        task = asyncio.ensure_future(self._call_method(route, params_values))
+        self._method_task = task
+        try:
+            if self.deadline is None:
+                return await task
+            return await asyncio.wait_for(task, self.remaining_time())
+        except asyncio.TimeoutError:
+            if not task.cancelled():
+                raise
+            self._count_cancellation(route, 'deadline')
+            raise tornado.web.HTTPError(504, 'Deadline exceeded')
+        except asyncio.CancelledError:
+            if not self._disconnected:
+                raise
+            self._count_cancellation(route, 'disconnect')
+            raise tornado.web.HTTPError(499, reason='Client Closed Request')
+        finally:
+            self._method_task = None
+
+    def _count_cancellation(self, route, cause):
+        self._cancellation = cause
+        metrics = getattr(self.application, 'metrics', None)
+        if metrics is not None:
+            metrics.increment(
+                'cancelled_requests_total',
+                'Requests whose method was cancelled, by method and cause.',
+                (('method_id', route.method_id), ('cause', cause)))
+
+    async def _call_method(self, route, params_values):
+        """Call the resource function of a route.
+
+        async def functions are awaited, other functions are called directly
+        and their result is awaited only when it is a Future (e.g. functions
+        decorated with gen.coroutine). Functions with an executor run in the
+        application executor pool. Path params are passed positionally, the
+        other parameters are bound from the query arguments and JSON body.
+
+        Returns:
+            The response of the function.
+
+        Raises:
+            HTTPError: 400 listing the parameters which could not be bound.
+        """
+        kwargs = {}
+        if route.binder is not None:
+            kwargs, errors = route.binder.bind(self.request)
+            if errors:
+                raise self._invalid_request('Invalid parameters', errors)
+        for name in route.page_arguments:
+            kwargs[name] = getattr(self.page, name)
+        if route.injected:
+            resources = self.application.resources
+            if not resources.started:
+                await resources.start()
+            for name in route.injected:
+                kwargs[name] = resources[name]
+        if route.executor is not None:
+            pool = self.application.executor_pools[route.executor]
+            return await pool.run(route.func, self, params_values, kwargs)
+        response = route.func(self, *params_values, **kwargs)
+        if route.is_coroutine or is_future(response):
+            response = await response
+        return response
+
+    async def _paginate(self, route, response):
+        """Read the page of items of a paginated method response.
+
+        Returns:
+            The page document: {"items": [...], "cursor": token of the next
+            page, "next": its URL}, cursor and next being None on the last
+            page.
+        """
+        items, next_cursor = await route.paginator.collect(
+            self.page, response)
+        token = link = None
+        if next_cursor is not None:
+            token = self.application.cursor_signer.encode(
+                route.method_id, next_cursor)
+            link = next_link(self.request, token)
+            self.set_header('Link', '<%s>; rel="next"' % link)
+        return {'items': items, 'cursor': token, 'next': link}
+
+    def _decode_body(self):
+        """Decode the request body with the codec of its Content-Type.
+
+        Bodies of the Content-Types without a registered codec are decoded as
+        JSON.
+
+        Raises:
+            HTTPError: 400 if the body can not be decoded.
+        """
+        codec = self.codecs.for_content_type(
+            self.request.headers.get('Content-Type'))
+        if codec is None:
+            codec = self.json_codec
+        try:
+            return codec.decode(self.request.body)
+        except ValueError:
+            if codec is self.json_codec:
+                raise tornado.web.HTTPError(400, 'Invalid JSON')
+            raise tornado.web.HTTPError(400, 'Invalid %s body', codec.name)
+
+    def _invalid_request(self, message, errors):
+        """Get the HTTPError answering a 400 which lists errors."""
+        return tornado.web.HTTPError(400, '%s', self.json_codec.encode({
+            'message': message, 'errors': errors}).decode('utf-8'))
+
+    def _validate_response(self, route, response):
+        """Validate a dict/list response against the route schema, on the
+        share of the requests set by RestService(response_validation).
+
+        Mismatches are logged and counted, and answered with a 500 in debug
+        mode.
+        """
+        rate = getattr(self.application, 'response_validation_rate', 0.0)
+        if not rate or (rate < 1.0 and random.random() >= rate):
+            return
+        if not isinstance(response, (dict, list)):
+            return
+        try:
+            route.response_validator(response)
+        except _SchemaError as e:
+            logger.error('Invalid response of %s at %s: %s', route.method_id,
+                         e.path, e.message)
+            metrics = getattr(self.application, 'metrics', None)
+            if metrics is not None:
+                metrics.increment(
+                    'invalid_responses_total',
+                    'Responses not matching their schema, by method.',
+                    (('method_id', route.method_id),))
+            if self.settings.get('debug'):
+                raise tornado.web.HTTPError(
+                    500, 'Invalid response at %s: %s', e.path, e.message)
+
+    def _encode_document(self, response):
+        """Encode a dict response, or a list response as {'items': list},
+        with the negotiated codec.
+        """
+        if isinstance(response, list):
+            response = {'items': response}
+        return self.response_codec.encode(response)
+
+    def _add_vary(self, header):
+        """Add a request header to the Vary header of the response."""
+        vary = self._headers.get('Vary')
+        self.set_header('Vary', '%s, %s' % (vary, header) if vary else header)
+
+    def _negotiate_encoding(self, route, size):
+        """Choose the compression of a response of the route.
+
+        Returns:
+            The encoding name, None to send the response uncompressed.
+        """
+        compression = route.compression
+        if compression is None:
+            return None
+        self._add_vary('Accept-Encoding')
+        return compression.negotiate(
+            self.request.headers.get('Accept-Encoding'), size)
+
+    def _stored_headers(self):
+        """Get the headers of the response stored with its body in a
+        _CacheEntry.
+
+        Returns:
+            List of (name, value) tuples, see api_cache.UNSTORED_HEADERS.
+        """
+        return [(name, value) for name, value in self._headers.get_all()
+                if name not in UNSTORED_HEADERS]
+
+    def _write_cache_entry(self, route, entry):
+        """Write a cached response, with the status code and headers of the
+        method response, and finish the request.
+
+        Answers a 200 with a 304 when the request If-None-Match header
+        matches the entry ETag.
+        """
+        self.set_status(entry.status_code, entry.reason)
+        for name in set(name for name, _ in entry.headers):
+            self.clear_header(name)
+        for name, value in entry.headers:
+            self.add_header(name, value)
+        body = entry.body
+        etag = entry.etag
+        encoding = self._negotiate_encoding(route, len(body))
+        if encoding is not None:
+            body, etag = entry.compressed(encoding)
+            self.set_header('Content-Encoding', encoding)
+        self.set_header('Content-Type', entry.content_type)
+        self.set_header('Etag', etag)
+        if entry.status_code == 200 and self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+        else:
+            self.finish(body)
+
+    async def _write_response(self, route, response):
+        """Write the response of a resource function and finish the request.
+
+        Args:
+            route: _Route, Route of the request.
+            response: dict, list, generator or async generator of items, or
+              any value accepted by write(). Items of generators are streamed
+              as they are produced.
+        """
+        if is_items_stream(response):
+            await write_items_stream(self, response)
+        elif isinstance(response, (dict, list)):
+            body = self._encode_document(response)
+            encoding = self._negotiate_encoding(route, len(body))
+            if encoding is not None:
+                body = compress(body, encoding)
+                self.set_header('Content-Encoding', encoding)
+            self.set_header("Content-Type", self.response_codec.content_type)
+            self.write(body)
+            self.finish()
+        else:
+            self.write(response)
+            self.finish()
+            # raise tornado.web.HTTPError(500, 'Response is not a json document')
 
     @classmethod
     def get_resources_functions(self):
@@ -151,41 +816,47 @@ class RestResource(tornado.web.RequestHandler):
             paths.append(func.method_info.get_path(self.api_info))
         return paths
 
-    def _find_params_value_of_url(self, services, url):
-        """Find the values of path params """
-        url_split = url.split('/')
-        values = [
-            item for item in url_split if item not in services and item != '']
-        return values
-
-    def _find_params_value_of_arguments(self, operation):
-        values = []
-        if len(self.request.arguments) > 0:
-            a = operation._service_params
-            b = operation._func_params
-            params = [item for item in b if item not in a]
-            for p in params:
-                if p in self.request.arguments.keys():
-                    v = self.request.arguments[p]
-                    values.append(v[0])
-                else:
-                    values.append(None)
-        elif (len(self.request.arguments) == 0 and
-              len(operation._query_params) > 0):
-            values = [None]*(len(operation._func_params) - len(operation._service_params))  # noqa
-        return values
-
-# 	def _convert_params_values(self, values_list, params_types):
-# 		""" Converts the values to the specifics types """
-# 		values = list()
-# 		i = 0
-# 		for v in values_list:
-# 			if v != None:
-# 				values.append(types.convert(v,params_types[i]))
-# 			else:
-# 				values.append(v)
-# 			i+=1
-# 		return values
+    @classmethod
+    def get_route_table(cls):
+        """Get the compiled dispatch table of the resource.
+
+        The table is built on first use (RestService builds it at startup)
+        and stored on the class itself, never inherited from a parent class.
+        """
+        route_table = cls.__dict__.get('_route_table')
+        if route_table is None:
+            route_table = _RouteTable.for_resource(
+                cls.get_resources_functions(), cls.api_info)
+            cls._route_table = route_table
+        return route_table
+
+
+class _InFlightDelegate(httputil.HTTPMessageDelegate):
+    """Delegate of a request, removing it from the requests in flight of
+    the application when its connection closes while its body is received.
+
+    Such requests are dropped by tornado without being finished nor logged.
+    """
+    def __init__(self, requests_in_flight, request, delegate):
+        self.__requests_in_flight = requests_in_flight
+        self.__request = request
+        self.__delegate = delegate
+
+    def headers_received(self, start_line, headers):
+        return self.__delegate.headers_received(start_line, headers)
+
+    def data_received(self, chunk):
+        return self.__delegate.data_received(chunk)
+
+    def finish(self):
+        self.__delegate.finish()
+
+    def on_connection_close(self):
+        self.__requests_in_flight.discard(self.__request)
+        self.__delegate.on_connection_close()
+
+    def execute(self):
+        return self.__delegate.execute()
 
 
 class RestService(tornado.web.Application):
@@ -193,23 +864,329 @@ class RestService(tornado.web.Application):
     resource = None
 
     def __init__(self, rest_handlers, resource=None, handlers=None,
-                 default_host="", transforms=None, **settings):
+                 default_host="", transforms=None, json_codec=None,
+                 executors=None, metrics_path=None, batch_path=None,
+                 batch_concurrency=DEFAULT_BATCH_CONCURRENCY,
+                 batch_max_size=DEFAULT_BATCH_MAX_SIZE,
+                 batch_timeout=DEFAULT_BATCH_TIMEOUT,
+                 deadline_header=None,
+                 response_validation='debug', cursor_secret=None,
+                 codecs=None, profiler_path=None, profiler_token=None,
+                 profiler_signal=None, server_timing=False,
+                 slow_request_threshold=None, resources=None,
+                 health_path=None, hooks=None, authenticate=None,
+                 **settings):
+        """Constructor for RestService.
+
+        Args:
+            rest_handlers: list, RestResource classes to serve.
+            resource: dict, Keyword arguments passed to the initialize()
+              method of the RestResource handlers. (Default: None)
+            handlers: list, Additional tornado handlers, matched after the
+              resource routes. Requests matching neither are answered with
+              the JSON 404 of the resources, unless a default_handler_class
+              setting is given. (Default: None)
+            default_host: string, See tornado.web.Application.
+            transforms: list, See tornado.web.Application.
+            json_codec: string, Codec decoding and encoding JSON bodies and
+              streamed JSON records, 'json', 'orjson' or None for the
+              fastest one installed. orjson decodes integers out of the 64
+              bits range to floats, 'json' keeps them exact. (Default: None)
+            executors: dict, Executor pools running the methods declared
+              with @method(executor=name). Values are a kind ('thread' or
+              'process'), a (kind, max_workers) tuple or a concurrent.futures
+              executor. 'thread' and 'process' pools of the default size
+              exist unless overridden. (Default: None)
+            metrics_path: string, Path serving the requests metrics of the
+              methods in the Prometheus text format, e.g. '/metrics'.
+              Metrics are recorded even without it, see self.metrics.
+              (Default: None)
+            batch_path: string, Path accepting POSTed JSON arrays of
+              {"method", "path", "body", "headers"} sub-requests, served
+              concurrently through the routing of this service without
+              going through HTTP, e.g. '/batch'. (Default: None)
+            batch_concurrency: integer, Sub-requests of a batch served at
+              the same time. (Default: 8)
+            batch_max_size: integer, Maximum number of sub-requests in a
+              batch. (Default: 100)
+            batch_timeout: number, Seconds a sub-request may run before it
+              is cancelled and answered with a 504, None for no limit.
+              (Default: 30)
+            deadline_header: string, Request header carrying the client
+              deadline, in seconds from the request arrival, e.g.
+              'X-Request-Timeout'. It shortens the @method(timeout) of the
+              methods, never extends it, and bounds the others. Values which
+              are not positive numbers are answered with a 400.
+              (Default: None, client deadlines are ignored)
+            response_validation: Share of the responses validated against
+              the @method(response_schema) of their method: 'debug' for all
+              of them in debug mode and none otherwise, True for all, False
+              for none or a sampling rate between 0 and 1.
+              (Default: 'debug')
+            cursor_secret: string, Key signing the pagination cursors. It
+              must be shared by the servers of a service for their cursors
+              to be interchangeable. (Default: None, the cookie_secret
+              setting, else a random key per RestService)
+            codecs: list, Formats of the request and response documents in
+              addition to JSON: 'msgpack', 'cbor' or codec instances (name,
+              content_type, encode() and decode() members). Request bodies
+              are decoded according to their Content-Type and dict/list
+              responses encoded according to the Accept header. Generator
+              responses are streamed in the formats with an items_framing
+              (JSON and CBOR), and buffered in the others.
+              (Default: None, the built-in formats whose library is
+              installed)
+            profiler_path: string, Path of the admin routes profiling the
+              methods on demand, e.g. '/_profiler': POST
+              {profiler_path}/{method_id}?mode=sample&rate=0.1 starts
+              sampling a method ('*' for all), GET
+              {profiler_path}/{method_id}?format=collapsed|pstats downloads
+              its profile and DELETE stops it. (Default: None)
+            profiler_token: string, Bearer token required by the profiler
+              routes, mandatory with a profiler_path. The client address
+              can not authorize them: it is the proxy's behind a reverse
+              proxy, and comes from client headers with xheaders.
+              (Default: None)
+            profiler_signal: integer, Signal sampling every method on a first
+              delivery, then writing the profiles to the temporary directory
+              on the next one, e.g. signal.SIGUSR2. serve() refuses the
+              signals it handles itself (SIGTERM, SIGINT and SIGHUP).
+              (Default: None)
+            server_timing: boolean, Time the phases of the requests (route,
+              cache, coalesce, queue, decode, method, validate, write) and
+              send their durations in a Server-Timing header. (Default:
+              False)
+            slow_request_threshold: number, Requests lasting more than this
+              many seconds are logged to the tornado_restful.slow_requests
+              logger, with their method_id, path params and phases
+              durations, unless their @method(slow_threshold) says
+              otherwise. (Default: None, not logged)
+            resources: dict, Resources shared by the requests (connection
+              pools, clients, caches), by name. Values are factories called
+              without arguments, sync or async, or dicts of the 'factory' and
+              of the 'warmup', 'check' and 'close' functions called with the
+              resource; the resource's own warmup(), check() and close()
+              methods are used otherwise. Each worker process creates and
+              warms them up before accepting connections (see serve() and
+              start_resources()) and closes them once drained. Methods get
+              them with @method(inject=[name]). (Default: None)
+            health_path: string, Path answering with the health checks of
+              the resources, a 200 when all pass and a 503 otherwise, e.g.
+              '/health'. (Default: None)
+            hooks: list, Hooks of every method, run before the API, class
+              and @method hooks. A hook is a function called with the
+              request handler before the method, or an object with
+              before(handler) and/or after(handler, response) methods, sync
+              or async. A before hook returning a value answers the request
+              with it, before the body is decoded and the method called;
+              after hooks (innermost first) may replace the response before
+              it is cached and written. The hooks of each route are
+              flattened into one call sequence at startup. (Default: None)
+            authenticate: function, Called with the request handler, sync or
+              async, returning the user (set as handler.current_user) or
+              None for anonymous requests, and raising an HTTPError for
+              invalid credentials. It enforces the auth_level of the methods
+              before their hooks: REQUIRED methods answer anonymous requests
+              with a 401. (Default: None, the handler get_current_user())
+            settings: See tornado.web.Application.
+
+        Raises:
+            ApiConfigurationError: If a method uses an unknown executor or
+              resource, a hook or auth_level is invalid, a codec is unknown
+              or not installed, or a profiler_path has no profiler_token.
+        """
         _handlers = []
         self.resource = resource
+        # Requests received and not finished yet, waited for by stopping
+        # workers.
+        self.__requests_in_flight = set()
+        self.json_codec = get_json_codec(json_codec)
+        self.codecs = _CodecRegistry(self.json_codec, codecs)
+        self.executor_pools = create_executor_pools(executors)
+        self.resources = _ResourceRegistry(resources)
+        self.metrics = MetricsRegistry()
+        self.deadline_header = deadline_header
+        self.server_timing = server_timing
+        self.slow_request_threshold = slow_request_threshold
+        if response_validation == 'debug':
+            response_validation = bool(settings.get('debug'))
+        self.response_validation_rate = float(response_validation or 0)
+        self._routes_by_method_id = {}
+        # (before, after) hooks of the served routes. Routes are compiled
+        # once per class and may be served by several RestServices, so
+        # their hooks are kept here rather than on the route.
+        self.route_hooks = {}
+        # RestResource class serving each route, the streaming variant for
+        # the methods with stream_body.
+        handler_classes = {}
+        routes = []
         for rest_handler in rest_handlers:
-            _handlers += self._rest_handler_to_tornado_handler(rest_handler)
+            for route in rest_handler.get_route_table().routes:
+                routes.append(route)
+                if route.method_info.stream_body:
+                    handler_classes[route] = streaming_resource_class(
+                        rest_handler)
+                else:
+                    handler_classes[route] = rest_handler
+                self._routes_by_method_id[route.method_id] = route
+                self.route_hooks[route] = route.compile_hooks(
+                    hooks or (), authenticate)
+                if (route.executor is not None and
+                        route.executor not in self.executor_pools):
+                    raise ApiConfigurationError(
+                        'Unknown executor %s of %s' % (
+                            route.executor, route.method_id))
+                for name in route.injected:
+                    if name not in self.resources:
+                        raise ApiConfigurationError(
+                            'Unknown resource %s of %s' % (
+                                name, route.method_id))
+                if route.injected and route.executor is not None and (
+                        self.executor_pools[route.executor].kind ==
+                        'process'):
+                    raise ApiConfigurationError(
+                        'Resources can not be injected into methods run in '
+                        'a process pool: %s' % route.method_id)
+        cursor_secret = cursor_secret or settings.get('cookie_secret')
+        if cursor_secret is None:
+            if any(route.paginator is not None
+                   for route in self._routes_by_method_id.values()):
+                logger.warning('No cursor_secret: pagination cursors will '
+                               'not survive a restart')
+            cursor_secret = os.urandom(32)
+        self.cursor_signer = _CursorSigner(cursor_secret)
+        self.profiler = _Profiler(self._routes_by_method_id)
+        self.profiler_signal = profiler_signal
+        if profiler_signal is not None:
+            signal.signal(profiler_signal, self.profiler.on_signal)
+        # Every resource path is dispatched by one rule through the routes
+        # of all the resources, compiled once.
+        self.route_table = _RouteTable(routes)
+        _handlers.append(tornado.routing.Rule(
+            tornado.routing.AnyMatches(),
+            _ResourceRouter(self, self.route_table, handler_classes,
+                            self.resource)))
+        if metrics_path:
+            _handlers.append((metrics_path, _MetricsHandler))
+        if health_path:
+            _handlers.append((health_path, _HealthHandler))
+        if profiler_path:
+            if not profiler_token:
+                raise ApiConfigurationError(
+                    'The profiler routes need a profiler_token')
+            profiler_path = profiler_path.rstrip('/')
+            _handlers.append((profiler_path, _ProfilerHandler,
+                              {'token': profiler_token}))
+            _handlers.append((profiler_path + '/([^/]+)', _ProfilerHandler,
+                              {'token': profiler_token}))
+        if batch_path:
+            _handlers.append((batch_path, _BatchHandler, {
+                'concurrency': batch_concurrency,
+                'max_size': batch_max_size,
+                'timeout': batch_timeout}))
         if handlers:
             _handlers += handlers
+        if not settings.get('default_handler_class'):
+            # Requests of unknown paths get the JSON 404 of the resources.
+            _handlers.append(tornado.routing.Rule(
+                tornado.routing.AnyMatches(),
+                _ResourceRouter(self, self.route_table, handler_classes,
+                                not_found_class=RestResource)))
         logger.info(_handlers)
         tornado.web.Application.__init__(self, _handlers, default_host,
                                          transforms, **settings)
 
-    def _rest_handler_to_tornado_handler(self, rest_handler):
-        tornado_handlers = []
-        paths = rest_handler.get_rest_resources_paths()
-        for path in paths:
-            s = re.sub(r"(?<={)\w+}", ".*", path).replace("{", "")
-            o = re.sub(r"(?<=<)\w+", "", s).replace("<", "").replace(">", "").replace("&", "").replace("?", "")  # noqa
-            tornado_handlers.append((o, rest_handler, self.resource))
+    @property
+    def requests_in_flight(self):
+        """Number of requests received and not finished yet."""
+        return len(self.__requests_in_flight)
+
+    def find_handler(self, request, **kwargs):
+        self.__requests_in_flight.add(request)
+        return _InFlightDelegate(
+            self.__requests_in_flight, request,
+            tornado.web.Application.find_handler(self, request, **kwargs))
+
+    def log_request(self, handler):
+        self.__requests_in_flight.discard(handler.request)
+        if isinstance(handler, RestResource):
+            handler._end_metrics(handler.get_status())
+        tornado.web.Application.log_request(self, handler)
+
+    def serve(self, port, address=None, processes=None, reuse_port=True,
+              drain_timeout=DEFAULT_DRAIN_TIMEOUT, **server_kwargs):
+        """Serve the application on one or several processes.
+
+        Binds the sockets, forks the worker processes and supervises them:
+        dead workers are respawned, SIGHUP restarts the workers one at a time
+        without downtime, SIGTERM and SIGINT stop them. Workers start their
+        resources before accepting connections; stopping workers finish
+        their in-flight requests, then close their resources before exiting.
+        Returns once every worker stopped. With processes=1 the application
+        is served in the calling process, which ignores SIGHUP: restarting
+        it would stop serving.
+
+        Sample usage:
+          RestService([Shelves, Books]).serve(8080)
+
+        Args:
+            port: integer, Port to listen on.
+            address: string, Address to listen on. (Default: None, all
+              interfaces)
+            processes: integer, Number of worker processes, 1 to serve in
+              the calling process. (Default: None, one per CPU)
+            reuse_port: boolean, Bind with SO_REUSEPORT. (Default: True)
+            drain_timeout: number, Seconds a stopping worker waits for its
+              in-flight requests. (Default: 30)
+            server_kwargs: Arguments of tornado.httpserver.HTTPServer.
+
+        Raises:
+            ApiConfigurationError: If the profiler_signal is SIGTERM, SIGINT
+              or SIGHUP.
+        """
+        serve(self, port, address=address, processes=processes,
+              reuse_port=reuse_port, drain_timeout=drain_timeout,
+              **server_kwargs)
+
+    def invalidate_cache(self, method_id, params_values=None):
+        """Drop cached responses of a method.
+
+        Args:
+            method_id: string, Method identifier, as computed by
+              _MethodInfo.method_id() (e.g. 'shop.items.get_item').
+            params_values: list, Drop only the responses of these path params
+              values, as passed to the method. (Default: None, drop all)
+
+        Raises:
+            KeyError: If no served method has this identifier.
+        """
+        cache = self._routes_by_method_id[method_id].cache
+        if cache is not None:
+            cache.invalidate(params_values)
+
+    def executor_stats(self):
+        """Get the counters of the executor pools.
+
+        Returns:
+            Dict of the pools counters (see _ExecutorPool.stats()) by name.
+        """
+        return dict((name, pool.stats())
+                    for name, pool in self.executor_pools.items())
+
+    async def start_resources(self):
+        """Create and warm up the resources of the worker process, once.
+
+        RestService.serve() calls it before accepting connections.
+        Applications served otherwise should await it before starting their
+        HTTPServer, else the first request needing a resource starts them.
+        """
+        await self.resources.start()
+
+    async def close_resources(self):
+        """Close the resources of the worker process."""
+        await self.resources.close()
 
-        return tornado_handlers
+    def shutdown_executors(self, wait=True):
+        """Shut the executor pools down."""
+        for pool in self.executor_pools.values():
+            pool.shutdown(wait=wait)